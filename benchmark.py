@@ -0,0 +1,202 @@
+import io
+import os
+import sys
+import json
+import argparse
+import tempfile
+import contextlib
+import tracemalloc
+
+from timeit import default_timer as timer
+from bs4 import BeautifulSoup
+from prettytable import PrettyTable
+
+import whatsoup
+from synthetic_chat import generate_chat_html
+
+# Stages of scraping and exporting a chat that are benchmarked, in pipeline order
+BENCHMARK_STAGES = ('parse-bs4', 'parse-lxml', 'classify', 'group',
+                    'export-txt', 'export-csv', 'export-html', 'export-sqlite')
+
+# Chat sizes (# of messages) benchmarked by default, try e.g. '--sizes 100000 500000' for the largest chats
+BENCHMARK_SIZES = (1000, 10000)
+
+# Baseline results that runs are compared against, keyed by '[stage]/[size]'
+BASELINE_FILE = os.path.join('benchmarks', 'baseline.json')
+
+# How much slower (or more memory hungry) than its baseline a stage may get before it counts as a regression
+REGRESSION_THRESHOLD = 0.25
+
+# Seconds a timed run of a stage takes at least: faster stages are run back to back until then and timed together, as a run of a few ms is mostly timer and scheduling noise
+MIN_RUN_SECONDS = 0.2
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark WhatSoup's scraping and exporting on generated chats, reporting messages/s and peak memory per stage and any regressions against the stored baseline.")
+    parser.add_argument('--sizes', nargs='+', type=int, default=list(BENCHMARK_SIZES), metavar='N',
+                        help=f"chat sizes in # of messages (default: {' '.join(map(str, BENCHMARK_SIZES))})")
+    parser.add_argument('--stages', nargs='+', choices=BENCHMARK_STAGES, default=list(BENCHMARK_STAGES),
+                        help="stages to benchmark (default: all)")
+    parser.add_argument('--repeat', type=int, default=3,
+                        help="runs per stage, the fastest run counts (default: 3)")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the generated chats (default: 0)")
+    parser.add_argument('--baseline', default=BASELINE_FILE,
+                        help=f"baseline file (default: {BASELINE_FILE})")
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                        help=f"allowed slowdown/memory growth vs the baseline as a fraction (default: {REGRESSION_THRESHOLD})")
+    parser.add_argument('--save-baseline', action='store_true',
+                        help="store this run's results as the new baseline")
+    parser.add_argument('--json', metavar='PATH', help="also write the results to a JSON file")
+    args = parser.parse_args()
+
+    # Benchmark each chat size
+    results = {}
+    for size in args.sizes:
+        print(f"Generating a chat with {size} messages...".ljust(60), end="\r")
+        html = generate_chat_html(size, args.seed)
+        for stage, run in benchmark_stages(html, args.stages):
+            print(f"Benchmarking {stage} on {size} messages...".ljust(60), end="\r")
+            results[f"{stage}/{size}"] = benchmark_stage(run, size, args.repeat)
+
+    # Compare against the baseline and show the results
+    baseline = load_baseline(args.baseline)
+    regressions = find_regressions(results, baseline, args.threshold)
+    print_results(results, baseline, regressions)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as json_file:
+            json.dump(results, json_file, indent=2)
+
+    if args.save_baseline:
+        save_baseline(args.baseline, {**baseline, **results})
+        print(f"Success! Baseline saved to '{args.baseline}'.")
+    elif regressions:
+        print(f"Error! {len(regressions)} stage(s) regressed by more than {args.threshold:.0%} against the baseline.")
+        sys.exit(1)
+
+
+def benchmark_stages(html, stages):
+    '''Yields (stage, run) for each selected stage, where run() does the stage's work on the chat.
+
+    Each stage gets its input ready-made from the stages before it, so only its own work is measured.
+    '''
+
+    # Parse the page once up front for the stages after parsing
+    with contextlib.redirect_stdout(io.StringIO()):
+        rows = whatsoup.scrape_page_rows(html, 'lxml')
+        scraped = whatsoup.group_messages_by_date(whatsoup.resolve_messages(rows))
+
+    for stage in stages:
+        if stage.startswith('parse-'):
+            yield stage, lambda engine=stage[len('parse-'):]: whatsoup.scrape_page_rows(html, engine)
+        elif stage == 'classify':
+            message_list = whatsoup.find_message_list(BeautifulSoup(html, 'lxml'))
+            messages = [child for child in message_list.contents if child.name and 'message' in " ".join(
+                child.get('class') or [])]
+            yield stage, lambda: [whatsoup.classify_message(message) for message in messages]
+        elif stage == 'group':
+            yield stage, lambda: whatsoup.group_messages_by_date(whatsoup.resolve_messages(rows))
+        elif stage.startswith('export-'):
+            yield stage, lambda export_format=stage[len('export-'):]: export_to_temporary_dir(scraped, export_format)
+
+
+def export_to_temporary_dir(scraped, export_format):
+    '''Exports the chat to a fresh directory that is deleted afterwards, so every run writes a new file (and a new SQLite archive)'''
+
+    with tempfile.TemporaryDirectory(prefix='whatsoup-benchmark-') as export_dir:
+        if not whatsoup.export_chat('Bob Ross', scraped, export_format, export_dir=export_dir):
+            raise RuntimeError(f"Exporting to {export_format} failed")
+
+
+def benchmark_stage(run, size, repeat=3):
+    '''Returns the messages/s of the fastest of the given runs of a stage (each at least MIN_RUN_SECONDS long), and its peak memory in MiB from a separate traced run'''
+
+    # Time the runs w/o tracing memory, which slows allocations down considerably
+    fastest = None
+    for _ in range(max(repeat, 1)):
+        with contextlib.redirect_stdout(io.StringIO()):
+            calls, start = 0, timer()
+            while True:
+                run()
+                calls += 1
+                elapsed = timer() - start
+                if elapsed >= MIN_RUN_SECONDS:
+                    break
+        elapsed /= calls
+        fastest = elapsed if fastest is None else min(fastest, elapsed)
+
+    # Trace what the stage allocates on top of its input (incl. the result it keeps)
+    tracemalloc.start()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {'messages': size, 'seconds': round(fastest, 4), 'messages_per_second': round(size / max(fastest, 1e-9)),
+            'peak_memory_mib': round(peak / 1024 / 1024, 2)}
+
+
+def find_regressions(results, baseline, threshold=REGRESSION_THRESHOLD):
+    '''Returns a dict of the results that are slower or use more memory than their baseline allows, w/ the reason as value'''
+
+    regressions = {}
+    for key, result in results.items():
+        expected = baseline.get(key)
+        if not expected:
+            continue
+
+        reasons = []
+        if result['messages_per_second'] < expected['messages_per_second'] * (1 - threshold):
+            reasons.append('throughput')
+        # Ignore memory changes below 1 MiB, which are mostly noise from small chats
+        if result['peak_memory_mib'] > max(expected['peak_memory_mib'] * (1 + threshold), expected['peak_memory_mib'] + 1):
+            reasons.append('memory')
+        if reasons:
+            regressions[key] = ' & '.join(reasons)
+
+    return regressions
+
+
+def print_results(results, baseline, regressions):
+    '''Prints a table of the results, w/ their change vs the baseline'''
+
+    table = PrettyTable(['Stage', 'Messages', 'Messages/s', 'Peak memory', 'vs baseline', 'Status'])
+    for key, result in results.items():
+        stage = key.rsplit('/', 1)[0]
+        expected = baseline.get(key)
+        if expected:
+            change = f"{result['messages_per_second'] / expected['messages_per_second'] - 1:+.0%} msg/s, {result['peak_memory_mib'] - expected['peak_memory_mib']:+.1f} MiB"
+        else:
+            change = 'n/a'
+        status = f"REGRESSED ({regressions[key]})" if key in regressions else 'ok'
+        table.add_row([stage, result['messages'], f"{result['messages_per_second']:,}",
+                       f"{result['peak_memory_mib']:.1f} MiB", change, status])
+    table.align = 'l'
+    print(" " * 60, end="\r")
+    print(table)
+
+
+def load_baseline(baseline_file=BASELINE_FILE):
+    '''Returns the stored baseline results, or an empty dict if there are none'''
+
+    try:
+        with open(baseline_file, encoding='utf-8') as json_file:
+            return json.load(json_file)
+    except FileNotFoundError:
+        return {}
+
+
+def save_baseline(baseline_file, results):
+    '''Stores the results as the baseline that later runs are compared against'''
+
+    os.makedirs(os.path.dirname(baseline_file) or '.', exist_ok=True)
+    with open(baseline_file, 'w', encoding='utf-8') as json_file:
+        json.dump(results, json_file, indent=2, sort_keys=True)
+        json_file.write('\n')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,564 @@
+import os
+import re
+import sys
+import json
+import base64
+import argparse
+
+import lxml.html
+
+from html import escape
+from time import sleep
+from collections import Counter
+from timeit import default_timer as timer
+from selenium.webdriver.common.by import By
+from selenium.webdriver.common.keys import Keys
+from selenium.common.exceptions import NoSuchElementException, WebDriverException
+from prettytable import PrettyTable
+
+import whatsoup
+import synthetic_chat
+
+# File in a fixture directory listing its chats (see record_fixture), next to the page source of each recorded chat
+FIXTURE_CHATS_FILE = 'chats.json'
+
+# WhatsApp w/o an open chat, laid out so the xpaths whatsoup uses find the chat search, its clear button and the chat-pane list
+PAGE_HTML = ('<html><head><title>WhatsApp</title></head><body><div id="app"><div id="side"><div><div><label><div><div></div>'
+             '<div contenteditable="true" role="textbox" title="Search or start new chat"></div></div></label><span><button aria-label="Cancel search"></button></span></div></div>'
+             '<div id="pane-side"><div><div><div role="grid" aria-label="Chat list."></div></div></div></div></div></div></body></html>')
+
+# A chat-pane row, laid out so the relative xpaths of get_chats find its name, time and last message
+CHAT_ROW_HTML = ('<div tabindex="-1" role="row"><div><div></div><div><div><div><span dir="auto" title="{name}">{name}</span></div><div>{time}</div></div>'
+                 '<div><div><span dir="ltr" title="{title}">{text}</span></div></div></div></div></div>')
+
+# The 'load earlier messages' row at the top of the message list until the whole chat history has loaded
+LOADER_TITLE = 'load earlier messages…'
+LOADER_ROW_HTML = f'<div title="{LOADER_TITLE}"><span>Loading messages…</span></div>'
+
+# Simulated heights in px of a message list row and of a screen of the chat-pane (in rows), for scroll heights and offsets
+ROW_HEIGHT = 72
+CHAT_PANE_ROWS = 15
+
+
+class FakeDriver:
+    '''Stands in for Selenium's Chrome driver w/ a fixture (see record_fixture) instead of WhatsApp, so the whole export runs offline and deterministically.
+
+    Implements the WebDriver API whatsoup uses against a simulated page: the chat-pane lists the fixture's chats, searching for a chat and moving down to it opens its recorded page, and scrolling up the message list loads its history batch_size rows at a time, each batch taking latency seconds. With max_rows, rows further down are dropped from the page once the message list holds more than that, like WhatsApp does in very large chats. Every WebDriver command is counted in commands (see print_commands), one for each round trip a real driver would make.
+    '''
+
+    def __init__(self, fixture_dir, batch_size=50, latency=0.0, max_rows=None):
+        with open(os.path.join(fixture_dir, FIXTURE_CHATS_FILE), encoding='utf-8') as json_file:
+            self.chats = json.load(json_file)['chats']
+        self.fixture_dir = fixture_dir
+        self.batch_size, self.latency, self.max_rows = batch_size, latency, max_rows
+        self.commands = Counter()
+        self.switch_to = FakeSwitchTo(self)
+
+        # State of the simulated page
+        self.document, self.focus, self.search_text = None, None, ''
+        self.pane_chats, self.chat_pane_position = [], 0
+        self.hidden_rows, self.loaded_rows, self.batch_requested = [], 0, None
+        self.known_ids = set()
+
+    def get(self, url):
+        self.command('get')
+        self.document = lxml.html.document_fromstring(PAGE_HTML)
+        self.focus, self.search_text = None, ''
+        self.render_chat_pane()
+
+    def set_script_timeout(self, seconds):
+        self.command('set_script_timeout')
+
+    def quit(self):
+        self.command('quit')
+        self.document = None
+
+    @property
+    def page_source(self):
+        self.command('page_source')
+        return lxml.html.tostring(self.document, encoding='unicode')
+
+    def find_element(self, by=By.ID, value=None):
+        self.command('find_element')
+        if by == By.ID:
+            return self.find_xpath(self.document, f'//*[@id="{value}"]')
+        elif by == By.XPATH:
+            return self.find_xpath(self.document, value)
+        raise WebDriverException(f"The fake driver can't find elements by {by}")
+
+    def find_element_by_xpath(self, xpath):
+        return self.find_element(By.XPATH, xpath)
+
+    def execute_script(self, script, *args):
+        '''Runs one of whatsoup's scripts against the simulated page'''
+
+        self.command(f'execute_script({whatsoup.script_name(script)})')
+        search = re.fullmatch(r"arguments\[0\]\.innerHTML = '(.*)'", script, re.DOTALL)
+        if script == whatsoup.HARVEST_ROWS_SCRIPT:
+            return self.harvest_rows(args[0].element)
+        elif script == whatsoup.SET_KNOWN_IDS_SCRIPT:
+            self.known_ids = set(args[0])
+            return None
+        elif script == whatsoup.EXTRACT_ROWS_SCRIPT:
+            rows = [row for row in args[0].element if isinstance(row.tag, str)]
+            return {'total': len(rows), 'rows': [extract_row_record(row, args[3]) for row in rows[args[1]:args[1] + args[2]]]}
+        elif script == whatsoup.SCROLL_CHAT_PANE_TO_TOP_SCRIPT:
+            self.chat_pane_position = 0
+            return None
+        elif script == "return arguments[0].scrollHeight;":
+            return self.scroll_height()
+        elif search:
+            # Typing the chat name into the search box (see find_selected_chat)
+            self.search_text = search.group(1)
+            args[0].element.text = self.search_text
+            return None
+        raise WebDriverException(f"javascript error: the fake driver can't run this script: {script.strip()[:60]!r}")
+
+    def execute_async_script(self, script, *args):
+        '''Runs one of whatsoup's async scripts against the simulated page, returning what it would call back w/'''
+
+        self.command(f'execute_async_script({whatsoup.script_name(script)})')
+        if script == whatsoup.SCROLL_AND_WAIT_SCRIPT:
+            return self.scroll_and_wait(args[0].element, args[1] / 1000)
+        elif script == whatsoup.HARVEST_CHATS_SCRIPT:
+            return self.harvest_chats(*args)
+        elif script == whatsoup.FETCH_MEDIA_SCRIPT:
+            return self.fetch_media(args[0].element, *args[1:])
+        raise WebDriverException(f"javascript error: the fake driver can't run this script: {script.strip()[:60]!r}")
+
+    def execute_cdp_cmd(self, cmd, cmd_args):
+        '''Chrome DevTools' Performance domain, reporting the size of the simulated page'''
+
+        self.command(f'execute_cdp_cmd({cmd})')
+        if cmd == 'Performance.enable':
+            return {}
+        elif cmd == 'Performance.getMetrics':
+            nodes = sum(1 for _ in self.document.iter()) if self.document is not None else 0
+            return {'metrics': [{'name': 'Nodes', 'value': nodes}, {'name': 'Documents', 'value': 1}]}
+        raise WebDriverException(f"The fake driver doesn't support {cmd}")
+
+    def command(self, name):
+        '''Counts a WebDriver command, i.e. a round trip to the browser'''
+
+        self.commands[name] += 1
+
+    def find_xpath(self, context, xpath):
+        '''Returns the first element matching the xpath as a FakeElement, like Selenium raising NoSuchElementException if there's none'''
+
+        for element in context.xpath(xpath):
+            if isinstance(element, lxml.html.HtmlElement):
+                return FakeElement(self, element)
+        raise NoSuchElementException(f"no such element: Unable to locate element: {xpath}")
+
+    def chat_pane_list(self):
+        return self.document.xpath('//*[@id="pane-side"]/div[1]/div/div')[0]
+
+    def render_chat_pane(self):
+        '''Fills the chat-pane w/ every chat, or w/ the search results while there is a search (which WhatsApp only labels as such if anything matched)'''
+
+        search_text = self.search_text.strip().lower()
+        self.pane_chats = [chat for chat in self.chats if search_text in chat['name'].lower()]
+        chat_list = self.chat_pane_list()
+        del chat_list[:]
+        chat_list.set('aria-label', 'Search results.' if search_text and self.pane_chats else 'Chat list.')
+        for chat in self.pane_chats:
+            chat_list.append(lxml.html.fragment_fromstring(CHAT_ROW_HTML.format(
+                name=escape(chat['name']), time=escape(chat['time']), title=escape(chat['title']), text=escape(chat['text']))))
+
+    def click(self, element):
+        if element.get('title') == 'Search or start new chat':
+            self.focus = element
+        elif element.get('aria-label') == 'Cancel search':
+            self.search_text = ''
+            self.document.xpath('//*[@title="Search or start new chat"]')[0].text = None
+            self.render_chat_pane()
+
+    def send_keys(self, element, keys):
+        '''Types into the search box or moves down the chat-pane, where moving to a search result opens its chat'''
+
+        chat_rows = list(self.chat_pane_list())
+        for key in ''.join(keys):
+            if key == Keys.DOWN:
+                if element in chat_rows:
+                    index = min(chat_rows.index(element) + 1, len(chat_rows) - 1)
+                elif chat_rows:
+                    index = 0
+                else:
+                    continue
+                element = self.focus = chat_rows[index]
+                if self.search_text.strip():
+                    self.open_chat(self.pane_chats[index])
+            elif element.get('title') == 'Search or start new chat':
+                if key == Keys.BACKSPACE:
+                    self.search_text = self.search_text[:-1]
+                elif key == Keys.SPACE or key.isprintable():
+                    self.search_text += ' ' if key == Keys.SPACE else key
+                else:
+                    continue
+                element.text = self.search_text
+                self.render_chat_pane()
+                chat_rows = list(self.chat_pane_list())
+
+    def open_chat(self, chat):
+        '''Opens a chat w/ the main panel of its recorded page, showing only its newest batch of messages until the message list is scrolled up'''
+
+        app = self.document.get_element_by_id('app')
+        for main in app.xpath('./div[@id="main"]'):
+            app.remove(main)
+        self.hidden_rows, self.loaded_rows, self.batch_requested = [], 0, None
+        if not chat.get('page'):
+            return
+
+        # Move the chat's main panel into the page
+        page = lxml.html.document_fromstring(whatsoup.read_page_source(os.path.join(self.fixture_dir, chat['page'])))
+        main = page.get_element_by_id('main')
+        main.tail = None
+        app.append(main)
+
+        # Keep back all but the newest batch of rows, behind a 'load earlier messages' row
+        message_list = whatsoup.find_message_list_lxml(self.document)
+        if message_list is None:
+            return
+        rows = [row for row in message_list if isinstance(row.tag, str) and (
+            row.get('data-id') or 'load' not in (row.get('title') or ''))]
+        del message_list[:]
+        self.hidden_rows = rows[:-self.batch_size]
+        if self.hidden_rows:
+            message_list.append(lxml.html.fragment_fromstring(LOADER_ROW_HTML))
+        for row in rows[-self.batch_size:]:
+            message_list.append(row)
+        self.loaded_rows = len(rows[-self.batch_size:])
+
+    def scroll_height(self):
+        return self.loaded_rows * ROW_HEIGHT + (ROW_HEIGHT if self.hidden_rows else 0)
+
+    def scroll_and_wait(self, message_list, timeout):
+        '''Waits up to timeout seconds for the next batch of history to arrive latency seconds after it was first asked for, and shows it'''
+
+        if not self.hidden_rows:
+            return self.load_state(0)
+
+        now = timer()
+        if self.batch_requested is None:
+            self.batch_requested = now
+        remaining = self.batch_requested + self.latency - now
+        waited = max(min(remaining, timeout), 0)
+        sleep(waited)
+        if remaining > timeout:
+            return self.load_state(waited)
+
+        # Insert the batch above the loaded rows (below the 'load earlier messages' row), removing that row once everything has loaded
+        batch = self.hidden_rows[-self.batch_size:]
+        del self.hidden_rows[-self.batch_size:]
+        for offset, row in enumerate(batch, start=1):
+            message_list.insert(offset, row)
+        if not self.hidden_rows:
+            message_list.remove(message_list[0])
+        self.loaded_rows += len(batch)
+        self.batch_requested = None
+
+        # Drop the newest rows beyond max_rows
+        if self.max_rows:
+            rows = [row for row in message_list if row.get('data-id') or 'load' not in (row.get('title') or '')]
+            for row in rows[self.max_rows:]:
+                message_list.remove(row)
+
+        return self.load_state(waited)
+
+    def load_state(self, elapsed):
+        return {'height': self.scroll_height(), 'loading': LOADER_TITLE if self.hidden_rows else '', 'elapsed': elapsed, 'memory': None}
+
+    def harvest_rows(self, message_list):
+        '''HARVEST_ROWS_SCRIPT on the simulated message list'''
+
+        rows, is_older = [], True
+        for row in message_list:
+            data_id = row.get('data-id')
+            if row.get('data-whatsoup-harvested') is not None:
+                if data_id:
+                    is_older = False
+                continue
+            if not data_id and 'load' in (row.get('title') or ''):
+                continue
+            is_known = data_id in self.known_ids
+            rows.append([data_id, None if is_known else lxml.html.tostring(
+                row, encoding='unicode', with_tail=False), is_older])
+            row.set('data-whatsoup-harvested', '')
+        return rows
+
+    def fetch_media(self, message_list, data_ids, max_bytes):
+        '''FETCH_MEDIA_SCRIPT on the simulated message list, where the media behind a blob URL is the URL itself'''
+
+        rows = {row.get('data-id'): row for row in message_list if row.get('data-id')}
+        media, fetched_bytes = {}, 0
+        for data_id in data_ids:
+            if fetched_bytes >= max_bytes:
+                break
+            if data_id not in rows:
+                media[data_id] = None
+                continue
+            media[data_id] = []
+            for url in dict.fromkeys(image.get('src') for image in rows[data_id].iter('img') if (image.get('src') or '').startswith('blob:')):
+                fetched_bytes += len(url.encode())
+                media[data_id].append({'type': 'image/webp', 'data': base64.b64encode(url.encode()).decode()})
+        return media
+
+    def harvest_chats(self, reset, max_steps, wait):
+        '''HARVEST_CHATS_SCRIPT on the simulated chat-pane, which shows CHAT_PANE_ROWS chats per scroll step'''
+
+        if reset:
+            self.chat_pane_position = 0
+        chats = []
+        for _ in range(max_steps):
+            start = self.chat_pane_position
+            for index, chat in enumerate(self.pane_chats[start:start + CHAT_PANE_ROWS], start=start):
+                chats.append({'offset': index * ROW_HEIGHT, 'name': chat['name'], 'time': chat['time'],
+                              'title': chat['title'], 'text': chat['text']})
+            self.chat_pane_position = min(start + CHAT_PANE_ROWS, len(self.pane_chats))
+            if self.chat_pane_position >= len(self.pane_chats):
+                self.chat_pane_position = 0
+                return {'chats': chats, 'done': True}
+        return {'chats': chats, 'done': False}
+
+
+class FakeSwitchTo:
+    '''driver.switch_to of FakeDriver'''
+
+    def __init__(self, driver):
+        self.driver = driver
+
+    @property
+    def active_element(self):
+        self.driver.command('active_element')
+        return FakeElement(self.driver, self.driver.focus if self.driver.focus is not None else self.driver.document.body)
+
+
+class FakeElement:
+    '''A WebElement of FakeDriver's simulated page'''
+
+    def __init__(self, driver, element):
+        self.driver = driver
+        self.element = element
+
+    @property
+    def id(self):
+        return self.element.getroottree().getpath(self.element)
+
+    @property
+    def text(self):
+        self.driver.command('text')
+        return self.element.text_content()
+
+    def click(self):
+        self.driver.command('click')
+        self.driver.click(self.element)
+
+    def send_keys(self, *keys):
+        self.driver.command('send_keys')
+        self.driver.send_keys(self.element, keys)
+
+    def get_attribute(self, name):
+        self.driver.command('get_attribute')
+        return self.element.get(name)
+
+    def get_property(self, name):
+        self.driver.command('get_property')
+        return self.element.get(name, '')
+
+    def find_element_by_xpath(self, xpath):
+        self.driver.command('find_element')
+        return self.driver.find_xpath(self.element, xpath)
+
+    def find_element_by_tag_name(self, name):
+        self.driver.command('find_element')
+        return self.driver.find_xpath(self.element, f'.//{name}')
+
+    def find_elements_by_tag_name(self, name):
+        self.driver.command('find_elements')
+        return [FakeElement(self.driver, element) for element in self.element.iterdescendants(name)]
+
+
+def extract_row_record(row, markers=None):
+    '''Returns the record EXTRACT_ROWS_SCRIPT makes of a message list row (see whatsoup.scrape_record), using the lxml engine's equivalents of its lookups. Formatting is kept as markdown when given the RICH_TEXT_MARKERS, like the script.'''
+
+    xpaths = whatsoup.LXML_XPATHS
+    data_id, classes = row.get('data-id'), (row.get('class') or '').split()
+    if 'message' not in (row.get('class') or ''):
+        return {'divider': row.text_content()} if row.tag == 'div' and data_id is None else None
+
+    copyable = next(iter(xpaths['copyable_text'](row)), None)
+    record = {'id': data_id, 'classes': classes, 'copyable': copyable is not None, 'pre': None, 'content': None, 'text': None,
+              'emoji': False, 'recall': False, 'media': False, 'spans': None, 'sender': None}
+    if copyable is not None:
+        record['pre'] = copyable.get('data-pre-plain-text')
+        content = next(iter(xpaths['copyable_content'](copyable)), None)
+        record['content'] = whatsoup.extract_rich_text_lxml(content, markers is not None) if content is not None else ''
+        selectable = next(iter(xpaths['selectable_span'](copyable) or xpaths['selectable_div'](copyable)), None)
+        if selectable is not None:
+            record['emoji'] = xpaths['has_img'](selectable)
+            record['text'] = whatsoup.extract_rich_text_lxml(selectable, markers is not None, record['emoji'])
+    record['recall'] = xpaths['has_recall'](row)
+    record['media'] = whatsoup.is_media_in_message_lxml(row, copyable)
+    if record['recall'] or (record['media'] and copyable is None):
+        record['spans'] = [span.text_content() for span in xpaths['spans'](row)]
+    if record['media'] and copyable is None and 'message-in' in classes and 'message-out' not in classes:
+        record['sender'] = whatsoup.find_media_sender_when_copyable_does_not_exist_lxml(row)
+    return record
+
+
+def print_commands(commands, elapsed=None):
+    '''Prints how many WebDriver commands (round trips) of each kind were made'''
+
+    t = PrettyTable()
+    t.field_names = ["Command", "Count"]
+    t.align["Command"], t.align["Count"] = "l", "r"
+    for name, count in commands.most_common():
+        t.add_row([name, count])
+    title = f"{sum(commands.values())} WebDriver commands"
+    if elapsed is not None:
+        title += f" in {round(elapsed, 2)} seconds"
+    print(t.get_string(title=title))
+
+
+def record_fixture(driver, fixture_dir, selectors=('all',), load_timeout=60):
+    '''Records a fixture for FakeDriver from a logged-in WhatsApp session: the chat-pane's chats and, for the chats picked by the selectors (see whatsoup.select_chats), the page source once their entire history has loaded.
+
+    Fixtures hold the recorded chats' messages, so keep them private.
+    '''
+
+    os.makedirs(fixture_dir, exist_ok=True)
+
+    # Record the chat-pane as the browser shows it
+    chats = [{'name': chat['name'], 'time': chat['time'], 'title': chat['title'], 'text': chat['text'], 'page': None}
+             for chat in whatsoup.harvest_chat_pane(driver)]
+    selected_chats, failures = whatsoup.select_chats(chats, selectors)
+    for selector, reason in failures:
+        print(f"Warning! '{selector}' was skipped: {reason}.")
+
+    # Record the page source of each selected chat once it has loaded
+    for index, chat in enumerate(chats, start=1):
+        if chat['name'] not in selected_chats:
+            continue
+        if not whatsoup.find_selected_chat(driver, chat['name']):
+            driver.find_element_by_xpath(
+                '//*[@id="side"]/div[1]/div/span/button').click()
+            continue
+        if not whatsoup.load_selected_chat(driver, load_timeout=load_timeout, timeout_policy='finish'):
+            continue
+
+        chat['page'] = f"chat-{index:04d}.html"
+        with open(os.path.join(fixture_dir, chat['page']), 'w', encoding='utf-8') as html_file:
+            html_file.write(driver.page_source)
+        print(f"Success! '{chat['name']}' was recorded.")
+
+    save_fixture_chats(fixture_dir, chats)
+    return chats
+
+
+def write_synthetic_fixture(fixture_dir, chats=3, messages=1000, seed=0):
+    '''Writes a fixture for FakeDriver w/ generated chats (see synthetic_chat), so no WhatsApp session is needed at all'''
+
+    os.makedirs(fixture_dir, exist_ok=True)
+
+    fixture_chats = []
+    for index in range(1, chats + 1):
+        name = f"{synthetic_chat.SENDERS[(index - 1) % len(synthetic_chat.SENDERS)]} {index}"
+        page = f"chat-{index:04d}.html"
+        synthetic_chat.write_chat_html(os.path.join(fixture_dir, page), messages, seed + index, name)
+
+        # Every other chat is a group chat, whose last message is prefixed w/ its sender
+        title = ' '.join(synthetic_chat.WORDS[index % len(synthetic_chat.WORDS):][:4])
+        text = f"Bob Ross\n: \n{title}" if index % 2 == 0 else title
+        fixture_chats.append({'name': name, 'time': '2/14/2021', 'title': title, 'text': text, 'page': page})
+
+    save_fixture_chats(fixture_dir, fixture_chats)
+    return fixture_chats
+
+
+def save_fixture_chats(fixture_dir, chats):
+    with open(os.path.join(fixture_dir, FIXTURE_CHATS_FILE), 'w', encoding='utf-8') as json_file:
+        json.dump({'chats': chats}, json_file, ensure_ascii=False, indent=2)
+
+
+def cli():
+    parser = argparse.ArgumentParser(
+        description="Run WhatSoup against recorded or generated WhatsApp pages instead of a browser, e.g. to profile its round trips and scroll strategies offline.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    record_parser = subparsers.add_parser(
+        'record', help="record a fixture from your WhatsApp session (uses DRIVER_PATH and CHROME_PROFILE like whatsoup.py)")
+    record_parser.add_argument('fixture', help="directory to record to")
+    record_parser.add_argument('chats', nargs='*', default=['all'], metavar='CHAT',
+                               help="chat names, chat numbers, or 'all' (default)")
+    record_parser.add_argument('--load-timeout', type=float, default=60, metavar='SECONDS',
+                               help="seconds to wait for more messages to load before recording what has loaded (default: 60)")
+
+    synthetic_parser = subparsers.add_parser('synthetic', help="write a fixture of generated chats")
+    synthetic_parser.add_argument('fixture', help="directory to write to")
+    synthetic_parser.add_argument('--chats', type=int, default=3, help="number of chats (default: 3)")
+    synthetic_parser.add_argument('--messages', type=int, default=1000,
+                                  help="messages per chat (default: 1000)")
+    synthetic_parser.add_argument('--seed', type=int, default=0, help="random seed (default: 0)")
+
+    replay_parser = subparsers.add_parser(
+        'replay', help="export chats from a fixture like 'whatsoup.py export' and report the WebDriver commands it took")
+    replay_parser.add_argument('fixture', help="fixture directory")
+    replay_parser.add_argument('chats', nargs='*', default=['all'], metavar='CHAT',
+                               help="chat names, chat numbers, or 'all' (default)")
+    replay_parser.add_argument('--batch-size', type=int, default=50,
+                               help="messages loaded per scroll (default: 50)")
+    replay_parser.add_argument('--latency', type=float, default=0.0,
+                               help="seconds each batch of messages takes to load (default: 0)")
+    replay_parser.add_argument('--max-rows', type=int,
+                               help="drop the newest messages from the page beyond this many rows")
+    replay_parser.add_argument('--format', nargs='+', choices=whatsoup.EXPORT_FORMATS, default=['txt'],
+                               dest='export_formats', help="export formats (default: txt)")
+    replay_parser.add_argument('--output', default='exports', help="export directory (default: exports)")
+    replay_parser.add_argument('--engine', choices=whatsoup.PARSING_ENGINES, default='bs4',
+                               help="HTML parsing engine (default: bs4)")
+    replay_parser.add_argument('--chat-list', choices=whatsoup.CHAT_LIST_MODES, default='keys',
+                               help="how to collect the chat list (default: keys)")
+    replay_parser.add_argument('--refresh', action='store_true',
+                               help="collect the whole chat list instead of updating the cached one")
+    load_mode = replay_parser.add_mutually_exclusive_group()
+    load_mode.add_argument('--stream', action='store_true', help="scrape messages while the chat loads")
+    load_mode.add_argument('--in-browser', action='store_true', help="scrape the loaded chat 'in the browser'")
+    replay_parser.add_argument('--load-timeout', type=float, default=60, metavar='SECONDS',
+                               help="seconds to wait for more messages to load (default: 60)")
+    replay_parser.add_argument('--media', action='store_true',
+                               help="store the media of messages like 'whatsoup.py --media' (the fake media of a sticker is its blob URL)")
+    replay_parser.add_argument('--profile', action='store_true',
+                               help="profile the replay like 'whatsoup.py --profile'")
+    replay_parser.add_argument('--profile-output', metavar='FILE',
+                               help="file to save the --profile report to, which also turns on --profile")
+
+    args = parser.parse_args()
+    if args.command == 'record':
+        driver = whatsoup.setup_selenium()
+        try:
+            if whatsoup.whatsapp_is_loaded(driver):
+                record_fixture(driver, args.fixture, args.chats, args.load_timeout)
+        finally:
+            driver.quit()
+    elif args.command == 'synthetic':
+        write_synthetic_fixture(args.fixture, args.chats, args.messages, args.seed)
+        print(f"Success! {args.chats} chats w/ {args.messages} messages each written to '{args.fixture}'.")
+    elif args.command == 'replay':
+        if args.profile or args.profile_output:
+            whatsoup.start_profiling()
+        fake_driver = FakeDriver(args.fixture, args.batch_size, args.latency, args.max_rows)
+        driver = whatsoup.profile_driver(fake_driver)
+        start = timer()
+        whatsoup.whatsapp_is_loaded(driver, interactive=False)
+        whatsoup.export_dir_setup(args.output)
+        failures = whatsoup.export_chats(driver, args.chats, args.export_formats, args.output, args.engine, args.stream, args.in_browser,
+                                         args.load_timeout, chat_list=args.chat_list, media=args.media, refresh=args.refresh)
+        print_commands(fake_driver.commands, timer() - start)
+        if args.profile or args.profile_output:
+            whatsoup.finish_profiling(
+                args.profile_output or f"WhatSoup Profile - {whatsoup.datetime.now().strftime('%Y-%m-%d %H.%M.%S.%p')}.json")
+        sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,140 @@
+import argparse
+import random
+
+from html import escape
+from datetime import datetime, timedelta
+
+# Kinds of messages in a generated chat and how often they occur, covering every pattern the scraper handles
+MESSAGE_KINDS = {
+    'text': 50,
+    'emoji_text': 12,
+    'media_text': 6,
+    'media': 8,
+    'voice': 4,
+    'recall': 3,
+    'sticker': 4,
+    'grouped_sticker': 2,
+    'contact_card': 2,
+    'emoji_sender_media': 2,
+    'long_text': 7
+}
+
+# Names of the other chat members, incl. one whose name has an emoji in it
+SENDERS = ['Bob Ross', 'Alice Liddell', 'Carol Danvers', '🍲 Soup Club']
+EMOJI = ['👋', '😻', '🍲', '❤', '🌲', '🤳', '🐶']
+WORDS = ['happy', 'little', 'trees', 'painting', 'clouds', 'mountain', 'cabin', 'river', 'friend', 'brush', 'canvas', 'sky',
+         'we', "don't", 'make', 'mistakes', 'just', 'accidents', '&', '<3', '"quoted"', "it's"]
+
+# The page around the 'Message list', laid out like WhatsApp so find_message_list and load_selected_chat's xpath find it
+PAGE_HEAD = ('<html><head><title>WhatsApp</title></head><body><div id="app"><div id="side"><div id="pane-side"></div></div>'
+             '<div id="main"><header><div></div><div><div><div><span title="{chat}">{chat}</span></div></div></div></header><div></div><div></div>'
+             '<div><div><div><div class="_2hqOq"></div>'
+             '<div class="_11liR" tabindex="-1" aria-label="Message list. Press right arrow key on a message to open message context menu.">')
+PAGE_TAIL = '</div></div></div></div></div></div></body></html>'
+
+
+def generate_rows(messages, seed=0, you='Eddy Harrington', start=datetime(2021, 2, 14, 9, 0)):
+    '''Yields the HTML of the 'Message list' rows (date dividers and messages) of a generated chat w/ the given number of messages, the same for the same seed'''
+
+    rnd = random.Random(seed)
+    kinds, weights = list(MESSAGE_KINDS), list(MESSAGE_KINDS.values())
+    message_datetime, divider_date = start, None
+    for index in range(messages):
+        # Messages are minutes to hours apart, w/ a date divider row whenever the day changes
+        message_datetime += timedelta(minutes=rnd.choice((1, 1, 2, 5, 30, 120, 600)))
+        if message_datetime.date() != divider_date:
+            divider_date = message_datetime.date()
+            yield f'<div class="_2wUmf"><div class="_1-lf9"><span dir="auto">{message_datetime.month}/{message_datetime.day}/{message_datetime.year}</span></div></div>'
+
+        is_outgoing = rnd.random() < 0.4
+        sender = you if is_outgoing else rnd.choice(SENDERS)
+        kind = rnd.choices(kinds, weights)[0]
+        yield generate_message(index, kind, message_datetime, sender, is_outgoing, rnd)
+
+
+def generate_message(index, kind, message_datetime, sender, is_outgoing, rnd):
+    '''Returns the HTML of a message row of the given kind'''
+
+    data_id = f"{'true' if is_outgoing else 'false'}_15551234567@c.us_3EB0{index:012X}"
+    classes = 'focusable-list-item message-out' if is_outgoing else 'focusable-list-item message-in'
+    time = message_datetime.strftime('%I:%M %p').lstrip('0')
+    pre_plain_text = escape(
+        f"[{time}, {message_datetime.month}/{message_datetime.day}/{message_datetime.year}] {sender}: ")
+
+    # Name shown above media w/o copyable-text in group chats (only for incoming messages)
+    sender_name = '' if is_outgoing else f'<div class="_1BUvv color-3"><span aria-label="{escape(sender)}:"></span></div>'
+
+    if kind in {'text', 'long_text'}:
+        words = rnd.choices(WORDS, k=rnd.randint(2, 8) if kind == 'text' else rnd.randint(40, 120))
+        body = copyable_text(pre_plain_text, f'<span>{escape(" ".join(words))}</span>')
+    elif kind == 'emoji_text':
+        emoji = ''.join(
+            f'{escape(rnd.choice(WORDS))} <img crossorigin="anonymous" alt="{rnd.choice(EMOJI)}" draggable="false" class="b93 emoji wa _3-8er selectable-text copyable-text" src="data:image/gif;base64,R0lGODlhAQABAIAAAP///wAAACH5BAEAAAAALAAAAAABAAEAAAICRAEAOw==">'
+            for _ in range(rnd.randint(1, 4)))
+        body = copyable_text(pre_plain_text, f'<span>{emoji}</span>')
+    elif kind == 'media_text':
+        body = (f'<div data-testid="media-url-provider"><div><img src="https://mmg.whatsapp.net/d/f/{index}.enc" style="width: 100%;"></div></div>'
+                + copyable_text(pre_plain_text, f'<span>{escape(" ".join(rnd.choices(WORDS, k=4)))}</span>'))
+    elif kind == 'media':
+        body = f'{sender_name}<div data-testid="image-thumb"><div data-testid="media-download"><span data-testid="media-download-icon"></span></div></div>'
+    elif kind == 'voice':
+        sender_name = '' if is_outgoing else f'<div class="_1BUvv color-5"><span aria-label="Voice message"></span><span aria-label="{escape(sender)}:"></span></div>'
+        body = f'{sender_name}<div data-testid="audio-download"><div><span>0:{rnd.randint(10, 59)}</span></div></div>'
+    elif kind == 'recall':
+        body = '<div class="_3ExzF"><span data-testid="recalled"><span>This message was deleted</span></span></div>'
+    elif kind == 'sticker':
+        body = f'{sender_name}<div class="_3mPXD"><img src="blob:https://web.whatsapp.com/{index:08x}-sticker" draggable="false"></div>'
+    elif kind == 'grouped_sticker':
+        data_id = f"{data_id}_grouped-sticker"
+        body = (f'<div class="_3mPXD"><img src="blob:https://web.whatsapp.com/{index:08x}-a" draggable="false">'
+                f'<img src="blob:https://web.whatsapp.com/{index:08x}-b" draggable="false"></div>')
+    elif kind == 'contact_card':
+        body = (f'<div class="copyable-text" data-pre-plain-text="{pre_plain_text}"><div><span class="copyable-text">{escape(rnd.choice(SENDERS))}</span></div>'
+                f'<div><div role="button" title="Message {escape(rnd.choice(SENDERS))}">Message</div><div role="button" title="Add to a group">Add to a group</div></div></div>')
+    else:
+        # Media from a sender whose name is split into text and emoji spans
+        if is_outgoing:
+            body = '<div data-testid="video-media"><span data-testid="media-play"></span></div>'
+        else:
+            body = (f'<div class="_1BUvv color-7"><span><span>{escape(sender)} </span><img alt="{rnd.choice(EMOJI)}" src="data:image/gif;base64,R0lGODlhAQABAIAAAP" class="emoji"> Fan</span></div>'
+                    '<div data-testid="video-media"><span data-testid="media-play"></span></div>')
+
+    return (f'<div tabindex="-1" class="{classes}" data-id="{data_id}"><span></span><div class="_22Msk"><div class="_1dB-m">'
+            f'{body}<div class="_2f-RV"><div class="_1beEj"><span class="_17Osw" dir="auto">{time}</span></div></div></div></div></div>')
+
+
+def copyable_text(pre_plain_text, text):
+    '''Returns the copyable-text element of a message w/ the given selectable-text contents'''
+
+    return (f'<div class="copyable-text" data-pre-plain-text="{pre_plain_text}"><div class="_3ExzF">'
+            f'<span dir="ltr" class="_3-8er selectable-text copyable-text">{text}</span></div></div>')
+
+
+def generate_chat_html(messages, seed=0, chat='Bob Ross'):
+    '''Returns the page source of a WhatsApp chat w/ the given number of generated messages'''
+
+    return PAGE_HEAD.format(chat=escape(chat)) + ''.join(generate_rows(messages, seed)) + PAGE_TAIL
+
+
+def write_chat_html(path, messages, seed=0, chat='Bob Ross'):
+    '''Writes the page source of a generated chat to a file one row at a time, so even huge chats don't need much memory'''
+
+    with open(path, 'w', encoding='utf-8', buffering=1024 * 1024) as html_file:
+        html_file.write(PAGE_HEAD.format(chat=escape(chat)))
+        for row in generate_rows(messages, seed):
+            html_file.write(row)
+        html_file.write(PAGE_TAIL)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Generate the page source of a WhatsApp chat for testing and benchmarking WhatSoup, e.g. to scrape w/ 'python whatsoup.py parse'.")
+    parser.add_argument('messages', type=int, help="number of messages in the chat")
+    parser.add_argument('path', help="html file to write")
+    parser.add_argument('--seed', type=int, default=0,
+                        help="random seed, the same seed generates the same chat (default: 0)")
+    parser.add_argument('--chat', default='Bob Ross', help="chat name (default: Bob Ross)")
+    args = parser.parse_args()
+
+    write_chat_html(args.path, args.messages, args.seed, args.chat)
+    print(f"Success! {args.messages} messages written to '{args.path}'.")
@@ -0,0 +1,109 @@
+import os
+import re
+import sys
+
+from functools import partial
+
+import pytest
+
+# whatsoup and its tools are scripts at the top of the repo rather than a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import whatsoup  # noqa: E402
+import fakedriver  # noqa: E402
+
+# Size of the synthetic fixture the export tests run against (see fakedriver.write_synthetic_fixture)
+FIXTURE_CHATS = 3
+FIXTURE_MESSAGES = 300
+FIXTURE_SEED = 1
+
+# The export time in the file name of a chat export (see whatsoup.export_file_name)
+EXPORT_TIME = re.compile(r' - \d{4}-\d{2}-\d{2} \d{2}\.\d{2}\.\d{2}\.[AP]M(?=\.\w+$)')
+
+
+@pytest.fixture(autouse=True)
+def work_dir(tmp_path, monkeypatch):
+    '''Runs each test in a directory of its own, since checkpoints are saved relative to it, and w/o find_selected_chat's fixed 2 second wait for focus, which the fake driver doesn't need'''
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(whatsoup, 'sleep', lambda seconds: None)
+    return tmp_path
+
+
+@pytest.fixture
+def write_fixture(tmp_path):
+    '''Returns a function that (re)writes the FakeDriver fixture of generated chats w/ the given number of messages per chat and returns its directory. A fixture's chats start w/ the messages of the same chats w/ fewer messages, as if those were sent since.'''
+
+    def write_fixture(messages=FIXTURE_MESSAGES):
+        fixture_dir = str(tmp_path / 'fixture')
+        fakedriver.write_synthetic_fixture(fixture_dir, FIXTURE_CHATS, messages, FIXTURE_SEED)
+        return fixture_dir
+
+    return write_fixture
+
+
+@pytest.fixture
+def fixture_dir(write_fixture):
+    '''Writes the FakeDriver fixture of generated chats and returns its directory'''
+
+    return write_fixture()
+
+
+@pytest.fixture
+def export(fixture_dir, tmp_path):
+    '''Returns a function that exports chats from the fixture (or another one) like 'fakedriver.py replay' does, w/ the FakeDriver's batch_size, latency and max_rows plus any options of whatsoup.export_chats, and returns the exports (see read_export_dir)'''
+
+    def export(export_dir, selectors=('all',), export_formats=('txt', 'csv', 'html'), batch_size=50, latency=0.0, max_rows=None, replayed_fixture=None, **options):
+        export_dir = str(tmp_path / export_dir)
+        driver = open_fake_driver(replayed_fixture or fixture_dir, batch_size, latency, max_rows)
+        whatsoup.export_dir_setup(export_dir)
+        assert whatsoup.export_chats(driver, list(selectors), list(export_formats), export_dir, **options) == 0
+        return read_export_dir(export_dir)
+
+    return export
+
+
+@pytest.fixture
+def full_export(fixture_dir, tmp_path):
+    '''Scrapes the fixture's recorded pages w/o a browser (see whatsoup.parse_page) and exports them in full to txt, csv and html, which every way of exporting them should match. Returns the exports (see read_export_dir).'''
+
+    export_dir = str(tmp_path / 'full')
+    whatsoup.export_dir_setup(export_dir)
+    for chat in fakedriver.FakeDriver(fixture_dir).chats:
+        scraped = whatsoup.parse_page(os.path.join(fixture_dir, chat['page']))
+        for export_format in ('txt', 'csv', 'html'):
+            assert whatsoup.export_chat(chat['name'], scraped, export_format, export_dir=export_dir)
+    return read_export_dir(export_dir)
+
+
+@pytest.fixture
+def fake_driver(fixture_dir):
+    '''Returns a function that opens a FakeDriver for the fixture w/ the given batch_size, latency and max_rows (see open_fake_driver)'''
+
+    return partial(open_fake_driver, fixture_dir)
+
+
+@pytest.fixture
+def read_exports():
+    '''Returns read_export_dir, for tests that export w/o the export fixture'''
+
+    return read_export_dir
+
+
+def open_fake_driver(fixture_dir, batch_size=50, latency=0.0, max_rows=None):
+    '''Returns a FakeDriver for the fixture w/ WhatsApp loaded'''
+
+    driver = fakedriver.FakeDriver(fixture_dir, batch_size, latency, max_rows)
+    assert whatsoup.whatsapp_is_loaded(driver, interactive=False)
+    return driver
+
+
+def read_export_dir(export_dir):
+    '''Returns the contents of the chat exports in the export directory by file name, leaving out the export time so exports made at different times compare equal'''
+
+    exports = {}
+    for file_name in sorted(os.listdir(export_dir)):
+        if file_name.startswith('WhatsApp Chat with'):
+            with open(os.path.join(export_dir, file_name), 'rb') as export_file:
+                exports[EXPORT_TIME.sub('', file_name)] = export_file.read()
+    return exports
@@ -0,0 +1,64 @@
+import io
+import contextlib
+from collections import Counter
+
+import whatsoup
+import benchmark
+import synthetic_chat
+
+
+def scrape(html, engine='bs4'):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return whatsoup.resolve_messages(whatsoup.scrape_page_rows(html, engine))
+
+
+def test_same_seed_generates_same_chat():
+    assert synthetic_chat.generate_chat_html(200, seed=5) == synthetic_chat.generate_chat_html(200, seed=5)
+    assert synthetic_chat.generate_chat_html(200, seed=5) != synthetic_chat.generate_chat_html(200, seed=6)
+
+
+def test_longer_chat_continues_shorter_one():
+    # A chat w/ more messages is the same chat w/ new messages at the end, which incremental export tests rely on
+    shorter = synthetic_chat.generate_chat_html(150, seed=7)
+    longer = synthetic_chat.generate_chat_html(250, seed=7)
+    assert longer.startswith(shorter[:-len(synthetic_chat.PAGE_TAIL)])
+
+
+def test_written_chat_matches_generated_one(tmp_path):
+    path = tmp_path / 'chat.html'
+    synthetic_chat.write_chat_html(path, 300, seed=3, chat='Soup & Co')
+    assert path.read_text(encoding='utf-8') == synthetic_chat.generate_chat_html(300, seed=3, chat='Soup & Co')
+
+
+def test_every_generated_message_is_scraped():
+    messages = scrape(synthetic_chat.generate_chat_html(1000, seed=2))
+
+    # Grouped stickers are scraped as a message per sticker, all w/ the data-id of their row
+    data_ids = Counter(message.data_id for message in messages)
+    assert len(data_ids) == 1000
+    assert all(count == 2 for data_id, count in data_ids.items() if data_id.endswith('_grouped-sticker'))
+    assert all(message.datetime and message.sender for message in messages)
+    assert [message.datetime for message in messages] == sorted(message.datetime for message in messages)
+
+    # Every kind of message is generated and scraped as such
+    kinds = Counter((message.has_media, message.has_recall, message.has_emoji_text) for message in messages)
+    assert kinds[(True, False, False)] and kinds[(False, True, False)] and kinds[(False, False, True)]
+
+
+def test_benchmark_stages_run():
+    html = synthetic_chat.generate_chat_html(100)
+    for stage, run in benchmark.benchmark_stages(html, benchmark.BENCHMARK_STAGES):
+        with contextlib.redirect_stdout(io.StringIO()):
+            run()
+
+
+def test_regressions_beyond_threshold():
+    baseline = {'parse-lxml/1000': {'messages_per_second': 10000, 'peak_memory_mib': 10},
+                'export-txt/1000': {'messages_per_second': 10000, 'peak_memory_mib': 0.5}}
+    results = {'parse-lxml/1000': {'messages_per_second': 7000, 'peak_memory_mib': 13},
+               'export-txt/1000': {'messages_per_second': 8000, 'peak_memory_mib': 1.2},
+               'group/1000': {'messages_per_second': 1, 'peak_memory_mib': 100}}
+
+    # Only stages w/ a baseline are compared, and memory growth under 1 MiB is ignored
+    assert benchmark.find_regressions(results, baseline) == {'parse-lxml/1000': 'throughput & memory'}
+    assert benchmark.find_regressions(results, baseline, threshold=0.5) == {}
@@ -0,0 +1,63 @@
+from time import sleep
+
+import pytest
+
+import whatsoup
+import fakedriver
+
+
+def test_export_matches_full_export(export, full_export):
+    assert export('exports') == full_export
+
+
+def test_incremental_export_matches_full_export(export, full_export, write_fixture):
+    # Export the chats, then again once new messages were sent and again w/o any new ones, appending to the same files each time
+    write_fixture(messages=200)
+    export('exports', incremental=True)
+    write_fixture()
+    export('exports', incremental=True)
+    assert export('exports', incremental=True) == full_export
+
+
+def test_incremental_export_catches_up_each_format(export, full_export, write_fixture):
+    # A format exported for the first time gets the whole chat, while the others only get the new messages
+    write_fixture(messages=200)
+    export('exports', export_formats=['txt'], incremental=True)
+    write_fixture()
+    assert export('exports', incremental=True) == full_export
+
+
+def test_pipelined_export_keeps_chat_order():
+    # The exporter exports the chats in the order they loaded, even when it's slower than loading them
+    def capture(driver, selected_chat):
+        if selected_chat == 'Missing':
+            return None, "chat could not be found"
+        return (selected_chat, None), None
+
+    def export_captured(selected_chat, captured):
+        sleep(0.01)
+        if selected_chat == 'Broken':
+            raise ValueError("broken chat")
+        return 1, None
+
+    selected_chats = ['Chat 1', 'Missing', 'Chat 2', 'Broken', 'Chat 3', 'Chat 4']
+    results = whatsoup.export_chats_pipelined(None, selected_chats, capture, export_captured)
+
+    # Chats that fail to load are done right away, the rest once exported, and a chat failing doesn't stop the others
+    exported = [(selected_chat, result) for selected_chat, result in results if selected_chat != 'Missing']
+    assert exported == [('Chat 1', (1, None)), ('Chat 2', (1, None)), ('Broken', (0, 'broken chat')),
+                        ('Chat 3', (1, None)), ('Chat 4', (1, None))]
+    assert ('Missing', (0, "chat could not be found")) in results
+
+
+@pytest.mark.parametrize('workers', [2, 3])
+def test_parallel_export_matches_full_export(export, full_export, fixture_dir, tmp_path, monkeypatch, workers):
+    # Every worker gets a browser of its own on the same fixture
+    def copy_chrome_profile(worker):
+        chrome_profile = tmp_path / f'profile-{worker}' / f'worker-{worker}'
+        chrome_profile.mkdir(parents=True)
+        return str(chrome_profile)
+
+    monkeypatch.setattr(whatsoup, 'copy_chrome_profile', copy_chrome_profile)
+    monkeypatch.setattr(whatsoup, 'setup_selenium', lambda chrome_profile=None: fakedriver.FakeDriver(fixture_dir))
+    assert export('exports', workers=workers) == full_export
@@ -0,0 +1,82 @@
+import os
+import sys
+
+import pytest
+
+import whatsoup
+import fakedriver
+
+
+@pytest.mark.parametrize('options', [
+    {'engine': 'lxml'},
+    {'stream': True},
+    {'stream': True, 'engine': 'lxml', 'batch_size': 70},
+    {'stream': True, 'max_rows': 120},
+    {'in_browser': True},
+    {'checkpoint': True, 'max_rows': 60},
+    {'chat_list': 'script'},
+], ids=lambda options: ','.join(f"{key}={value}" for key, value in options.items()))
+def test_replay_matches_full_export(export, full_export, options):
+    assert export('exports', **options) == full_export
+
+
+def test_replay_of_selected_chats(export, full_export):
+    exports = export('exports', selectors=['1', 'Carol Danvers 3'])
+    assert exports == {file_name: contents for file_name, contents in full_export.items()
+                       if 'Alice Liddell 2' not in file_name}
+
+
+def test_chat_list_modes_agree(fixture_dir, fake_driver):
+    with_keys = whatsoup.get_chats(fake_driver(), interactive=False, chat_list='keys')
+    with_script = whatsoup.get_chats(fake_driver(), interactive=False, chat_list='script')
+    assert with_keys == with_script
+    assert [chat['name'] for chat in with_keys] == [chat['name'] for chat in fakedriver.FakeDriver(fixture_dir).chats]
+
+
+def test_streaming_skips_page_source(fake_driver):
+    # Streaming scrapes each batch as it loads, so the whole page source never has to be fetched
+    def export_commands(**options):
+        driver = fake_driver()
+        assert whatsoup.export_chats(driver, ['1'], ['txt'], 'exports', **options) == 0
+        return driver.commands
+
+    assert export_commands()['page_source'] == 1
+    assert export_commands(stream=True)['page_source'] == 0
+
+
+def test_checkpoint_resumes_interrupted_load(export, full_export, fake_driver):
+    # No more messages load after a few batches, as if the connection dropped, so loading times out and is aborted w/ a checkpoint left behind
+    driver = fake_driver(max_rows=60)
+    scroll_and_wait = driver.scroll_and_wait
+    batches = []
+
+    def interrupted_scroll_and_wait(message_list, timeout):
+        batches.append(timeout)
+        return scroll_and_wait(message_list, timeout) if len(batches) <= 2 else driver.load_state(timeout)
+
+    driver.scroll_and_wait = interrupted_scroll_and_wait
+    assert whatsoup.find_selected_chat(driver, 'Bob Ross 1')
+    assert whatsoup.load_and_scrape_chat(driver, 'Bob Ross 1', load_timeout=0.5, timeout_policy='abort', checkpoint=True) == (None, None)
+    assert os.path.isfile(whatsoup.checkpoint_path('Bob Ross 1'))
+
+    # The next export picks up the checkpoint, and deletes it once the chat is exported
+    assert export('exports', selectors=['1'], checkpoint=True, max_rows=60) == {
+        file_name: contents for file_name, contents in full_export.items() if 'Bob Ross 1' in file_name}
+    assert not os.path.isfile(whatsoup.checkpoint_path('Bob Ross 1'))
+
+
+def test_recorded_fixture_replays_like_original(export, full_export, fake_driver, tmp_path):
+    recorded_fixture = str(tmp_path / 'recorded')
+    fakedriver.record_fixture(fake_driver(), recorded_fixture)
+    assert export('exports', replayed_fixture=recorded_fixture) == full_export
+
+
+def test_replay_command(fixture_dir, full_export, read_exports, monkeypatch):
+    monkeypatch.setattr(sys, 'argv', ['fakedriver.py', 'replay', fixture_dir, '--format', 'txt', 'csv', 'html',
+                                      '--output', 'replayed', '--stream', '--profile-output', 'profile.json'])
+    with pytest.raises(SystemExit) as exit_info:
+        fakedriver.cli()
+
+    assert exit_info.value.code == 0
+    assert os.path.isfile('profile.json')
+    assert read_exports('replayed') == full_export
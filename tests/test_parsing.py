@@ -0,0 +1,54 @@
+import io
+import os
+import contextlib
+
+import pytest
+
+import whatsoup
+import fakedriver
+import synthetic_chat
+
+
+def scrape_rows(page_source, engine='bs4'):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return [whatsoup.row_to_json(row) for row in whatsoup.resolve_messages(whatsoup.scrape_page_rows(page_source, engine))]
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_engines_agree_on_generated_chats(seed):
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert whatsoup.check_engine_parity(synthetic_chat.generate_chat_html(1000, seed)) == []
+
+
+def test_engines_agree_on_fixture_pages(fixture_dir):
+    for chat in fakedriver.FakeDriver(fixture_dir).chats:
+        with contextlib.redirect_stdout(io.StringIO()):
+            assert whatsoup.check_engine_parity(os.path.join(fixture_dir, chat['page'])) == []
+
+
+@pytest.mark.parametrize('engine', whatsoup.PARSING_ENGINES)
+def test_engines_scrape_same_export(engine):
+    page_source = synthetic_chat.generate_chat_html(500, seed=4)
+    assert scrape_rows(page_source, engine) == scrape_rows(page_source, 'bs4')
+
+
+@pytest.mark.parametrize('engine', whatsoup.PARSING_ENGINES)
+def test_page_without_chat_is_rejected(engine):
+    with pytest.raises(ValueError):
+        whatsoup.scrape_page_rows(fakedriver.PAGE_HTML, engine)
+
+
+def test_unknown_engine_is_rejected():
+    with pytest.raises(ValueError):
+        whatsoup.scrape_page_rows(synthetic_chat.generate_chat_html(10), 'html5lib')
+
+
+@pytest.mark.parametrize('engine', whatsoup.PARSING_ENGINES)
+def test_parallel_scrape_keeps_row_order(engine, monkeypatch):
+    # Scrape a chat large enough to be split into many chunks, whose rows must come back in page order w/ dates and senders carried over chunk boundaries
+    page_source = synthetic_chat.generate_chat_html(1200, seed=6)
+    expected = scrape_rows(page_source, engine)
+
+    monkeypatch.setattr(whatsoup, 'PARALLEL_MIN_ROWS', 100)
+    monkeypatch.setitem(whatsoup.parsing_settings, 'processes', 2)
+    assert scrape_rows(page_source, engine) == expected
@@ -1,22 +1,584 @@
 import os
+import re
+import sys
 import csv
+import json
+import base64
+import sqlite3
+import shutil
+import hashlib
+import mimetypes
+import argparse
+import tempfile
+import threading
+import multiprocessing
+
+import lxml.html
 
 from bs4 import BeautifulSoup
+from html import escape
 from time import sleep
-from datetime import datetime
+from datetime import datetime, timedelta
 from selenium import webdriver
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions
 from selenium.webdriver.common.by import By
-from selenium.common.exceptions import TimeoutException, NoSuchElementException, StaleElementReferenceException, ElementNotInteractableException
+from selenium.common.exceptions import TimeoutException, NoSuchElementException, StaleElementReferenceException, ElementNotInteractableException, WebDriverException
 from prettytable import PrettyTable
 from dotenv import load_dotenv
 from timeit import default_timer as timer
+from itertools import zip_longest, islice
+from collections import deque
+from functools import partial, lru_cache, wraps
+from contextlib import contextmanager, nullcontext
+from queue import Queue, Empty
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from lxml import etree
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows, where profiles leave out the Python process's peak memory
+    resource = None
+
+
+# Export formats supported by export_chat
+EXPORT_FORMATS = ('txt', 'csv', 'html', 'sqlite')
+
+# Parsing engines supported by scrape_page_rows: BeautifulSoup is the reference, lxml works directly on lxml.html trees
+PARSING_ENGINES = ('bs4', 'lxml')
+
+
+# Marks the 'Message list' rows that haven't been harvested yet and returns them as [data-id, outerHTML, is_older], skipping the 'load earlier messages' row. The HTML of messages set by SET_KNOWN_IDS_SCRIPT is left out.
+HARVEST_ROWS_SCRIPT = '''
+const rows = [];
+let isOlder = true;
+for (const row of arguments[0].children) {
+    const dataId = row.getAttribute('data-id');
+    if (row.hasAttribute('data-whatsoup-harvested')) {
+        if (dataId) {
+            isOlder = false;
+        }
+        continue;
+    }
+    if (!dataId && (row.getAttribute('title') || '').includes('load')) {
+        continue;
+    }
+    const isKnown = dataId && window.whatsoupKnownIds && window.whatsoupKnownIds.has(dataId);
+    rows.push([dataId, isKnown ? null : row.outerHTML, isOlder]);
+    row.setAttribute('data-whatsoup-harvested', '');
+}
+return rows;
+'''
+
+
+# Scrapes a page of 'Message list' rows in the browser (arguments: message list element, first row, number of rows) and returns {total: <row count>, rows: [<record>]}, see scrape_record. Mirrors scrape_row/scrape_message.
+EXTRACT_ROWS_SCRIPT = '''
+const [messageList, start, count, markers] = arguments;
+
+// Port of extract_rich_text, w/ markers being RICH_TEXT_MARKERS when formatting is kept as markdown and null otherwise (adjacent text nodes are merged like in the page source)
+const richText = (element, hasEmoji) => {
+    if (!markers && !hasEmoji) {
+        return element.textContent;
+    }
+    const parts = [];
+    let text = '';
+    let afterEmoji = false;
+    const flush = () => {
+        if (text && !(hasEmoji && afterEmoji && text === ' ')) {
+            parts.push(text);
+        }
+        text = '';
+    };
+    const visit = (element) => {
+        for (const node of element.childNodes) {
+            if (node.nodeType === Node.TEXT_NODE) {
+                text += node.data;
+                continue;
+            }
+            flush();
+            if (node.nodeType !== Node.ELEMENT_NODE) {
+                continue;
+            }
+            const tag = node.nodeName.toLowerCase();
+            afterEmoji = tag === 'img';
+            if (tag === 'img') {
+                parts.push(node.getAttribute('alt') || '');
+            } else if (markers && markers.hasOwnProperty(tag)) {
+                parts.push(markers[tag]);
+                visit(node);
+                parts.push(markers[tag]);
+            } else if (markers && tag === 'a' && node.getAttribute('href')) {
+                const linkStart = parts.length;
+                visit(node);
+                const linkText = parts.splice(linkStart).join('');
+                const href = node.getAttribute('href');
+                parts.push(href.includes(linkText) ? linkText : `[${linkText}](${href})`);
+            } else {
+                visit(node);
+            }
+        }
+        flush();
+        afterEmoji = false;
+    };
+    visit(element);
+    return parts.join('');
+};
+
+const isMedia = (row, copyable) => {
+    for (const element of row.querySelectorAll('[data-testid]')) {
+        const testid = element.getAttribute('data-testid');
+        if (testid.includes('media') || testid.includes('download')) {
+            return true;
+        }
+    }
+    if (row.getAttribute('class')) {
+        if (copyable) {
+            for (const button of copyable.querySelectorAll('div[role="button"]')) {
+                const sibling = button.nextSibling;
+                if ((button.getAttribute('title') || '').includes('Message') && sibling && sibling.nodeType === Node.ELEMENT_NODE && sibling.getAttribute('title') === 'Add to a group') {
+                    return true;
+                }
+            }
+        }
+        if ((row.getAttribute('data-id') || '').includes('grouped-sticker')) {
+            return true;
+        }
+        for (const image of row.querySelectorAll('img')) {
+            if ((image.getAttribute('src') || '').includes('blob')) {
+                return true;
+            }
+        }
+    }
+    return false;
+};
+
+const mediaSender = (row) => {
+    for (const span of row.querySelectorAll('span')) {
+        const label = span.getAttribute('aria-label');
+        if (label) {
+            if (label !== 'Voice message') {
+                return label.slice(0, -1);
+            }
+        } else if (span.querySelector('img')) {
+            return richText(row.querySelector("div[class*='color']").firstChild, true);
+        }
+    }
+    return null;
+};
+
+const scrapeRow = (row) => {
+    const dataId = row.getAttribute('data-id');
+    if (!(row.getAttribute('class') || '').includes('message')) {
+        return row.nodeName === 'DIV' && dataId === null ? {divider: row.textContent} : null;
+    }
+
+    const classes = Array.from(row.classList);
+    const copyable = row.querySelector('div.copyable-text');
+    const record = {
+        id: dataId, classes: classes, copyable: copyable !== null, pre: null, content: null, text: null,
+        emoji: false, recall: false, media: false, spans: null, sender: null
+    };
+    if (copyable) {
+        record.pre = copyable.getAttribute('data-pre-plain-text');
+        const content = copyable.querySelector('span.copyable-text');
+        record.content = content ? richText(content, false) : '';
+        const selectable = copyable.querySelector('span.selectable-text') || copyable.querySelector('div.selectable-text');
+        if (selectable) {
+            record.emoji = selectable.querySelector('img') !== null;
+            record.text = richText(selectable, record.emoji);
+        }
+    }
+    record.recall = row.querySelector('span[data-testid="recalled"]') !== null;
+    record.media = isMedia(row, copyable);
+    if (record.recall || (record.media && !copyable)) {
+        record.spans = Array.from(row.querySelectorAll('span'), (span) => span.textContent);
+    }
+    if (record.media && !copyable && classes.includes('message-in') && !classes.includes('message-out')) {
+        record.sender = mediaSender(row);
+    }
+    return record;
+};
+
+const children = Array.from(messageList.children);
+return {total: children.length, rows: children.slice(start, start + count).map(scrapeRow)};
+'''
+
+
+# Scrolls to the top of the message list (arguments: message list element, max wait in ms) and waits for newly loaded messages to grow its scroll height. Calls back w/ {height: <scroll height>, loading: <'load earlier messages' row title>, elapsed: <seconds waited>, memory: <[used, limit] bytes of the tab's JS heap, or null if the browser doesn't tell>}.
+SCROLL_AND_WAIT_SCRIPT = '''
+const [messageList, timeout] = arguments;
+const done = arguments[arguments.length - 1];
+const start = performance.now();
+const startHeight = messageList.scrollHeight;
+let finished = false;
+let timer = null;
+const observer = new MutationObserver(() => {
+    if (messageList.scrollHeight > startHeight) {
+        finish();
+    }
+});
+const finish = () => {
+    if (finished) {
+        return;
+    }
+    finished = true;
+    observer.disconnect();
+    clearTimeout(timer);
+    const marker = messageList.querySelector(':scope > div');
+    done({
+        height: messageList.scrollHeight,
+        loading: (marker && marker.getAttribute('title')) || '',
+        elapsed: (performance.now() - start) / 1000,
+        memory: performance.memory ? [performance.memory.usedJSHeapSize, performance.memory.jsHeapSizeLimit] : null
+    });
+};
+observer.observe(messageList, {childList: true, subtree: true});
+timer = setTimeout(finish, timeout);
+messageList.scrollIntoView();
+'''
+
+# What load_selected_chat does when no messages load in time: ask the user, abort the load, or finish w/ the messages loaded so far
+TIMEOUT_POLICIES = ('prompt', 'abort', 'finish')
+
+
+# Sets the data-ids of messages HARVEST_ROWS_SCRIPT doesn't need to send the HTML of (arguments: list of data-ids)
+SET_KNOWN_IDS_SCRIPT = '''
+window.whatsoupKnownIds = new Set(arguments[0]);
+'''
+
+# Seconds between saving checkpoints while streaming a chat
+CHECKPOINT_INTERVAL = 30
+
+# Loaded chats that may wait to be scraped and exported while the browser loads the next chat (see export_chats_pipelined), as each one holds its whole page source or messages in memory
+PIPELINE_DEPTH = 2
+
+# How WhatsApp shows dates/times for each language setting (see register_datetime_locale), as (strptime format, equivalent regex) pairs for full date/times and for times
+DATETIME_LOCALES = {}
+
+# Which of DATETIME_LOCALES parse_datetime uses, and which of its date/time formats to try first (the index of the one the chats turned out to use, see detect_datetime_format)
+datetime_settings = {'locale': 'en_US', 'datetime_format': None}
+
+# Fetches the media of the messages w/ the given data-ids from the page (arguments: message list element, data-ids, max bytes per call). Only media the page holds as blob URLs can be fetched, i.e. stickers, voice messages and the photos/videos WhatsApp has downloaded. Calls back w/ {<data-id>: [{type: <MIME type>, data: <base64 encoded bytes>}, ...] or null if the row is no longer on the page}, leaving out the data-ids it didn't get to once max bytes were fetched.
+FETCH_MEDIA_SCRIPT = '''
+const [messageList, ids, maxBytes, done] = arguments;
+
+const mediaUrls = (row) => {
+    const urls = new Set();
+    for (const element of row.querySelectorAll('img[src^="blob:"], video[src^="blob:"], audio[src^="blob:"], source[src^="blob:"]')) {
+        urls.add(element.getAttribute('src'));
+    }
+    for (const element of row.querySelectorAll('[style*="blob:"]')) {
+        const match = element.getAttribute('style').match(/url\\("?(blob:[^")]+)/);
+        if (match) {
+            urls.add(match[1]);
+        }
+    }
+    return Array.from(urls);
+};
+
+const readBase64 = (blob) => new Promise((resolve, reject) => {
+    const reader = new FileReader();
+    reader.onload = () => resolve(reader.result.slice(reader.result.indexOf(',') + 1));
+    reader.onerror = () => reject(reader.error);
+    reader.readAsDataURL(blob);
+});
+
+(async () => {
+    const media = {};
+    let bytes = 0;
+    for (const id of ids) {
+        if (bytes >= maxBytes) {
+            break;
+        }
+        const row = messageList.querySelector(`:scope > [data-id="${CSS.escape(id)}"]`);
+        if (!row) {
+            media[id] = null;
+            continue;
+        }
+        media[id] = [];
+        for (const url of mediaUrls(row)) {
+            try {
+                const blob = await (await fetch(url)).blob();
+                bytes += blob.size;
+                media[id].push({type: blob.type, data: await readBase64(blob)});
+            } catch (error) {
+                // Skip blob URLs WhatsApp has already revoked
+            }
+        }
+    }
+    done(media);
+})();
+'''
+
+# Directory of the media store inside the export directory, where every fetched file is named by the SHA-256 hash of its contents, so files that are sent more than once (e.g. stickers, forwarded photos) are only stored once
+MEDIA_DIR = 'media'
+
+# Messages whose media is fetched from the page at a time, and the bytes after which a fetch stops early, so fetching media never holds up loading the chat for long
+MEDIA_BATCH_SIZE = 20
+MEDIA_BATCH_BYTES = 16 * 1024 * 1024
+
+# Threads that write fetched media to the media store
+MEDIA_WORKERS = 4
+
+# What a message w/ stored media says in place of '<Media omitted>', like WhatsApp's own exports that include media, and the pattern export_html links those files w/
+MEDIA_ATTACHED = "{path} (file attached)"
+MEDIA_ATTACHED_PATTERN = re.compile(rf"({MEDIA_DIR}/[0-9a-f]{{2}}/[0-9a-f]{{64}}(?:\.\w+)?) \(file attached\)")
+
+# Whether message text keeps its bold/italic/strikethrough/monospace formatting and links as markdown (see extract_rich_text)
+text_settings = {'markdown': False}
+
+# Processes scrape_page_rows scrapes a page's rows in (see scrape_page_rows_in_parallel), 1 scrapes them in this process
+parsing_settings = {'processes': 1}
+
+# Rows a page needs before scraping it in parallel pays for starting the processes, and the chunks per process its rows are split into so processes that finish early pick up more work
+PARALLEL_MIN_ROWS = 2000
+PARALLEL_CHUNKS_PER_PROCESS = 4
+
+# WhatsApp's formatting markers, by the element it renders formatted message text w/, which are put around the text when it's kept as markdown
+RICH_TEXT_MARKERS = {'strong': '*', 'b': '*', 'em': '_', 'i': '_', 'del': '~', 's': '~', 'code': '```'}
+
+# How setup_selenium sets up Chrome: lean (see lean_browser_setup) and/or headless, which only works once the Chrome profile is logged in to WhatsApp
+browser_settings = {'lean': False, 'headless': False}
+
+# Chrome flags of the lean browser, which keep WhatsApp running at full speed while its window is in the background
+LEAN_BROWSER_ARGUMENTS = ['--disable-background-timer-throttling', '--disable-backgrounding-occluded-windows',
+                          '--disable-renderer-backgrounding', '--force-prefers-reduced-motion']
+
+# URLs the lean browser doesn't download: media, stickers and profile pictures from WhatsApp's media servers, and images/audio/video in general (emoji are scraped from their alt text, so they're not needed either)
+LEAN_BLOCKED_URLS = ['*://mmg.whatsapp.net/*', '*://media*.whatsapp.net/*', '*://pps.whatsapp.net/*',
+                     '*.jpg*', '*.jpeg*', '*.png*', '*.gif*', '*.webp*', '*.mp4*', '*.ogg*', '*.opus*']
+
+# Turns off CSS animations and transitions in every page the lean browser opens
+LEAN_PAGE_SCRIPT = '''
+document.addEventListener('DOMContentLoaded', () => {
+    const style = document.createElement('style');
+    style.textContent = '*, *::before, *::after { animation: none !important; transition: none !important; scroll-behavior: auto !important; }';
+    document.head.appendChild(style);
+});
+'''
+
+# Shares of the tab's JS heap limit at which load_selected_chat warns that the tab is running out of memory
+MEMORY_WARNING_LEVELS = (0.75, 0.9)
+
+# How get_chats collects the chat list: moving down it w/ the keyboard, or scrolling it w/ HARVEST_CHATS_SCRIPT
+CHAT_LIST_MODES = ('keys', 'script')
+
+# Scrolls down the chat-pane (arguments: start over from the top, max scroll steps, ms to wait for rows to render after each step) collecting the chat rows it hasn't collected yet, using the same relative xpaths as get_chats. Calls back w/ {chats: [{name, time, title, text}] in chat list order, done: <reached the bottom>}.
+HARVEST_CHATS_SCRIPT = '''
+const [reset, maxSteps, wait] = arguments;
+const done = arguments[arguments.length - 1];
+const pane = document.getElementById('pane-side');
+if (reset || !window.whatsoupChatOffsets) {
+    window.whatsoupChatOffsets = new Set();
+    pane.scrollTop = 0;
+}
+const seen = window.whatsoupChatOffsets;
+const find = (xpath, row) => document.evaluate(xpath, row, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+
+const collect = (chats) => {
+    const paneTop = pane.getBoundingClientRect().top;
+    for (const row of pane.querySelectorAll('[tabindex]')) {
+        const title = find('./div/div[2]/div/div[1]', row);
+        const time = find('./div/div[2]/div/div[2]', row);
+        const message = find('./div/div[2]/div[2]/div', row);
+        const nameSpan = title && Array.from(title.getElementsByTagName('span')).find((span) => span.title);
+        if (!nameSpan || !time || !message) {
+            continue;
+        }
 
-
-def main():
+        // Rows are recycled as the pane scrolls, so a row is identified by its offset from the top of the list
+        const offset = Math.round(row.getBoundingClientRect().top - paneTop + pane.scrollTop);
+        if (seen.has(offset)) {
+            continue;
+        }
+        seen.add(offset);
+        const messageSpan = message.getElementsByTagName('span')[0];
+        chats.push({
+            offset: offset,
+            name: nameSpan.title,
+            time: time.innerText,
+            title: (messageSpan && messageSpan.getAttribute('title')) || '',
+            text: (messageSpan && messageSpan.innerText) || ''
+        });
+    }
+};
+
+const chats = [];
+let steps = 0;
+const step = () => {
+    collect(chats);
+    const scrollTop = pane.scrollTop;
+    pane.scrollTop += pane.clientHeight * 0.8;
+    steps += 1;
+    const atBottom = pane.scrollTop === scrollTop;
+    if (atBottom || steps >= maxSteps) {
+        if (atBottom) {
+            pane.scrollTop = 0;
+        }
+        chats.sort((a, b) => a.offset - b.offset);
+        done({chats: chats, done: atBottom});
+        return;
+    }
+    setTimeout(step, wait);
+};
+step();
+'''
+
+# Scrolls the chat-pane back to the top after collecting only part of it
+SCROLL_CHAT_PANE_TO_TOP_SCRIPT = '''
+document.getElementById('pane-side').scrollTop = 0;
+'''
+
+# File in the exports directory w/ the chat list of the last run, which the next run reuses while the chat-pane still matches it (see load_chats)
+CHAT_LIST_CACHE_FILE = 'chat_list.json'
+
+# Chat-pane rows in a row that must match the cached chat list before the rest of it is reused, which also makes the top rows a fingerprint of the whole list
+CHAT_LIST_FINGERPRINT_ROWS = 10
+
+# Columns of csv and html exports
+EXPORT_FIELDS = ['Date', 'Time', 'Sender', 'Message']
+
+# Archive database of sqlite exports in the exports directory, its tables, and how messages are upserted
+SQLITE_ARCHIVE_FILE = 'WhatsApp Chats.sqlite'
+SQLITE_ARCHIVE_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS chats (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    exported TEXT
+);
+CREATE TABLE IF NOT EXISTS senders (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY,
+    chat_id INTEGER NOT NULL REFERENCES chats (id),
+    data_id TEXT NOT NULL,
+    part INTEGER NOT NULL DEFAULT 0,
+    datetime TEXT NOT NULL,
+    sender_id INTEGER REFERENCES senders (id),
+    message TEXT,
+    has_media INTEGER NOT NULL,
+    has_recall INTEGER NOT NULL,
+    has_emoji_text INTEGER NOT NULL,
+    UNIQUE (data_id, part)
+);
+CREATE INDEX IF NOT EXISTS messages_chat_datetime ON messages (chat_id, datetime);
+CREATE INDEX IF NOT EXISTS messages_sender ON messages (sender_id);
+'''
+SQLITE_UPSERT_MESSAGE = '''
+INSERT INTO messages (chat_id, data_id, part, datetime, sender_id, message, has_media, has_recall, has_emoji_text)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (data_id, part) DO UPDATE SET
+    chat_id = excluded.chat_id, datetime = excluded.datetime, sender_id = excluded.sender_id, message = excluded.message,
+    has_media = excluded.has_media, has_recall = excluded.has_recall, has_emoji_text = excluded.has_emoji_text
+WHERE messages.chat_id IS NOT excluded.chat_id OR messages.datetime IS NOT excluded.datetime OR messages.sender_id IS NOT excluded.sender_id
+    OR messages.message IS NOT excluded.message OR messages.has_media IS NOT excluded.has_media OR messages.has_recall IS NOT excluded.has_recall
+    OR messages.has_emoji_text IS NOT excluded.has_emoji_text
+'''
+
+# Full-text search index of the archive's messages, which triggers keep up to date as messages are added or change (unchanged messages aren't updated, so they aren't re-indexed either)
+SQLITE_SEARCH_SCHEMA = '''
+CREATE VIRTUAL TABLE IF NOT EXISTS messages_search USING fts5 (message, content = 'messages', content_rowid = 'id');
+CREATE TRIGGER IF NOT EXISTS messages_search_insert AFTER INSERT ON messages BEGIN
+    INSERT INTO messages_search (rowid, message) VALUES (new.id, new.message);
+END;
+CREATE TRIGGER IF NOT EXISTS messages_search_delete AFTER DELETE ON messages BEGIN
+    INSERT INTO messages_search (messages_search, rowid, message) VALUES ('delete', old.id, old.message);
+END;
+CREATE TRIGGER IF NOT EXISTS messages_search_update AFTER UPDATE OF message ON messages BEGIN
+    INSERT INTO messages_search (messages_search, rowid, message) VALUES ('delete', old.id, old.message);
+    INSERT INTO messages_search (rowid, message) VALUES (new.id, new.message);
+END;
+INSERT INTO messages_search (messages_search) VALUES ('rebuild');
+'''
+SQLITE_SEARCH_QUERY = '''
+SELECT chats.name, messages.datetime, senders.name, snippet(messages_search, 0, '[', ']', '...', 12)
+FROM messages_search
+JOIN messages ON messages.id = messages_search.rowid
+JOIN chats ON chats.id = messages.chat_id
+LEFT JOIN senders ON senders.id = messages.sender_id
+WHERE messages_search MATCH :query
+    AND (:chat IS NULL OR chats.name = :chat)
+    AND (:sender IS NULL OR senders.name = :sender)
+    AND (:since IS NULL OR messages.datetime >= :since)
+    AND (:until IS NULL OR messages.datetime < :until)
+ORDER BY rank
+LIMIT :limit
+'''
+
+# Messages inserted into the archive database per executemany
+SQLITE_BATCH_SIZE = 10000
+
+# Bytes buffered before an export is written to disk
+EXPORT_BUFFER_SIZE = 1024 * 1024
+
+# What html exports start and end w/, around a table row per message (see html_export_row)
+HTML_EXPORT_HEAD = "<table>\n    <thead>\n        <tr>" + "".join(
+    f"\n            <th>{field}</th>" for field in EXPORT_FIELDS) + "\n        </tr>\n    </thead>\n    <tbody>"
+HTML_EXPORT_TAIL = "\n    </tbody>\n</table>"
+
+# File in the exports directory w/ the newest exported message of each chat, which incremental exports continue from
+WATERMARKS_FILE = 'watermarks.json'
+watermarks_lock = threading.Lock()
+
+
+def xpath_has_class(class_name):
+    '''Returns an XPath predicate that matches elements w/ the given class, like BeautifulSoup's class matching'''
+
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {class_name} ')"
+
+
+# Precompiled XPath expressions used by the lxml parsing engine
+LXML_XPATHS = {
+    'message_list': etree.XPath('(//*[@id="main"])[1]/div[3]/div[1]/div[1]/div[2]'),
+    'message_list_fallback': etree.XPath("(//div[contains(@aria-label, 'Message list')])[1]"),
+    'copyable_text': etree.XPath(f"(.//div[{xpath_has_class('copyable-text')}])[1]"),
+    'copyable_content': etree.XPath(f"(.//span[{xpath_has_class('copyable-text')}])[1]"),
+    'selectable_span': etree.XPath(f"(.//span[{xpath_has_class('selectable-text')}])[1]"),
+    'selectable_div': etree.XPath(f"(.//div[{xpath_has_class('selectable-text')}])[1]"),
+    'has_img': etree.XPath("boolean(.//img)"),
+    'has_recall': etree.XPath("boolean(.//span[@data-testid='recalled'])"),
+    'has_media_testid': etree.XPath("boolean(.//*[contains(@data-testid, 'media') or contains(@data-testid, 'download')])"),
+    'has_contact_card': etree.XPath("boolean(.//div[@role='button'][contains(@title, 'Message')][following-sibling::node()[1][@title='Add to a group']])"),
+    'has_blob_image': etree.XPath("boolean(.//img[contains(@src, 'blob')])"),
+    'emoji_name': etree.XPath("(.//div[contains(@class, 'color')])[1]/*[1]"),
+    'spans': etree.XPath(".//span")
+}
+
+
+# Profiler of the current run while profiling w/ --profile (see start_profiling)
+profile_settings = {'profiler': None}
+
+# WebDriver properties that make a round trip to the browser when read, which are timed like commands while profiling
+PROFILED_PROPERTIES = {'page_source', 'text', 'active_element', 'title', 'current_url'}
+
+
+def profile_phase(name, sample_memory=False):
+    '''Returns a context manager that times a phase of the run while profiling (see Profiler.phase), and does nothing otherwise'''
+
+    profiler = profile_settings['profiler']
+    if profiler is None:
+        return nullcontext({})
+    return profiler.phase(name, sample_memory)
+
+
+def profiled(name, sample_memory=False):
+    '''Decorates a function to be timed as a phase of the run while profiling'''
+
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            with profile_phase(name, sample_memory):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def main(engine='bs4', stream=False, in_browser=False, load_timeout=60, timeout_policy='prompt', checkpoint=False, incremental=False, chat_list='keys', media=False, refresh=False):
     # Setup selenium to use Chrome browser w/ profile options
     driver = setup_selenium()
 
@@ -27,7 +589,7 @@ def main():
         return
 
     # Get chats
-    chats = get_chats(driver)
+    chats = load_chats(driver, chat_list=chat_list, refresh=refresh)
 
     # Print chat summary
     print_chats(chats)
@@ -57,14 +619,29 @@ def main():
                     driver.find_element_by_xpath(
                         '//*[@id="side"]/div[1]/div/span/button').click()
 
-            # Load entire chat history
-            chat_is_loaded = load_selected_chat(driver)
+            # Incremental exports only load the messages since the last export to a format, so ask for the format first
+            export_format = select_export_format(selected_chat) if incremental else None
+            if incremental and not export_format:
+                break
 
-        # Scrape the chat history
-        scraped = scrape_chat(driver)
+            # Load and scrape the chat history
+            scraped, messages = load_and_scrape_chat(
+                driver, selected_chat, engine, stream, in_browser, load_timeout, timeout_policy, checkpoint, incremental, media=media, export_formats=[export_format])
+            chat_is_loaded = scraped is not None
 
-        # Export the chat
-        scrape_is_exported(selected_chat, scraped)
+        # Export the chat (appending only the new messages to its archive for incremental exports), after which its checkpoint is no longer needed
+        if not chat_is_loaded:
+            pass
+        elif incremental and not messages:
+            print(
+                f"'{selected_chat}' has no new messages since the last export, nothing to export.")
+        elif incremental:
+            _, failed_formats = export_new_messages(selected_chat, messages, [export_format])
+            if checkpoint and not failed_formats:
+                delete_checkpoint(selected_chat)
+        elif scrape_is_exported(selected_chat, scraped):
+            if checkpoint:
+                delete_checkpoint(selected_chat)
 
         # Ask user if they wish to finish and exit WhatSoup
         finished = user_is_finished()
@@ -75,27 +652,359 @@ def main():
     return
 
 
-def setup_selenium():
-    '''Setup Selenium to use Chrome webdriver'''
+def load_and_scrape_chat(driver, selected_chat, engine='bs4', stream=False, in_browser=False, load_timeout=60, timeout_policy='prompt', checkpoint=False, incremental=False, export_dir='exports', media=False, capture=False, export_formats=EXPORT_FORMATS):
+    '''Loads and scrapes the selected chat w/ the given options (see main). Returns the scraped data and, for incremental exports, the list of messages loaded since the oldest watermark (empty if none of them are new), or (None, None) if loading was aborted.
+
+    For incremental exports, the chat is loaded since the oldest last export to any of the export formats, and the whole chat if one of them hasn't been exported incrementally yet (see export_new_messages).
+
+    With media, the media of the chat's messages is stored in export_dir's media store and linked to from the messages (see MediaDownloader).
+
+    With capture, a chat that would be scraped from its page source once it has loaded is returned as its page source instead, so it can be scraped w/o the browser (see export_captured_chat). Chats whose media is stored are always scraped, as their media is looked up in the page.
+    '''
+
+    # Fetch media while the chat loads when streaming, otherwise once it has loaded
+    with MediaDownloader(export_dir) if media else nullcontext() as media_downloader:
+        # Load the chat history since its last export, scraping only the new messages
+        messages = None
+        if incremental:
+            watermarks = load_watermarks(selected_chat, export_formats, export_dir).values()
+            watermark = None if None in watermarks else min(
+                watermarks, key=lambda watermark: watermark['datetime'])
+            messages = stream_chat_messages(driver, engine, load_timeout, timeout_policy,
+                                            selected_chat if checkpoint else None, watermark and watermark['data-id'], media_downloader)
+            if messages is None:
+                return None, None
+            # Keep the loaded messages (watermark message included) for export_new_messages, which picks each format's new messages from them
+            new_messages = messages
+            if watermark:
+                new_messages = messages_since_watermark(messages, watermark)
+                print(
+                    f"Success! {len(new_messages)} new messages since the last export on {watermark['datetime'].strftime('%m/%d/%Y, %I:%M %p')}.")
+                if not new_messages:
+                    messages = []
+            scraped = group_messages_by_date(new_messages)
+
+        # Load entire chat history, scraping it as it loads when streaming
+        elif stream or checkpoint:
+            scraped = stream_selected_chat(
+                driver, engine, load_timeout, timeout_policy, selected_chat if checkpoint else None, media_downloader)
+            if scraped is None:
+                return None, None
+
+        else:
+            if not load_selected_chat(driver, load_timeout=load_timeout, timeout_policy=timeout_policy):
+                return None, None
+
+            # Scrape the chat history, or just capture its page source
+            if in_browser:
+                scraped = extract_chat_in_browser(driver)
+            elif capture and not media_downloader:
+                return capture_page_source(driver), messages
+            else:
+                scraped = scrape_chat(driver, engine)
+            if media_downloader:
+                media_downloader.queue(message.data_id for messages in scraped.values()
+                                       for message in messages if message.has_media)
+
+        # Link the messages to their stored media
+        if media_downloader:
+            attach_media(scraped, media_downloader.finish(driver))
+
+        return scraped, messages
+
+
+def export_chats(driver, selectors, export_formats, export_dir='exports', engine='bs4', stream=False, in_browser=False, load_timeout=60, timeout_policy='abort', checkpoint=False, incremental=False, workers=1, chat_list='keys', media=False, refresh=False):
+    '''Exports the chats picked by the selectors (see select_chats) to every export format w/o any prompts, carrying on past chats that fail. Returns the number of failures.
+
+    With more than one worker, the chats are shared out between that many browsers (see export_chats_in_parallel).
+    '''
+
+    # Get chats and pick the ones to export
+    chats = load_chats(driver, interactive=False, chat_list=chat_list, refresh=refresh, export_dir=export_dir)
+    selected_chats, failures = select_chats(chats, selectors)
+
+    # Export each chat w/ the same options
+    export = partial(export_selected_chat, export_formats=export_formats, export_dir=export_dir, engine=engine, stream=stream, in_browser=in_browser,
+                     load_timeout=load_timeout, timeout_policy=timeout_policy, checkpoint=checkpoint, incremental=incremental, media=media)
+
+    start = timer()
+    if workers > 1:
+        results = export_chats_in_parallel(
+            driver, selected_chats, export, workers)
+    else:
+        capture = partial(capture_selected_chat, engine=engine, stream=stream, in_browser=in_browser, load_timeout=load_timeout,
+                          timeout_policy=timeout_policy, checkpoint=checkpoint, incremental=incremental, export_dir=export_dir, media=media, defer_scrape=True, export_formats=export_formats)
+        export_captured = partial(export_captured_chat, export_formats=export_formats, export_dir=export_dir,
+                                  engine=engine, checkpoint=checkpoint, incremental=incremental)
+        results = export_chats_pipelined(
+            driver, selected_chats, capture, export_captured)
+
+    # Export summary
+    end = timer()
+    exported_chats = len([1 for _, (_, failure) in results if not failure])
+    exported_messages = sum(
+        exported for _, (exported, _) in results)
+    failures.extend((selected_chat, failure)
+                    for selected_chat, (_, failure) in results if failure)
+    print(
+        f"Finished exporting {exported_chats} of {len(selected_chats)} chats ({exported_messages} messages) in {round(end - start)} seconds, {round(exported_messages / max(end - start, 1), 1)} messages/second.")
+    if failures:
+        t = PrettyTable()
+        t.field_names = ["Chat", "Failure"]
+        for key in t.align.keys():
+            t.align[key] = "l"
+        for failure in failures:
+            t.add_row(failure)
+        print(t.get_string(title=f'{len(failures)} Failures'))
+
+    return len(failures)
+
+
+def export_selected_chat(driver, selected_chat, export_formats, export_dir='exports', engine='bs4', stream=False, in_browser=False, load_timeout=60, timeout_policy='abort', checkpoint=False, incremental=False, media=False):
+    '''Finds, loads, scrapes and exports a chat to every export format w/o any prompts. Returns the number of messages exported and the reason the chat failed (None if it didn't).'''
+
+    captured, failure = capture_selected_chat(driver, selected_chat, engine, stream, in_browser,
+                                              load_timeout, timeout_policy, checkpoint, incremental, export_dir, media, export_formats=export_formats)
+    if captured is None:
+        return 0, failure
+
+    return export_captured_chat(selected_chat, captured, export_formats, export_dir, engine, checkpoint, incremental)
+
+
+def capture_selected_chat(driver, selected_chat, engine='bs4', stream=False, in_browser=False, load_timeout=60, timeout_policy='abort', checkpoint=False, incremental=False, export_dir='exports', media=False, defer_scrape=False, export_formats=EXPORT_FORMATS):
+    '''Finds, loads and scrapes a chat for export_selected_chat. With defer_scrape, a chat that's scraped from its page source is only captured, leaving its scraping to export_captured_chat (see load_and_scrape_chat).
+
+    Returns the captured chat, as (scraped data or page source, new messages of incremental exports), and None, or None and the reason the chat failed (None if there's just nothing to export).
+    '''
+
+    try:
+        # Find the selected chat in WhatsApp
+        if not find_selected_chat(driver, selected_chat):
+            # Clear chat search
+            driver.find_element_by_xpath(
+                '//*[@id="side"]/div[1]/div/span/button').click()
+            return None, "chat could not be found"
+
+        # Load and scrape the chat history
+        scraped, messages = load_and_scrape_chat(
+            driver, selected_chat, engine, stream, in_browser, load_timeout, timeout_policy, checkpoint, incremental, export_dir, media, defer_scrape, export_formats)
+        if scraped is None:
+            return None, "chat loading was aborted"
+        if incremental and not messages:
+            print(
+                f"'{selected_chat}' has no new messages since the last export, nothing to export.")
+            return None, None
+
+        return (scraped, messages), None
+
+    except WebDriverException as error:
+        print(
+            f"Error! '{selected_chat}' could not be exported. Error info: {error}")
+        return None, error.msg or type(error).__name__
+
+
+def export_captured_chat(selected_chat, captured, export_formats, export_dir='exports', engine='bs4', checkpoint=False, incremental=False):
+    '''Scrapes a chat captured by capture_selected_chat, if only its page source was captured, and exports it to every export format. Returns the number of messages exported and the reason the chat failed (None if it didn't).'''
+
+    scraped, messages = captured
+    if isinstance(scraped, str):
+        try:
+            scraped = parse_page(scraped, engine)
+        except ValueError as error:
+            print(f"Error! '{selected_chat}' could not be scraped. Error info: {error}")
+            return 0, "chat could not be scraped"
+
+    # Export the chat to every format (only the new messages of each, for incremental exports), after which its checkpoint is no longer needed
+    if incremental:
+        exported, failed_formats = export_new_messages(selected_chat, messages, export_formats, export_dir)
+    else:
+        exported = sum(len(messages) for messages in scraped.values())
+        failed_formats = [export_format for export_format in export_formats if not export_chat(
+            selected_chat, scraped, export_format, incremental, export_dir)]
+    if failed_formats:
+        return 0, f"{', '.join(failed_formats)} export failed"
+    if checkpoint:
+        delete_checkpoint(selected_chat)
+
+    return exported, None
+
+
+def export_chats_pipelined(driver, selected_chats, capture, export_captured):
+    '''Exports the selected chats w/ a single browser that moves on to loading the next chat while an exporter thread scrapes and exports the chats it has loaded, so a run takes about as long as the slower of the two instead of both added up.
+
+    capture is called w/ the driver and a chat name and returns the captured chat and its failure (see capture_selected_chat), export_captured w/ a chat name and its captured chat, returning that chat's result (see export_captured_chat). At most PIPELINE_DEPTH loaded chats wait for the exporter, after which the browser waits for it to catch up. Returns a list of (chat, result) in the order the chats finished.
+
+    The overlap is between chats, not within one: a chat is only handed over once it's fully loaded (and, unless only its page source is captured, scraped), so besides the chat being exported, up to PIPELINE_DEPTH whole chats plus the one loading are held in memory at once.
+    '''
+
+    # Loaded chats waiting to be exported (None once all chats are loaded), and the results of the finished ones
+    captured_queue = Queue(maxsize=PIPELINE_DEPTH)
+    results = []
+
+    def export_captured_chats():
+        while True:
+            item = captured_queue.get()
+            if item is None:
+                return
+            selected_chat, captured = item
+
+            # Keep the exporter going if a chat fails unexpectedly
+            try:
+                with profile_phase('export chat'):
+                    results.append((selected_chat, export_captured(selected_chat, captured)))
+            except Exception as error:
+                print(
+                    f"Error! '{selected_chat}' could not be exported. Error info: {error}")
+                results.append((selected_chat, (0, str(error))))
+
+    exporter = threading.Thread(target=export_captured_chats, name='exporter')
+    exporter.start()
+    try:
+        for i, selected_chat in enumerate(selected_chats, start=1):
+            print(
+                f"Loading chat {i} of {len(selected_chats)}: '{selected_chat}'")
+            try:
+                captured, failure = capture(driver, selected_chat)
+            except Exception as error:
+                print(
+                    f"Error! '{selected_chat}' could not be loaded. Error info: {error}")
+                captured, failure = None, str(error)
+
+            # Hand the chat over to the exporter, waiting while it's PIPELINE_DEPTH chats behind
+            if captured is None:
+                results.append((selected_chat, (0, failure)))
+            else:
+                with profile_phase('wait for exporter'):
+                    captured_queue.put((selected_chat, captured))
+    finally:
+        # Let the exporter finish the chats that have loaded, even when loading was interrupted
+        captured_queue.put(None)
+        exporter.join()
+
+    return results
+
+
+def export_chats_in_parallel(driver, selected_chats, export, workers):
+    '''Exports the selected chats w/ a pool of browsers, the given driver plus workers - 1 more that each use their own copy of the Chrome profile (see copy_chrome_profile). Every browser takes the next chat off a shared queue until all chats are exported.
+
+    export is called w/ a driver and a chat name and returns that chat's result (see export_selected_chat). Returns a list of (chat, result) in the order the chats finished.
+    '''
+
+    # Chats waiting to be exported, and the results of the exported ones
+    chat_queue = Queue()
+    for i, selected_chat in enumerate(selected_chats, start=1):
+        chat_queue.put((i, selected_chat))
+    results = []
+
+    def work(worker_driver, worker):
+        # Export chats until the queue is empty
+        while True:
+            try:
+                i, selected_chat = chat_queue.get_nowait()
+            except Empty:
+                return
+
+            print(
+                f"Worker {worker} exporting chat {i} of {len(selected_chats)}: '{selected_chat}'")
+            # Keep the worker going if a chat fails unexpectedly
+            try:
+                results.append((selected_chat, export(worker_driver, selected_chat)))
+            except Exception as error:
+                print(
+                    f"Error! Worker {worker} could not export '{selected_chat}'. Error info: {error}")
+                results.append((selected_chat, (0, str(error))))
+
+    def start_worker(worker):
+        # Open another browser w/ a copy of the Chrome profile and load WhatsApp in it
+        chrome_profile = copy_chrome_profile(worker)
+        worker_driver = setup_selenium(chrome_profile)
+        try:
+            if whatsapp_is_loaded(worker_driver, interactive=False):
+                work(worker_driver, worker)
+            else:
+                print(f"Error! Worker {worker} could not load WhatsApp.")
+        finally:
+            worker_driver.quit()
+            shutil.rmtree(os.path.dirname(chrome_profile), ignore_errors=True)
+
+    # The given browser starts exporting right away while the others are still opening
+    print(f"Starting {workers} workers...")
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(work, driver, 1)] + \
+            [pool.submit(start_worker, worker) for worker in range(2, workers + 1)]
+        for future in futures:
+            try:
+                future.result()
+            except Exception as error:
+                print(f"Error! A worker failed to start. Error info: {error}")
+
+    return results
+
+
+def copy_chrome_profile(worker):
+    '''Copies the Chrome profile (CHROME_PROFILE) to a temporary directory for a worker browser, since a profile can only be used by one browser at a time, and returns the copy's path'''
+
+    load_dotenv()
+    CHROME_PROFILE = os.getenv('CHROME_PROFILE')
+
+    # Skip the locks of the running browser and caches that Chrome rebuilds anyway
+    chrome_profile = os.path.join(tempfile.mkdtemp(
+        prefix='whatsoup-'), f"worker-{worker}")
+    shutil.copytree(CHROME_PROFILE, chrome_profile, ignore=shutil.ignore_patterns(
+        'Singleton*', 'lockfile', 'Cache', 'Code Cache', 'GPUCache'))
+
+    return chrome_profile
+
+
+def setup_selenium(chrome_profile=None):
+    '''Setup Selenium to use Chrome webdriver (w/ the given Chrome profile directory instead of CHROME_PROFILE, if any)'''
 
     # Load driver and chrome profile from local directories
     load_dotenv()
     DRIVER_PATH = os.getenv('DRIVER_PATH')
-    CHROME_PROFILE = os.getenv('CHROME_PROFILE')
+    CHROME_PROFILE = chrome_profile or os.getenv('CHROME_PROFILE')
 
-    # Configure selenium
+    # Configure selenium (see browser_settings)
     options = webdriver.ChromeOptions()
     options.add_argument(f"user-data-dir={CHROME_PROFILE}")
+    if browser_settings['lean']:
+        for argument in LEAN_BROWSER_ARGUMENTS:
+            options.add_argument(argument)
+    if browser_settings['headless']:
+        options.add_argument('--headless=new')
+        options.add_argument('--window-size=1280,1024')
     driver = webdriver.Chrome(
         executable_path=DRIVER_PATH, options=options)
     # Change default script timeout from 30sec to 90sec for execute_script tasks which slow down significantly in very large chats
     driver.set_script_timeout(90)
 
-    return driver
+    # WhatsApp turns away browsers that say they're headless, so pose as regular Chrome
+    if browser_settings['headless']:
+        user_agent = driver.execute_script("return navigator.userAgent;")
+        driver.execute_cdp_cmd('Network.setUserAgentOverride', {
+                               'userAgent': user_agent.replace('HeadlessChrome', 'Chrome')})
+    if browser_settings['lean']:
+        lean_browser_setup(driver)
+
+    return profile_driver(driver)
+
+
+def lean_browser_setup(driver):
+    '''Trims what Chrome does besides running WhatsApp via the Chrome DevTools Protocol: blocks downloading media and images (see LEAN_BLOCKED_URLS), turns off animations and keeps the tab focused so it isn't throttled in the background'''
+
+    try:
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': LEAN_BLOCKED_URLS})
+        driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {'source': LEAN_PAGE_SCRIPT})
+        driver.execute_cdp_cmd('Emulation.setEmulatedMedia', {
+                               'features': [{'name': 'prefers-reduced-motion', 'value': 'reduce'}]})
+        driver.execute_cdp_cmd('Emulation.setFocusEmulationEnabled', {'enabled': True})
+    except WebDriverException as error:
+        print(f"Warning! The browser could not be fully trimmed, continuing w/ a regular browser. Error info: {error.msg}")
 
 
-def whatsapp_is_loaded(driver):
-    '''Attempts to load WhatsApp in the browser'''
+def whatsapp_is_loaded(driver, interactive=True):
+    '''Attempts to load WhatsApp in the browser, asking the user whether to keep trying if it doesn't load (unless interactive is False)'''
 
     print("Loading WhatsApp...", end="\r")
 
@@ -114,6 +1023,10 @@ def whatsapp_is_loaded(driver):
             # Display error to user
             print(
                 f"Error: WhatsApp did not load within {wait_time} seconds. Make sure you are logged in and let's try again.")
+            if browser_settings['headless']:
+                print("A headless browser can't show the QR code to log in w/, so run WhatSoup w/o --headless once to log in.")
+            if not interactive:
+                return False
 
             is_valid_response = False
             while not is_valid_response:
@@ -149,95 +1062,227 @@ def user_is_logged_in(driver, wait_time):
         return False
 
 
-def get_chats(driver):
-    '''Traverses the WhatsApp chat-pane via keyboard input and collects chat information such as person/group name, last chat time and msg'''
+@profiled('chat list', sample_memory=True)
+def load_chats(driver, interactive=True, chat_list='keys', refresh=False, export_dir='exports'):
+    '''Returns your chats like get_chats, reusing the chat list cached by the last run (see CHAT_LIST_CACHE_FILE) and only collecting the chats that changed since (see update_cached_chats). With refresh, or if the cache can't be used, the whole chat-pane is collected again. Either way the chat list is cached for the next run.'''
+
+    # Bring the last run's chat list up to date, unless a full refresh is wanted
+    chats = None
+    cached_chats = None if refresh else load_chat_list_cache(export_dir)
+    if cached_chats:
+        chats = update_cached_chats(driver, cached_chats, chat_list)
+        if chats is None:
+            print("Warning! The cached chat list doesn't match your chats, loading all of them instead.")
+
+    # Collect the whole chat-pane
+    if chats is None:
+        chats = get_chats(driver, interactive, chat_list)
+
+    save_chat_list_cache(chats, export_dir)
+    return chats
+
+
+def update_cached_chats(driver, cached_chats, chat_list='keys'):
+    '''Returns the cached chat list brought up to date w/ the chat-pane, or None if the chat-pane can't be collected or changes while it's being scanned (see scan_chat_pane), in which case get_chats should collect it instead.
+
+    WhatsApp sorts the chat-pane by the latest message, so the chats that changed since the list was cached are at the top and every chat below them is still in its cached order. The chat-pane is scanned from the top (w/ the keyboard or, w/ chat_list 'script', by scrolling it) until CHAT_LIST_FINGERPRINT_ROWS rows in a row are the cached chats that should follow the changed ones, after which the rest of the cached list is reused. If that never happens, the whole chat-pane has been collected instead.
+    '''
 
     print("Loading your chats...", end="\r")
 
-    # Wrap entire function in a retryable try/catch because chat-pane DOM changes frequently due to users typing, sending messages, and occasional WhatsApp notifications
-    retry_attempts = 0
-    while retry_attempts < 3:
-        retry_attempts += 1
+    chats, changed_names = [], set()
+    cached_index, matched = 0, 0
+    rows = scan_chat_pane(driver, chat_list)
+    try:
+        for chat in rows:
+            chats.append(chat)
+
+            # Skip the cached chats that have already turned out to be changed, then compare the row to the next one
+            while cached_index < len(cached_chats) and cached_chats[cached_index]['name'] in changed_names:
+                cached_index += 1
+            if cached_index < len(cached_chats) and chat == cached_chats[cached_index]:
+                cached_index, matched = cached_index + 1, matched + 1
+
+                # Reuse the rest of the cached list once enough rows match it (or all of it does), which stops the scan
+                while cached_index < len(cached_chats) and cached_chats[cached_index]['name'] in changed_names:
+                    cached_index += 1
+                if matched >= CHAT_LIST_FINGERPRINT_ROWS or cached_index == len(cached_chats):
+                    rows.close()
+                    chats = chats[:len(chats) - matched] + [
+                        cached_chat for cached_chat in cached_chats if cached_chat['name'] not in changed_names]
+                    break
+                continue
 
-        # Try traversing the chat-pane
+            # Otherwise this row and the ones that seemed unchanged before it are all changed, so start matching over
+            changed_names.update(changed['name'] for changed in chats[len(chats) - matched - 1:])
+            cached_index, matched = 0, 0
+
+        # A row at the very top that rendered late or moved leaves no gap in the offsets, so check the top screen still reads the same
+        if chat_list == 'script' and chats:
+            top_screen = driver.execute_async_script(HARVEST_CHATS_SCRIPT, True, 1, 100)
+            if not top_screen['done']:
+                driver.execute_script(SCROLL_CHAT_PANE_TO_TOP_SCRIPT)
+            top_chats = [harvested_chat(row) for row in top_screen['chats']]
+            if top_chats != chats[:len(top_chats)]:
+                return None
+
+    # Catch errors related to DOM changes, leaving the retries to get_chats
+    except (StaleElementReferenceException, ElementNotInteractableException):
+        return None
+    if not chats:
+        return None
+
+    print(f"Success! Your {len(chats)} chats have been loaded ({len(changed_names)} changed since the last run).")
+    return chats
+
+
+def scan_chat_pane(driver, chat_list='keys'):
+    '''Yields the chat-pane's chats from the top down as get_chats collects them, moving through it via keyboard input or, w/ chat_list 'script', scrolling it a screen at a time w/ HARVEST_CHATS_SCRIPT. Closing the generator early goes back to the top of the chat-pane.
+
+    Raises StaleElementReferenceException or ElementNotInteractableException if the chat-pane changes while it's being scanned. When scrolling, that's a row that rendered late (a gap in the rows' offsets) or moved (a chat showing up twice), which the script's de-duplication by offset would otherwise hide (see update_cached_chats for rows at the very top).
+    '''
+
+    if chat_list == 'script':
+        offsets, names = [], set()
+        is_first_call, is_done = True, False
         try:
-            # Find the chat search (xpath == 'Search or start new chat' element)
-            chat_search = driver.find_element_by_xpath(
-                '//*[@id="side"]/div[1]/div/label/div/div[2]')
-            chat_search.click()
+            while not is_done:
+                harvested = driver.execute_async_script(
+                    HARVEST_CHATS_SCRIPT, is_first_call, 1, 100)
+                is_first_call, is_done = False, harvested['done']
+
+                for row in harvested['chats']:
+                    # Rows are evenly spaced, so check each one follows the last at the same distance as the first two
+                    if row['name'] in names or (len(offsets) > 1 and row['offset'] - offsets[-1] != offsets[1] - offsets[0]):
+                        raise StaleElementReferenceException(
+                            "The chat-pane changed while it was being scrolled")
+                    offsets.append(row['offset'])
+                    names.add(row['name'])
+                    yield harvested_chat(row)
+        finally:
+            # The script scrolls back to the top once it's done, otherwise do it here
+            if not is_done:
+                driver.execute_script(SCROLL_CHAT_PANE_TO_TOP_SCRIPT)
+        return
 
-            # Count how many chat records there are below the search input by using keyboard navigation because HTML is dynamically changed depending on viewport and location in DOM
-            selected_chat = driver.switch_to.active_element
-            prev_chat_id = None
-            is_last_chat = False
-            chats = []
+    # Find the chat search (xpath == 'Search or start new chat' element)
+    chat_search = driver.find_element_by_xpath(
+        '//*[@id="side"]/div[1]/div/label/div/div[2]')
+    chat_search.click()
 
-            # Descend through the chats
-            while True:
-                # Navigate to next chat
-                selected_chat.send_keys(Keys.DOWN)
+    # Count how many chat records there are below the search input by using keyboard navigation because HTML is dynamically changed depending on viewport and location in DOM
+    selected_chat = driver.switch_to.active_element
+    prev_chat_id = None
 
-                # Set active element to new chat (without this we can't access the elements '.text' value used below for name/time/msg)
-                selected_chat = driver.switch_to.active_element
+    # Descend through the chats
+    try:
+        while True:
+            # Navigate to next chat
+            selected_chat.send_keys(Keys.DOWN)
 
-                # Check if we are on the last chat by comparing current to previous chat
-                if selected_chat.id == prev_chat_id:
-                    is_last_chat = True
-                else:
-                    prev_chat_id = selected_chat.id
+            # Set active element to new chat (without this we can't access the elements '.text' value used below for name/time/msg)
+            selected_chat = driver.switch_to.active_element
 
-                # Gather chat info (chat name, chat time, and last chat message)
-                if is_last_chat:
+            # Check if we are on the last chat by comparing current to previous chat
+            if selected_chat.id == prev_chat_id:
+                break
+            prev_chat_id = selected_chat.id
+
+            # Gather chat info (chat name, chat time, and last chat message)
+            # Get the container of the contact card's title (xpath == parent div container to the span w/ title attribute set to chat name)
+            contact_title_container = selected_chat.find_element_by_xpath(
+                "./div/div[2]/div/div[1]")
+            # Then get all the spans it contains
+            contact_title_container_spans = contact_title_container.find_elements_by_tag_name(
+                'span')
+            # Then loop through all those until we find one w/ a title property
+            for span_title in contact_title_container_spans:
+                if span_title.get_property('title'):
+                    name_of_chat = span_title.get_property('title')
                     break
-                else:
-                    # Get the container of the contact card's title (xpath == parent div container to the span w/ title attribute set to chat name)
-                    contact_title_container = selected_chat.find_element_by_xpath(
-                        "./div/div[2]/div/div[1]")
-                    # Then get all the spans it contains
-                    contact_title_container_spans = contact_title_container.find_elements_by_tag_name(
-                        'span')
-                    # Then loop through all those until we find one w/ a title property
-                    for span_title in contact_title_container_spans:
-                        if span_title.get_property('title'):
-                            name_of_chat = span_title.get_property('title')
-                            break
-
-                    # Get the time (xpath == div element that holds last chat time e.g. 'Wednesday' or '1/1/2021')
-                    last_chat_time = selected_chat.find_element_by_xpath(
-                        "./div/div[2]/div/div[2]").text
-
-                    # Get the last message (xpath == div element that holds a span w/ title attribute set to last chat message)
-                    last_chat_msg_element = selected_chat.find_element_by_xpath(
-                        "./div/div[2]/div[2]/div")
-                    last_chat_msg = last_chat_msg_element.find_element_by_tag_name(
-                        'span').get_attribute('title')
-
-                    # Strip last message of left-to-right directional encoding ('\u202a' and '\u202c') if it exists
-                    if '\u202a' in last_chat_msg or '\u202c' in last_chat_msg:
-                        last_chat_msg = last_chat_msg.lstrip(
-                            u'\u202a')
-                        last_chat_msg = last_chat_msg.rstrip(
-                            u'\u202c')
-
-                    # Check if last message is a group chat and if so prefix the senders name to the message
-                    last_chat_msg_sender = last_chat_msg_element.find_element_by_tag_name(
-                        'span').text
-                    if '\n: \n' in last_chat_msg_sender:
-                        # Group have multiple spans to separate sender, colon, and msg contents e.g. '<sender>: <msg>', so we take the first item after splitting to capture the senders name
-                        last_chat_msg_sender = last_chat_msg_sender.split('\n')[
-                            0]
-
-                        # Prefix the message w/ senders name
-                        last_chat_msg = f"{last_chat_msg_sender}: {last_chat_msg}"
-
-                    # Store chat info within a dict
-                    chat = {"name": name_of_chat,
-                            "time": last_chat_time, "message": last_chat_msg}
-                    chats.append(chat)
-
-            # Navigate back to the top of the chat list
-            chat_search.click()
-            chat_search.send_keys(Keys.DOWN)
+
+            # Get the time (xpath == div element that holds last chat time e.g. 'Wednesday' or '1/1/2021')
+            last_chat_time = selected_chat.find_element_by_xpath(
+                "./div/div[2]/div/div[2]").text
+
+            # Get the last message (xpath == div element that holds a span w/ title attribute set to last chat message)
+            last_chat_msg_element = selected_chat.find_element_by_xpath(
+                "./div/div[2]/div[2]/div")
+            last_chat_msg_span = last_chat_msg_element.find_element_by_tag_name(
+                'span')
+            last_chat_msg = format_last_chat_message(
+                last_chat_msg_span.get_attribute('title'), last_chat_msg_span.text)
+
+            # Store chat info within a dict
+            yield {"name": name_of_chat,
+                   "time": last_chat_time, "message": last_chat_msg}
+    except GeneratorExit:
+        # Navigate back to the top of the chat list when stopped early
+        chat_search.click()
+        chat_search.send_keys(Keys.DOWN)
+        raise
+
+    # Navigate back to the top of the chat list
+    chat_search.click()
+    chat_search.send_keys(Keys.DOWN)
+
+
+def load_chat_list_cache(export_dir='exports'):
+    '''Returns the chat list cached by the last run, or None if there is none, it's corrupt or it's from another Chrome profile (CHROME_PROFILE)'''
+
+    cache_path = os.path.join(export_dir, CHAT_LIST_CACHE_FILE)
+    if not os.path.isfile(cache_path):
+        return None
+
+    # Ignore a cache that can't be read, it's rewritten once the chats are loaded
+    try:
+        with open(cache_path, encoding="utf-8") as cache_file:
+            cache = json.load(cache_file)
+        if cache.get('profile') != os.getenv('CHROME_PROFILE'):
+            return None
+        return cache['chats']
+    except (ValueError, KeyError, AttributeError):
+        print("Warning! The cached chat list is corrupt, loading all of your chats instead.")
+        return None
+
+
+def save_chat_list_cache(chats, export_dir='exports'):
+    '''Caches the chat list for the next run (see load_chats), along w/ the Chrome profile it's from'''
+
+    if not os.path.isdir(export_dir):
+        os.makedirs(export_dir, exist_ok=True)
+    cache_path = os.path.join(export_dir, CHAT_LIST_CACHE_FILE)
+    cache = {"profile": os.getenv('CHROME_PROFILE'), "updated": datetime.now().isoformat(), "chats": chats}
+
+    # Write to a temporary file first so a crash mid-write doesn't leave a corrupt cache
+    with open(f"{cache_path}.tmp", "w", encoding="utf-8") as cache_file:
+        json.dump(cache, cache_file, indent=2)
+    os.replace(f"{cache_path}.tmp", cache_path)
+
+
+def get_chats(driver, interactive=True, chat_list='keys'):
+    '''Traverses the WhatsApp chat-pane via keyboard input and collects chat information such as person/group name, last chat time and msg. If the chat-pane keeps changing, the user is asked whether to keep trying (unless interactive is False, which raises the error instead).
+
+    With chat_list 'script' (see CHAT_LIST_MODES), the chat-pane is scrolled and collected in the browser instead (see get_chats_in_browser).
+    '''
+
+    # Collect the chats in a few round trips, falling back to the keyboard if the chat-pane isn't laid out as expected
+    if chat_list == 'script':
+        chats = get_chats_in_browser(driver)
+        if chats:
+            return chats
+        print("Warning! No chats were found by scrolling the chat-pane, moving through it w/ the keyboard instead.")
+
+    print("Loading your chats...", end="\r")
+
+    # Wrap entire function in a retryable try/catch because chat-pane DOM changes frequently due to users typing, sending messages, and occasional WhatsApp notifications
+    retry_attempts = 0
+    while retry_attempts < 3:
+        retry_attempts += 1
+
+        # Try traversing the chat-pane
+        try:
+            chats = list(scan_chat_pane(driver))
 
             print("Success! Your chats have been loaded.")
             break
@@ -247,6 +1292,9 @@ def get_chats(driver):
             if retry_attempts == 3:
                 # Make sure we grant user option to exit if DOM keeps changing while scanning chat list
                 print("This is taking longer than usual...")
+                if not interactive:
+                    print('Error! Aborting chat load due to frequent DOM changes.')
+                    raise e
                 while True:
                     response = input(
                         "Try loading chats again (y/n)? ")
@@ -268,6 +1316,58 @@ def get_chats(driver):
     return chats
 
 
+def get_chats_in_browser(driver, steps_per_call=50):
+    '''Collects the same chat information as get_chats by scrolling the chat-pane in the browser (see HARVEST_CHATS_SCRIPT), which takes a round trip per steps_per_call scrolls instead of several per chat'''
+
+    print("Loading your chats...", end="\r")
+
+    chats = [harvested_chat(row) for row in harvest_chat_pane(driver, steps_per_call)]
+
+    print(f"Success! Your {len(chats)} chats have been loaded.")
+    return chats
+
+
+def harvest_chat_pane(driver, steps_per_call=50):
+    '''Scrolls through the whole chat-pane w/ HARVEST_CHATS_SCRIPT and returns its chat rows as harvested, i.e. {offset, name, time, title, text} in chat list order'''
+
+    chats, is_first_call, is_done = [], True, False
+    while not is_done:
+        harvested = driver.execute_async_script(
+            HARVEST_CHATS_SCRIPT, is_first_call, steps_per_call, 100)
+        is_first_call, is_done = False, harvested['done']
+        chats.extend(harvested['chats'])
+
+    return chats
+
+
+def harvested_chat(row):
+    '''Returns the chat info of a chat-pane row harvested w/ HARVEST_CHATS_SCRIPT, as get_chats stores it'''
+
+    return {"name": row['name'], "time": row['time'], "message": format_last_chat_message(row['title'], row['text'])}
+
+
+def format_last_chat_message(last_chat_msg, last_chat_msg_sender):
+    '''Returns a chat's last message from the title and text of the chat-pane span holding it, prefixed w/ the sender's name for group chats'''
+
+    # Strip last message of left-to-right directional encoding ('\u202a' and '\u202c') if it exists
+    if '\u202a' in last_chat_msg or '\u202c' in last_chat_msg:
+        last_chat_msg = last_chat_msg.lstrip(
+            u'\u202a')
+        last_chat_msg = last_chat_msg.rstrip(
+            u'\u202c')
+
+    # Check if last message is a group chat and if so prefix the senders name to the message
+    if '\n: \n' in last_chat_msg_sender:
+        # Group have multiple spans to separate sender, colon, and msg contents e.g. '<sender>: <msg>', so we take the first item after splitting to capture the senders name
+        last_chat_msg_sender = last_chat_msg_sender.split('\n')[
+            0]
+
+        # Prefix the message w/ senders name
+        last_chat_msg = f"{last_chat_msg_sender}: {last_chat_msg}"
+
+    return last_chat_msg
+
+
 def print_chats(chats, full=False):
     '''Prints a summary of the scraped chats'''
 
@@ -361,8 +1461,39 @@ def select_chat(chats):
                         f"Uh oh! The only valid options are numbers 1 - {len(chats)}. Try again.")
 
 
-def load_selected_chat(driver):
-    '''Loads entire chat history by repeatedly scrolling up to fetch more data from WhatsApp'''
+def select_chats(chats, selectors):
+    '''Returns the names of the chats picked by the selectors (chat names, chat numbers as listed by print_chats, or 'all') w/o duplicates, and a list of (selector, reason) failures for selectors that don't match any chat'''
+
+    selected_chats, failures = [], []
+    for selector in selectors:
+        if selector.strip().lower() == 'all':
+            names = [chat['name'] for chat in chats]
+        elif selector.isdigit():
+            if not 1 <= int(selector) <= len(chats):
+                failures.append(
+                    (selector, f"only chat numbers 1 - {len(chats)} exist"))
+                continue
+            names = [chats[int(selector) - 1]['name']]
+        else:
+            names = [chat['name'] for chat in chats if chat['name'] == selector]
+            if not names:
+                failures.append((selector, "no chat w/ this name"))
+                continue
+
+        selected_chats.extend(
+            name for name in names if name not in selected_chats)
+
+    return selected_chats, failures
+
+
+@profiled('load chat', sample_memory=True)
+def load_selected_chat(driver, on_batch=None, load_timeout=60, timeout_policy='prompt'):
+    '''Loads entire chat history by repeatedly scrolling up to fetch more data from WhatsApp.
+
+    Instead of sleeping a fixed time after each scroll, the browser waits for the message list to grow (see SCROLL_AND_WAIT_SCRIPT), backing off while WhatsApp is slow to respond. If no messages load within load_timeout seconds, timeout_policy (one of TIMEOUT_POLICIES) decides whether to ask the user, abort, or finish w/ the messages loaded so far.
+
+    If given, on_batch is called w/ the message list element before scrolling, after every batch of newly loaded messages, and once the whole chat has loaded. Loading stops early, as if the whole chat had loaded, as soon as on_batch returns True.
+    '''
     start = timer()
     print("Loading messages...", end="\r")
 
@@ -371,103 +1502,413 @@ def load_selected_chat(driver):
         "//*[@id='main']/div[3]/div/div/div[contains(@aria-label,'Message list')]")
     message_list_element.send_keys(Keys.NULL)
 
+    # Hand over the messages that are already loaded
+    if on_batch and on_batch(message_list_element):
+        print("Success! No earlier messages are needed, skipped loading the chat history.")
+        return True
+
     # Get scroll height of the chat pane div so we can calculate if new messages were loaded
     current_scroll_height = driver.execute_script(
         "return arguments[0].scrollHeight;", message_list_element)
-    previous_scroll_height = current_scroll_height
 
-    # Load all messages by scrolling up and continually checking scroll height to verify more messages have loaded
-    all_msgs_loaded = False
-    retry_attempts, success_attempts = 0, 0
-    while not all_msgs_loaded:
-        # Scroll to anchor at top of message list (fetches more messages)
-        driver.execute_script(
-            "arguments[0].scrollIntoView();", message_list_element)
+    # Seconds to wait for each batch, doubling (up to the max) every time nothing loads
+    min_wait_time, max_wait_time = 1, 8
+    wait_time = min_wait_time
 
-        # Grant some time for messages to load
-        sleep(2)
+    # Load all messages by scrolling up and waiting in the browser until more messages have loaded
+    waited, success_attempts, batch_latencies, memory_warned = 0, 0, [], 0
+    while True:
+        # Scroll to anchor at top of message list (fetches more messages) and wait for new messages to arrive
+        with profile_phase('load batch'):
+            loaded = driver.execute_async_script(
+                SCROLL_AND_WAIT_SCRIPT, message_list_element, wait_time * 1000)
 
-        # Get scroll height of the chat pane div so we can calculate if new messages were loaded
-        previous_scroll_height = current_scroll_height
-        current_scroll_height = driver.execute_script(
-            "return arguments[0].scrollHeight;", message_list_element)
+        # Warn before the tab runs out of memory
+        memory_warned = warn_if_tab_memory_is_low(loaded.get('memory'), memory_warned)
 
         # Check if scroll height changed
-        if current_scroll_height > previous_scroll_height:
-            # New messages were loaded, reset retry counter
-            retry_attempts = 0
+        if loaded['height'] > current_scroll_height:
+            # New messages were loaded, reset the wait
+            current_scroll_height = loaded['height']
+            batch_latencies.append(loaded['elapsed'])
+            waited, wait_time = 0, min_wait_time
 
             # Increment success attempts for user awareness
             success_attempts += 1
             print(
-                f"Load new messages succeeded {success_attempts} times", end="\r")
+                f"Load new messages succeeded {success_attempts} times ({round(loaded['elapsed'], 2)} seconds)", end="\r")
+
+            # Hand over the newly loaded messages, stopping if they're all that was needed
+            if on_batch and on_batch(message_list_element):
+                end = timer()
+                print(
+                    f"Success! The messages needed have been loaded in {round(end - start)} seconds.")
+                print_load_latencies(batch_latencies)
+                return True
 
             # Loop back and load more messages
             continue
 
-        # Check if all messages were loaded or retry loading more
-        elif current_scroll_height == previous_scroll_height:
-            # All messages loaded? (xpath == 'load earlier messages' / 'loading messages...' div that is deleted from DOM after all messages have loaded)
-            loading_earlier_msgs = driver.find_element_by_xpath(
-                '//*[@id="main"]/div[3]/div/div/div[2]/div').get_attribute('title')
-            if 'load' not in loading_earlier_msgs:
-                all_msgs_loaded = True
-                end = timer()
+        # All messages loaded? ('load earlier messages' / 'loading messages...' div that is deleted from DOM after all messages have loaded)
+        if 'load' not in loaded['loading']:
+            # Hand over anything that loaded since the last batch
+            if on_batch:
+                on_batch(message_list_element)
+
+            end = timer()
+            print(
+                f"Success! Your entire chat history has been loaded in {round(end - start)} seconds.")
+            print_load_latencies(batch_latencies)
+            return True
+
+        # Back off and retry loading more messages until we hit the timeout
+        waited += loaded['elapsed']
+        wait_time = min(wait_time * 2, max_wait_time)
+        if waited < load_timeout:
+            continue
+
+        print(
+            f"This is taking longer than usual... no new messages loaded in {round(waited)} seconds.")
+        if timeout_policy == 'abort':
+            print('Error! Aborting chat load due to loading timeout.')
+            return False
+        elif timeout_policy == 'finish':
+            print(
+                "Warning! Only part of your chat history was loaded, continuing w/ the messages loaded so far.")
+            if on_batch:
+                on_batch(message_list_element)
+            print_load_latencies(batch_latencies)
+            return True
+
+        # Make sure we grant user option to exit
+        while True:
+            response = input(
+                "Try loading more messages (y/n)? ")
+            if response.strip().lower() in {'n', 'no'}:
                 print(
-                    f"Success! Your entire chat history has been loaded in {round(end - start)} seconds.")
-                break
+                    'Error! Aborting chat load by user due to loading timeout.')
+                return False
+            elif response.strip().lower() in {'y', 'yes'}:
+                # Set focus to chat window again
+                message_list_element.send_keys(Keys.NULL)
 
-            # Retry loading more messages
+                # Reset the wait
+                waited, wait_time = 0, min_wait_time
+                break
             else:
-                # Make sure we grant user option to exit if ~60sec of attempting to load more messages doesn't result in new messages loading
-                if retry_attempts >= 30:
-                    print("This is taking longer than usual...")
-                    while True:
-                        response = input(
-                            "Try loading more messages (y/n)? ")
-                        if response.strip().lower() in {'n', 'no'}:
-                            print(
-                                'Error! Aborting chat load by user due to loading timeout.')
-                            return False
-                        elif response.strip().lower() in {'y', 'yes'}:
-                            # Set focus to chat window again
-                            message_list_element.send_keys(Keys.NULL)
-
-                            # Reset counter
-                            retry_attempts = 0
-                            break
-                        else:
-                            continue
+                continue
 
-                # Increment retry acounter and load more messages
-                else:
-                    retry_attempts += 1
-                    continue
 
-    return True
+def warn_if_tab_memory_is_low(memory, warned_level=0):
+    '''Warns when the tab's JS heap, as [used, limit] bytes from SCROLL_AND_WAIT_SCRIPT, reaches one of MEMORY_WARNING_LEVELS of its limit, as Chrome crashes the tab once it runs out. Returns the highest level warned about so far, so each level is only warned about once.'''
 
+    if not memory or not memory[1]:
+        return warned_level
 
-def find_selected_chat(driver, selected_chat):
-    '''Searches and loads the initial chat. Returns True/False if the chat is found and can be loaded.
+    used, limit = memory
+    reached_levels = [level for level in MEMORY_WARNING_LEVELS if level > warned_level and used / limit >= level]
+    if not reached_levels:
+        return warned_level
 
-    Assumptions:
-    1) The chat is searchable and exists because we scraped it earlier in get_chats
-    2) The searched chat will always be the first element under the search input box
-    '''
+    print(f"Warning! The WhatsApp tab is using {round(used / 1024 / 1024)} MB of its {round(limit / 1024 / 1024)} MB memory limit ({used / limit:.0%}). "
+          "If it runs out, Chrome crashes the tab and this chat's progress is lost unless it's loaded w/ --checkpoint (--lean also saves memory).")
+    return max(reached_levels)
 
-    print(f"Searching for '{selected_chat}'...", end="\r")
 
-    # Find the chat via search (xpath == 'Search or start new chat' element)
-    chat_search = driver.find_element_by_xpath(
-        '//*[@id="side"]/div[1]/div/label/div/div[2]')
-    chat_search.click()
+def print_load_latencies(batch_latencies):
+    '''Prints how long the browser took to load each batch of messages'''
 
-    # Type the chat name into the search box using a JavaScript hack because Selenium/Chromedriver doesn't support all unicode chars - https://bugs.chromium.org/p/chromedriver/issues/detail?id=2269
-    driver.execute_script(
-        f"arguments[0].innerHTML = '{selected_chat}'", chat_search)
+    if batch_latencies:
+        print(f"Loaded {len(batch_latencies)} batches of messages, "
+              f"{round(sum(batch_latencies) / len(batch_latencies), 2)} seconds on average and {round(max(batch_latencies), 2)} seconds for the slowest.")
 
-    # Manually fire the JS listeners/events with keyboard input that adds/removes a space at end of search string
-    chat_search.send_keys(Keys.END)
+
+def stream_selected_chat(driver, engine='bs4', load_timeout=60, timeout_policy='prompt', checkpoint=None, media=None):
+    '''Loads entire chat history like load_selected_chat, scraping each batch of messages as soon as it loads instead of scraping one page source at the end. Returns the same dict as scrape_chat, or None if loading was aborted.'''
+
+    messages = stream_chat_messages(
+        driver, engine, load_timeout, timeout_policy, checkpoint, media=media)
+    if messages is None:
+        return None
+
+    return group_messages_by_date(messages)
+
+
+def stream_chat_messages(driver, engine='bs4', load_timeout=60, timeout_policy='prompt', checkpoint=None, stop_at=None, media=None):
+    '''Loads and scrapes the selected chat as it loads (see stream_selected_chat) and returns its list of scraped messages in chat order, or None if loading was aborted.
+
+    Rows are deduped by data-id and kept in chat order as they're harvested, so messages that WhatsApp later evicts from the DOM are still exported.
+
+    If checkpoint is a chat name, progress is saved to that chat's checkpoint as it loads and a previous checkpoint is resumed: its messages are neither transferred nor scraped again, and if loading stops short of where it got to, its older messages are kept.
+
+    If stop_at is a data-id, loading stops as soon as that message and the date divider above it have loaded instead of loading the entire chat history, and only the messages from that date onwards are scraped.
+
+    If given a MediaDownloader as media, the media of each batch of messages is queued and a batch of it fetched before loading more, while the rows are still on the page.
+    '''
+
+    # Harvested rows in chat order, and the data-ids of the harvested messages
+    rows, harvested_ids = deque(), set()
+
+    # Reuse the scraped messages of an earlier run
+    checkpoint_rows = []
+    if checkpoint:
+        saved = load_checkpoint(checkpoint)
+        if saved:
+            checkpoint_rows = saved['rows']
+            print(
+                f"Resuming '{checkpoint}' from checkpoint w/ {len(saved['ids'])} messages...")
+    known_rows = {row.data_id: row for row in checkpoint_rows if isinstance(row, Message)}
+    if known_rows:
+        driver.execute_script(SET_KNOWN_IDS_SCRIPT, list(known_rows))
+    last_saved = timer()
+
+    def harvest(message_list_element):
+        nonlocal last_saved
+
+        # Scrape the rows that loaded since the last batch, skipping messages we already have
+        older_rows, newer_rows = [], []
+        for data_id, row_html, is_older in harvest_loaded_rows(driver, message_list_element):
+            if data_id:
+                if data_id in harvested_ids:
+                    continue
+                harvested_ids.add(data_id)
+
+            # Known messages come back w/o HTML, so take them from the checkpoint
+            row = known_rows[data_id] if row_html is None else row_html
+            (older_rows if is_older else newer_rows).append(row)
+
+        # Older messages load above the ones we have, while new incoming messages are appended below
+        older_rows, newer_rows = scrape_harvested_rows(older_rows, engine), scrape_harvested_rows(newer_rows, engine)
+        rows.extendleft(reversed(older_rows))
+        rows.extend(newer_rows)
+
+        # Fetch a batch of media at a time, so it's fetched before WhatsApp drops the rows w/o holding up loading
+        if media:
+            media.queue(row.data_id for row in older_rows + newer_rows
+                        if isinstance(row, Message) and row.has_media)
+            media.fetch(driver, message_list_element)
+
+        # Save progress every so often
+        if checkpoint and timer() - last_saved >= CHECKPOINT_INTERVAL:
+            save_checkpoint(checkpoint, merge_checkpoint_rows(
+                rows, checkpoint_rows, harvested_ids))
+            last_saved = timer()
+
+        # Stop loading once we've reached the message we were looking for (and its date)
+        return stop_at in harvested_ids and rows_since_date_of(rows, stop_at) is not None
+
+    # Make sure progress is saved even if loading is aborted or the browser crashes
+    try:
+        chat_is_loaded = load_selected_chat(
+            driver, harvest, load_timeout, timeout_policy)
+    finally:
+        rows = merge_checkpoint_rows(rows, checkpoint_rows, harvested_ids)
+        if checkpoint and rows:
+            save_checkpoint(checkpoint, rows)
+
+    if not chat_is_loaded:
+        return None
+
+    # Skip the messages older than the date of the message we were looking for
+    if stop_at in harvested_ids:
+        rows = rows_since_date_of(rows, stop_at)
+
+    print("Scraping messages...", end="\r")
+    return resolve_messages(rows)
+
+
+def rows_since_date_of(rows, data_id):
+    '''Returns the rows starting at the date divider of the message w/ the given data-id, or None if that message or its date divider aren't among the rows'''
+
+    date_index = None
+    for index, row in enumerate(rows):
+        if not isinstance(row, Message):
+            date_index = index
+        elif row.data_id == data_id:
+            return None if date_index is None else list(rows)[date_index:]
+
+    return None
+
+
+@profiled('scrape batch')
+def scrape_harvested_rows(harvested_rows, engine='bs4'):
+    '''Scrapes harvested rows given as HTML strings and returns them in order, passing through rows that were already scraped'''
+
+    scraped = iter(scrape_rows_html(
+        [row for row in harvested_rows if isinstance(row, str)], engine))
+    rows = [next(scraped) if isinstance(row, str) else row for row in harvested_rows]
+    return [row for row in rows if row]
+
+
+def harvest_loaded_rows(driver, message_list_element):
+    '''Returns the 'Message list' rows that haven't been harvested yet as a list of [data-id, outerHTML, is_older] in DOM order, and marks them as harvested.
+
+    A row is older when it loaded above every previously harvested message (i.e. from scrolling up), otherwise it is a newly received message.
+    '''
+
+    return driver.execute_script(HARVEST_ROWS_SCRIPT, message_list_element)
+
+
+@profiled('extract in browser', sample_memory=True)
+def extract_chat_in_browser(driver, page_size=2000):
+    '''Scrapes the loaded chat inside the browser instead of transferring and parsing the whole page source. Returns the same dict as scrape_chat.
+
+    The message list rows are scraped by EXTRACT_ROWS_SCRIPT, which returns compact JSON records a page of rows at a time, so Python only has to parse dates and resolve the messages.
+    '''
+
+    print("Scraping messages...", end="\r")
+
+    # Get the 'Message list' element that is a container for all messages in the right chat pane
+    message_list_element = driver.find_element_by_xpath(
+        '//*[@id="main"]/div[3]/div/div/div[2]')
+
+    # Fetch the rows one page at a time
+    rows, start, total = [], 0, None
+    while total is None or start < total:
+        page = driver.execute_script(
+            EXTRACT_ROWS_SCRIPT, message_list_element, start, page_size, RICH_TEXT_MARKERS if text_settings['markdown'] else None)
+        total = page['total']
+        rows.extend(row for row in map(scrape_record, page['rows']) if row)
+        start += page_size
+        print(
+            f"Scraping message rows {min(start, total)} of {total}", end="\r")
+
+    return group_messages_by_date(resolve_messages(rows))
+
+
+class MediaDownloader:
+    '''Fetches the media of a chat's messages from the page and stores it in the media store of export_dir (see MEDIA_DIR), where each file is named by the hash of its contents.
+
+    Media is fetched from the driver's thread in batches (see MEDIA_BATCH_SIZE, MEDIA_BATCH_BYTES), while a pool of workers decodes, hashes and writes the files. At most 2 files per worker wait to be written, so memory stays bounded when the disk can't keep up. Use it as a context manager, so the workers are shut down even when loading fails.
+    '''
+
+    def __init__(self, export_dir='exports', workers=MEDIA_WORKERS):
+        self.export_dir = export_dir
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='media')
+        self.write_slots = threading.BoundedSemaphore(workers * 2)
+
+        # Data-ids whose media is still to be fetched, the files being written as (data-id, future) and the # of messages that were gone from the page
+        self.queued, self.queued_ids = deque(), set()
+        self.writes, self.missing = [], 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.pool.shutdown(wait=True)
+
+    def queue(self, data_ids):
+        '''Queues the media of the messages w/ the given data-ids to be fetched'''
+
+        for data_id in data_ids:
+            if data_id not in self.queued_ids:
+                self.queued_ids.add(data_id)
+                self.queued.append(data_id)
+
+    def fetch(self, driver, message_list_element, batches=1):
+        '''Fetches up to the given number of batches of queued media (all of it if batches is None) and hands the files to the workers'''
+
+        while self.queued and (batches is None or batches > 0):
+            data_ids = [self.queued.popleft() for _ in range(min(MEDIA_BATCH_SIZE, len(self.queued)))]
+            with profile_phase('fetch media'):
+                media = driver.execute_async_script(
+                    FETCH_MEDIA_SCRIPT, message_list_element, data_ids, MEDIA_BATCH_BYTES)
+
+            # Put back the messages the fetch didn't get to
+            self.queued.extendleft(reversed([data_id for data_id in data_ids if data_id not in media]))
+
+            for data_id, files in media.items():
+                if files is None:
+                    self.missing += 1
+                    continue
+                for media_file in files:
+                    self.write_slots.acquire()
+                    write = self.pool.submit(self.store, media_file['data'], media_file['type'])
+                    write.add_done_callback(lambda _: self.write_slots.release())
+                    self.writes.append((data_id, write))
+
+            if batches is not None:
+                batches -= 1
+
+    def store(self, data, mime_type):
+        '''Writes a fetched file to the media store unless it's already there. Returns its path relative to the export directory and whether it's new.'''
+
+        content = base64.b64decode(data)
+        digest = hashlib.sha256(content).hexdigest()
+        extension = mimetypes.guess_extension((mime_type or '').split(';')[0].strip()) or ''
+        path = f"{MEDIA_DIR}/{digest[:2]}/{digest}{extension}"
+
+        file_path = os.path.join(self.export_dir, MEDIA_DIR, digest[:2], f"{digest}{extension}")
+        if os.path.isfile(file_path):
+            return path, False
+
+        # Write to a temporary file first, so a file in the store is always complete even when another chat writes it at the same time
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        temporary_path = f"{file_path}.{threading.get_ident()}.tmp"
+        with open(temporary_path, 'wb') as media_file:
+            media_file.write(content)
+        os.replace(temporary_path, file_path)
+        return path, True
+
+    def finish(self, driver):
+        '''Fetches the media that's still queued and waits for every file to be written. Returns a dict of the stored files' paths by data-id.'''
+
+        if self.queued:
+            print("Fetching media...", end="\r")
+            message_list_element = driver.find_element_by_xpath(
+                "//*[@id='main']/div[3]/div/div/div[contains(@aria-label,'Message list')]")
+            self.fetch(driver, message_list_element, batches=None)
+
+        media_paths, stored, new, failed = {}, 0, 0, 0
+        for data_id, write in self.writes:
+            try:
+                path, is_new = write.result()
+            except (OSError, ValueError) as error:
+                print(f"Warning! A media file of message '{data_id}' could not be stored. Error info: {error}")
+                failed += 1
+                continue
+            media_paths.setdefault(data_id, []).append(path)
+            stored, new = stored + 1, new + is_new
+
+        print(f"Success! Stored {stored} media files of {len(media_paths)} messages in '{os.path.join(self.export_dir, MEDIA_DIR)}' ({new} new, {stored - new} already stored).")
+        if self.missing or failed:
+            print(f"Warning! The media of {self.missing} messages was no longer on the page and {failed} files could not be stored.")
+        return media_paths
+
+
+def attach_media(scraped, media_paths):
+    '''Replaces '<Media omitted>' in the scraped messages that have stored media w/ their files' paths (see MEDIA_ATTACHED)'''
+
+    for messages in scraped.values():
+        for message in messages:
+            paths = media_paths.get(message.data_id)
+            if paths and message.message.startswith('<Media omitted>'):
+                message.message = " ".join(MEDIA_ATTACHED.format(path=path)
+                                           for path in paths) + message.message[len('<Media omitted>'):]
+
+
+@profiled('search')
+def find_selected_chat(driver, selected_chat):
+    '''Searches and loads the initial chat. Returns True/False if the chat is found and can be loaded.
+
+    Assumptions:
+    1) The chat is searchable and exists because we scraped it earlier in get_chats
+    2) The searched chat will always be the first element under the search input box
+    '''
+
+    print(f"Searching for '{selected_chat}'...", end="\r")
+
+    # Find the chat via search (xpath == 'Search or start new chat' element)
+    chat_search = driver.find_element_by_xpath(
+        '//*[@id="side"]/div[1]/div/label/div/div[2]')
+    chat_search.click()
+
+    # Type the chat name into the search box using a JavaScript hack because Selenium/Chromedriver doesn't support all unicode chars - https://bugs.chromium.org/p/chromedriver/issues/detail?id=2269
+    driver.execute_script(
+        f"arguments[0].innerHTML = '{selected_chat}'", chat_search)
+
+    # Manually fire the JS listeners/events with keyboard input that adds/removes a space at end of search string
+    chat_search.send_keys(Keys.END)
     chat_search.send_keys(Keys.SPACE)
     chat_search.send_keys(Keys.BACKSPACE)
 
@@ -513,559 +1954,1202 @@ def find_selected_chat(driver, selected_chat):
                 return False
 
 
-def scrape_chat(driver):
+def scrape_chat(driver, engine='bs4'):
     '''Turns the chat into soup and scrapes it for key export information: message sender, message date/time, message contents'''
 
     print("Scraping messages...", end="\r")
 
-    # Make soup
-    soup = BeautifulSoup(driver.page_source, 'lxml')
+    # Scrape the page source currently rendered in the browser
+    return parse_page(capture_page_source(driver), engine)
 
-    # Get the 'Message list' element that is a container for all messages in the right chat pane
-    message_list = driver.find_element_by_xpath(
-        '//*[@id="main"]/div[3]/div/div/div[2]').get_attribute('class')
 
-    # Search for and only keep HTML elements which contain actual messages
-    chat_messages = [
-        msg for msg in soup.find("div", message_list).contents if 'message' in " ".join(msg.get('class'))]
-    chat_messages_count = len(chat_messages)
+def capture_page_source(driver):
+    '''Returns the page source currently rendered in the browser'''
 
-    # Get users profile name
-    you = get_users_profile_name(chat_messages)
+    with profile_phase('page source', sample_memory=True):
+        return driver.page_source
 
-    # Loop thru all chat messages, scrape chat info into a dict, and add it to a list
-    messages = []
-    messages_count = 0
-    last_msg_date = None
-    for message in chat_messages:
-        # Count messages for progress message to user and to compare expected vs actual scraped chat messages
-        messages_count += 1
-        print(
-            f"Scraping message {messages_count} of {chat_messages_count}", end="\r")
-
-        # Dictionary for holding chat information (sender, msg date/time, msg contents, message content types, and data-id for debugging)
-        message_scraped = {
-            "sender": None,
-            "datetime": None,
-            "message": None,
-            "has_copyable_text": False,
-            "has_selectable_text": False,
-            "has_emoji_text": False,
-            "has_media": False,
-            "has_recall": False,
-            "data-id": message.get('data-id')
-        }
 
-        # Approach for scraping: search for everything we need in 'copyable-text' to start with, then 'selectable-text', and so on as we look for certain HTML patterns. As patterns are identified, update the message_scraped dict.
-        # Check if message has 'copyable-text' (copyable-text tends to be a container div for messages that have text in it, storing sender/datetime within data-* attributes)
-        copyable_text = message.find('div', 'copyable-text')
-        if copyable_text:
-            message_scraped['has_copyable_text'] = True
+def parse_page(html_or_path, engine='bs4'):
+    '''Scrapes a saved WhatsApp page source (an HTML string or a path to an .html file) without a browser. Returns the same dict as scrape_chat.'''
 
-            # Scrape the 'copyable-text' element for the message's sender, date/time, and contents
-            copyable_scrape = scrape_copyable(copyable_text)
+    rows = scrape_page_rows(read_page_source(html_or_path), engine)
+    return group_messages_by_date(resolve_messages(rows))
 
-            # Update the message object
-            message_scraped['datetime'] = copyable_scrape['datetime']
-            last_msg_date = message_scraped['datetime']
-            message_scraped['sender'] = copyable_scrape['sender']
-            message_scraped['message'] = copyable_scrape['message']
-
-            # Check if message has 'selectable-text' (selectable-text tends to be a copyable-text child container span/div for messages that have text in it, storing the actual chat message text/emojis)
-            if copyable_text.find('span', 'selectable-text'):
-                # Span element
-                selectable_text = copyable_text.find(
-                    'span', 'selectable-text')
-            else:
-                # Div element
-                selectable_text = copyable_text.find(
-                    'div', 'selectable-text')
 
-            # Check if message has emojis and overwrite the message object w/ updated chat message
-            if selectable_text:
-                message_scraped['has_selectable_text'] = True
+def read_page_source(html_or_path):
+    '''Returns the page source itself, reading it from disk unless we were handed the HTML'''
 
-                # Does it contain emojis? Emoji's are renderd as <img> elements which are child to the parent span/div container w/ selectable-text class
-                if selectable_text.find('img'):
-                    message_scraped['has_emoji_text'] = True
+    if isinstance(html_or_path, os.PathLike) or not html_or_path.lstrip().startswith('<'):
+        with open(html_or_path, encoding='utf-8') as html_file:
+            return html_file.read()
+    return html_or_path
 
-                # Get message from selectable and overwrite existing chat message
-                message_scraped['message'] = scrape_selectable(
-                    selectable_text, message_scraped['has_emoji_text'])
 
-        # Check if message was recalled
-        if is_recall_in_message(message):
-            message_scraped['has_recall'] = True
+def find_message_list(soup):
+    '''Returns the 'Message list' element from the soup without asking the browser for it, or None if the page has no open chat'''
 
-            # Update the message object
-            message_scraped['datetime'] = find_chat_datetime_when_copyable_does_not_exist(
-                message, last_msg_date)
-            last_msg_date = message_scraped['datetime']
-            message_scraped['sender'] = you
-            message_scraped['message'] = "<You deleted this message>"
-
-        # Check if the message has media
-        message_scraped['has_media'] = is_media_in_message(message)
-        if message_scraped['has_media']:
-            # Check if it also has text
-            if message_scraped['has_copyable_text']:
-                # Update chat message w/ media omission (note that copyable has already scraped the sender + datetime)
-                message_scraped['message'] = f"<Media omitted> {message_scraped['message']}"
+    # Walk the same path the browser uses (xpath == //*[@id="main"]/div[3]/div/div/div[2])
+    message_list = soup.find(id='main')
+    for position in (3, 1, 1, 2):
+        if not message_list:
+            break
+        divs = message_list.find_all('div', recursive=False)
+        message_list = divs[position - 1] if len(divs) >= position else None
+    if message_list:
+        return message_list
 
-            else:
-                # Without copyable, we need to scrape the sender in a different way
-                if 'message-out' in message.get('class'):
-                    # Message was sent by the user
-                    message_scraped['sender'] = you
-                elif 'message-in' in message.get('class'):
-                    # Message was sent from a friend of the user
-                    message_scraped['sender'] = find_media_sender_when_copyable_does_not_exist(
-                        message)
-                    if not message_scraped['sender']:
-                        # Only occurs intermittently when the senders name does not exist in the message - so we take the last message's sender
-                        message_scraped['sender'] = messages[-1]['sender']
-                else:
-                    pass
+    # Otherwise fall back to the div w/ aria-label set to 'Message list. Press right arrow key...'
+    return soup.find('div', attrs={'aria-label': lambda label: label and 'Message list' in label})
 
-                # Get the date/time and update the message object
-                message_scraped['datetime'] = find_chat_datetime_when_copyable_does_not_exist(
-                    message, last_msg_date)
-                last_msg_date = message_scraped['datetime']
-                message_scraped['message'] = '<Media omitted>'
 
-        # Add the message object to list
-        if 'grouped-sticker' not in message.get('data-id'):
-            messages.append(message_scraped.copy())
+def scrape_page_rows(page_source, engine='bs4'):
+    '''Scrapes every row of the page's 'Message list' w/ the selected parsing engine (one of PARSING_ENGINES) and returns them in order. See scrape_row for what each row holds.'''
+
+    if engine not in PARSING_ENGINES:
+        raise ValueError(
+            f"'{engine}' is not a parsing engine. Valid engines are: {', '.join(PARSING_ENGINES)}")
+
+    # W/ more than one process, parse the page w/ lxml first to see if it has enough rows to be worth scraping in parallel (see scrape_page_rows_in_parallel)
+    message_list = None
+    processes = parsing_settings['processes']
+    if processes > 1:
+        with profile_phase('soup build'):
+            message_list = find_message_list_lxml(
+                lxml.html.document_fromstring(page_source))
+        if message_list is not None and len(message_list) >= PARALLEL_MIN_ROWS:
+            return scrape_page_rows_in_parallel(message_list, engine, processes)
+
+    # Parse the page and get the 'Message list' element that is a container for all messages in the right chat pane
+    with profile_phase('soup build'):
+        if engine == 'bs4':
+            message_list = find_message_list(BeautifulSoup(page_source, 'lxml'))
+            children = message_list.contents if message_list else []
+            chat_messages_count = sum(1 for child in children if child.name and 'message' in " ".join(
+                child.get('class') or []))
+            scrape = scrape_row
         else:
-            # Make duplicate entry for grouped sticker to match behavior with WhatsApp export (i.e. a group sticker == 2 lines in the txt export both with <Media omitted> messages)
-            messages.append(message_scraped.copy())
-            messages.append(message_scraped.copy())
+            if processes == 1:
+                message_list = find_message_list_lxml(
+                    lxml.html.document_fromstring(page_source))
+            children = list(message_list) if message_list is not None else []
+            chat_messages_count = sum(1 for child in children if isinstance(child.tag, str) and 'message' in (
+                child.get('class') or ''))
+            scrape = scrape_row_lxml
+
+    if message_list is None:
+        raise ValueError(
+            "Page source does not contain a WhatsApp message list. Make sure a chat was open when the page was saved.")
 
-            # Finally, update expectd msg count
-            chat_messages_count += 1
+    # Scrape each message and date divider, skipping any other rows
+    rows = []
+    messages_count = 0
+    with profile_phase('scrape messages') as phase:
+        for child in children:
+            row = scrape(child)
+            if not row:
+                continue
+            rows.append(row)
 
-        # Loop to the next chat message
-        continue
+            # Count messages for progress message to user
+            if isinstance(row, Message):
+                messages_count += 1
+                print(
+                    f"Scraping message {messages_count} of {chat_messages_count}", end="\r")
+        phase['items'] = messages_count
 
-    # Scrape summary
-    if len(messages) == chat_messages_count:
-        print(f"Success! All {len(messages)} messages have been scraped.")
+    return rows
+
+
+def scrape_page_rows_in_parallel(message_list, engine='bs4', processes=2):
+    '''Scrapes every row of a page's 'Message list' (as parsed by lxml) like scrape_page_rows, but split into chunks that a pool of processes scrapes at the same time, which scales w/ the CPU's cores for large chats.
+
+    Each row is scraped on its own (see scrape_row) and the dates and senders that come from earlier rows are only filled in by resolve_messages afterwards, so chunk boundaries don't matter and the rows are identical to scrape_page_rows'.
+    '''
+
+    # Split the 'Message list' into the HTML of its rows
+    with profile_phase('split rows'):
+        rows_html = [lxml.html.tostring(child, encoding='unicode', with_tail=False)
+                     for child in message_list if isinstance(child.tag, str)]
+        chunk_size = -(-len(rows_html) // (processes * PARALLEL_CHUNKS_PER_PROCESS))
+        chunks = [rows_html[start:start + chunk_size] for start in range(0, len(rows_html), chunk_size)]
+
+    print(f"Scraping {len(rows_html)} rows in {processes} processes...", end="\r")
+    with profile_phase('scrape messages') as phase:
+        # Spawn fresh processes rather than forking this one, which may be running exporter or media threads
+        locale = datetime_settings['locale']
+        with ProcessPoolExecutor(processes, mp_context=multiprocessing.get_context('spawn'), initializer=apply_parsing_settings,
+                                 initargs=(locale, DATETIME_LOCALES[locale], datetime_settings['datetime_format'], text_settings['markdown'])) as pool:
+            rows = [row for chunk_rows in pool.map(scrape_rows_html, chunks, [engine] * len(chunks))
+                    for row in chunk_rows if row]
+        phase['items'] = sum(1 for row in rows if isinstance(row, Message))
+
+    return rows
+
+
+def apply_parsing_settings(locale_name, locale, datetime_format, markdown):
+    '''Applies the date/time locale (and the format detected so far) and text settings of the main process in a process of scrape_page_rows_in_parallel, which starts w/ the defaults'''
+
+    DATETIME_LOCALES[locale_name] = locale
+    set_datetime_locale(locale_name)
+    datetime_settings['datetime_format'] = datetime_format
+    text_settings['markdown'] = markdown
+
+
+def scrape_rows_html(rows_html, engine='bs4'):
+    '''Scrapes a list of 'Message list' rows given as HTML strings w/ the selected parsing engine. Returns a row for each HTML string (see scrape_row), which is None for rows that are neither messages nor date dividers.'''
+
+    if not rows_html:
+        return []
+
+    # Parse all the rows at once inside a container div
+    fragment = f"<div>{''.join(rows_html)}</div>"
+    if engine == 'bs4':
+        children = BeautifulSoup(fragment, 'lxml').find('div').contents
+        scrape = scrape_row
+    elif engine == 'lxml':
+        children = list(lxml.html.fragment_fromstring(fragment))
+        scrape = scrape_row_lxml
     else:
-        print(
-            f"Warning! {len(messages)} messages scraped but {chat_messages_count} expected.")
+        raise ValueError(
+            f"'{engine}' is not a parsing engine. Valid engines are: {', '.join(PARSING_ENGINES)}")
 
-    # Create a dict with chat date as key and empty list as value which will store all msgs for that date
-    messages_dict = {msg_list['datetime'].strftime(
-        "%m/%d/%Y"): [] for msg_list in messages}
+    return [scrape(child) for child in children]
 
-    # Update the dict by inserting message content as values
-    for m in messages:
-        messages_dict[m['datetime'].strftime("%m/%d/%Y")].append(
-            {'time': m['datetime'].strftime("%I:%M %p"), 'sender': m['sender'], 'message': m['message']})
 
-    return messages_dict
+def scrape_record(record):
+    '''Turns a row record from EXTRACT_ROWS_SCRIPT into a row like the ones scrape_row returns, or None for rows that are neither messages nor date dividers'''
 
+    if not record:
+        return None
+    elif 'divider' in record:
+        return {'divider': record['divider']}
 
-def get_users_profile_name(chat_messages):
-    '''Returns the user's profile name so we can determine who 'You' is in the conversation.
+    row = new_message_row(record['id'], record['classes'])
 
-    WhatsApp's default 'export' fucntionality renders the users profile name and never 'You'.
-    '''
+    # Get the sender, date/time, and msg contents from copyable-text, preferring the text/emojis of selectable-text
+    if record['copyable']:
+        row.has_copyable_text = True
+        row.sender, row.datetime = parse_pre_plain_text(record['pre'])
+        row.message = record['content']
 
-    you = None
-    for chat in chat_messages:
-        if 'message-out' in chat.get('class'):
-            chat_exists = chat.find('div', 'copyable-text')
-            if chat_exists:
-                you = chat.find(
-                    'div', 'copyable-text').get('data-pre-plain-text').strip()[1:-1].split('] ')[1]
-                break
-    return you
+        if record['text'] is not None:
+            row.has_selectable_text = True
+            row.has_emoji_text = record['emoji']
+            row.message = record['text']
 
+    row.has_recall = record['recall']
+    row.has_media = record['media']
+    if row.has_media and row.has_copyable_text:
+        row.message = f"<Media omitted> {row.message}"
 
-def scrape_copyable(copyable_text):
-    '''Returns a dict with values for sender, date/time, and contents of the WhatsApp message'''
+    # Span texts and sender are only sent for messages that need them (see scrape_message)
+    if record['spans'] is not None:
+        row.shown_time = find_message_time(record['spans'])
+    row.media_sender = record['sender']
 
-    copyable_scrape = {'sender': None, 'datetime': None, 'message': None}
+    return row
 
-    # Get the elements attributes that hold the sender and date/time values
-    copyable_attrs = copyable_text.get(
-        'data-pre-plain-text').strip()[1:-1].split('] ')
 
-    # Get the sender, date/time, and msg contents
-    copyable_scrape['sender'] = copyable_attrs[1]
-    copyable_scrape['datetime'] = parse_datetime(
-        f"{copyable_attrs[0].split(', ')[1]} {copyable_attrs[0].split(', ')[0]}")
+def scrape_row(row):
+    '''Returns what can be scraped from a single 'Message list' row on its own, or None for rows that are neither messages nor date dividers.
 
-    # Get the text-only portion of the message contents (always in a span w/ copyable-text class)
-    content = copyable_text.find('span', 'copyable-text')
-    if content:
-        copyable_scrape['message'] = content
-    else:
-        copyable_scrape['message'] = ''
+    Date dividers (divs w/o data-id) are returned as {'divider': <date text>}. Messages are returned as a Message w/ what the row holds, plus the row's direction ('in'/'out'/None), shown_time (hour/minute time text) and media_sender (sender name), where the last two are only scraped when the message has no copyable-text to take them from. Anything that depends on other messages is filled in later by resolve_messages.
+    '''
 
-    return copyable_scrape
+    # Skip text
+    if row.name is None:
+        return None
 
+    if 'message' in " ".join(row.get('class') or []):
+        return scrape_message(row)
+    elif row.name == 'div' and row.get('data-id') is None:
+        return {'divider': row.text}
+    else:
+        return None
 
-def scrape_selectable(selectable_text, has_emoji=False):
-    '''Returns message contents of a chat by checking for and handling emojis'''
 
-    # Does it contain emojis?
-    if has_emoji:
-        # Construct the message manually because emoji content is broken up into many span/img elements that we need to loop through
-        # Loop over every child span of selectable-text, as these wrap the text and emojis/imgs
-        message = ''
-        for span in selectable_text.find_all('span'):
-
-            # Loop over every child element of the span to construct the message
-            for element in span.contents:
-                # Check what kind of element it is
-                if element.name is None:
-                    # Text, ignoring empty strings
-                    if element == ' ':
-                        continue
-                    else:
-                        message += str(element)
-                elif element.name == 'img':
-                    # Emoji
-                    message += element.get('alt')
-                else:
-                    # Skip other elements (note: have not found any occurrences of this happening...yet)
-                    continue
+def new_message_row(data_id, classes):
+    '''Returns an empty Message for scrape_row to fill in w/ chat information (sender, msg date/time, msg contents, message content types, and data-id for debugging)'''
 
-        return message
+    # Note who sent the message (a message-out was sent by the user)
+    if 'message-out' in classes:
+        direction = 'out'
+    elif 'message-in' in classes:
+        direction = 'in'
     else:
-        # Return the text only
-        return selectable_text.text
-
-
-def is_recall_in_message(message):
-    '''Returns True if message contains recall pattern (a span will contain 'recalled' in data-*), if not returns False.'''
-    # Check if message contains spans
-    spans = message.find_all('span')
-    if spans:
-        # Check all spans for recalled
-        for span in spans:
-            if span.get('data-testid') == 'recalled':
-                return True
+        direction = None
 
-    return False
+    return Message(data_id, direction)
 
 
-def find_chat_datetime_when_copyable_does_not_exist(message, last_msg_date):
-    '''Returns a message's date/time when there's no 'copyable-text' attribute within the message e.g. deleted messages, media w/ no text, etc.'''
+def scrape_message(message):
+    '''Scrapes a single message row for its sender, date/time, contents and content types'''
 
-    spans = message.find_all('span')
-    # Check if spans exist
-    if spans:
-        for span in spans:
-            # Check spans w/ text if they are dates/times
-            if span.text:
-                try:
-                    parse_datetime(span.text, time_only=True)
-                except ValueError:
-                    # Span text is not a date/time value
-                    continue
-                else:
-                    # Get the hour/minute time from the media message
-                    message_time = span.text
-
-                    # Get a sibling div holding the latest chat date, otherwise if that doesn't exist then grab the last msg date
-                    try:
-                        # Check if row from message list is a date and not a chat, grabs the first available prior date (this fires for all but the first date of chat history messaging)
-                        sibling_date = message.find_previous_sibling(
-                            "div", attrs={'data-id': False}).text
-                        if not sibling_date:
-                            # Use the previous messages date if it exists
-                            if last_msg_date:
-                                sibling_date = last_msg_date.strftime(
-                                    '%m/%d/%Y')
-                            else:
-                                # Otherwise use the next available subsequent date (note this fires only on the first message w/ rare conditions when copyable-text doesn't exist; could assign the wrong date if for example the next available date is 1+ day in advance of the current message)
-                                sibling_date = message.find_next_sibling(
-                                    "div", attrs={'data-id': False}).text
-
-                        # Try converting to a date/time object
-                        media_message_datetime = parse_datetime(
-                            f"{sibling_date} {message_time}")
-
-                        # Build date/time object
-                        message_datetime = parse_datetime(
-                            f"{media_message_datetime.strftime('%m/%d/%Y')} {media_message_datetime.strftime('%I:%M %p')}")
-
-                        return message_datetime
-
-                    # Otherwise last message's date/time (note this could assign the wrong date if for example the last message was 1+ days ago)
-                    except ValueError:
-                        message_datetime = parse_datetime(
-                            f"{last_msg_date.strftime('%m/%d/%Y')} {message_time}")
-
-                        return message_datetime
+    message_scraped = new_message_row(message.get('data-id'), message.get('class'))
 
-    else:
-        return None
+    # Walk the message's HTML once to collect every pattern we look for below
+    features = classify_message(message)
 
+    # Approach for scraping: search for everything we need in 'copyable-text' to start with, then 'selectable-text', and so on as we look for certain HTML patterns. As patterns are identified, update the message_scraped object.
+    # Check if message has 'copyable-text' (copyable-text tends to be a container div for messages that have text in it, storing sender/datetime within data-* attributes)
+    copyable_text = features['copyable_text']
+    if copyable_text:
+        message_scraped.has_copyable_text = True
 
-def parse_datetime(text, time_only=False):
-    '''Try parsing and returning datetimes in a North American standard, otherwise raise a ValueError'''
-    # TODO lazy approach to handling variances of North America date/time values MM/DD/YYYY AM/PM or YYYY-MM-DD A.M./P.M.
+        # Scrape the 'copyable-text' element for the message's sender, date/time, and contents
+        copyable_scrape = scrape_copyable(copyable_text)
 
-    # Normalize the text
-    text = text.upper().replace("A.M.", "AM").replace("P.M.", "PM")
+        # Update the message object
+        message_scraped.datetime = copyable_scrape['datetime']
+        message_scraped.sender = copyable_scrape['sender']
+        message_scraped.message = copyable_scrape['message']
 
-    # Try parsing when text is some datetime value e.g. 2/15/2021 2:35 P.M.
-    if not time_only:
-        for fmt in ('%m/%d/%Y %I:%M %p', '%Y-%m-%d %I:%M %p'):
-            try:
-                return datetime.strptime(text, fmt)
-            except ValueError:
-                continue
-        raise ValueError(
-            f"{text} does not match a valid datetime format of '%m/%d/%Y %I:%M %p' or '%Y-%m-%d %I:%M %p'. Make sure your WhatsApp language settings on your phone are set to English.")
+        # Check if message has 'selectable-text' (selectable-text tends to be a copyable-text child container span/div for messages that have text in it, storing the actual chat message text/emojis)
+        selectable_text = features['selectable_text']
 
-    # Try parsing when text is some time value e.g. 2:35 PM
-    else:
-        try:
-            return datetime.strptime(text, '%I:%M %p')
-        except ValueError:
-            pass
-        raise ValueError(
-            f"{text} does not match expected time format of '%I:%M %p'. Make sure your WhatsApp language settings on your phone are set to English.")
+        # Check if message has emojis and overwrite the message object w/ updated chat message
+        if selectable_text:
+            message_scraped.has_selectable_text = True
 
+            # Does it contain emojis? Emoji's are renderd as <img> elements which are child to the parent span/div container w/ selectable-text class
+            if features['has_emoji_text']:
+                message_scraped.has_emoji_text = True
 
-def is_media_in_message(message):
-    '''Returns True if media is discovered within the message by checking the soup for known media flags. If not, it returns False.'''
+            # Get message from selectable and overwrite existing chat message
+            message_scraped.message = scrape_selectable(
+                selectable_text, message_scraped.has_emoji_text)
 
-    # First check for data-testid attributes containing 'media' or 'download' (this covers gifs, videos, downloadable content)
-    possible_media_spans = message.find_all(attrs={'data-testid': True})
-    for span in possible_media_spans:
-        # Media types are stored in 'data-testid' attribute
-        media_attr = span.get('data-testid')
+    # Check if message was recalled or has media
+    message_scraped.has_recall = features['has_recall']
+    message_scraped.has_media = features['has_media']
 
-        if 'media' in media_attr or 'download' in media_attr:
-            return True
-        else:
-            continue
+    # Update chat message w/ media omission (media messages w/o copyable get their whole message from resolve_messages)
+    if message_scraped.has_media and copyable_text:
+        message_scraped.message = f"<Media omitted> {message_scraped.message}"
 
-    # Check if the media is a shared contact e.g. vCard/VCF, or a sticker
-    if message.get('class'):
-        # Check for shared contact
-        copyable = message.find('div', 'copyable-text')
-        if copyable:
-            # Get all buttons
-            buttons = copyable.find_all('div', {'role': 'button'})
-            if buttons:
-                # Look for contact card button pattern (2 divs w/ titles of 'Message X' and 'Add to a group')
-                for button in buttons:
-                    # Only check buttons with Title attribute
-                    if button.get('title'):
-                        # Check if 'Message' is in the title (full title would be for example 'Message Bob Ross')
-                        if 'Message' in button.get('title'):
-                            # Next sibling should always be the 'Add to a group' button
-                            if button.nextSibling:
-                                if button.nextSibling.get('title') == 'Add to a group':
-                                    return True
-
-        # Check for group sticker (2 side-by-side stickers)
-        if 'grouped-sticker' in message.get('data-id'):
-            return True
+    # Without copyable, recalled and media messages need their time and sender scraped in a different way
+    if message_scraped.has_recall or (message_scraped.has_media and not copyable_text):
+        message_scraped.shown_time = find_message_time(
+            span.text for span in features['spans'])
+    if message_scraped.has_media and not copyable_text and message_scraped.direction == 'in':
+        message_scraped.media_sender = find_media_sender_when_copyable_does_not_exist(
+            message, features)
 
-        # Check for individual sticker
-        images = message.find_all('img')
-        if images:
-            for image in images:
-                if 'blob' in image.get('src'):
-                    return True
+    return message_scraped
 
-    return False
 
+@profiled('resolve messages')
+def resolve_messages(rows):
+    '''Fills in the message values that depend on other rows and returns the list of scraped messages in chat order.
 
-def find_media_sender_when_copyable_does_not_exist(message):
-    '''Returns a sender's name when there's no 'copyable-text' attribute within the message'''
+    Messages w/o copyable-text take their date from the nearest date divider (or the last message's date) and their sender from the user's profile name or the last message's sender. The rows' Messages are filled in place rather than copied, which gives the same result if the rows are resolved again.
+    '''
 
-    # Check to see if senders name is stored in a span's aria-label attribute (note: this seems to be where it's stored if the persons name is just text / no emoji)
-    spans = message.find_all('span')
-    has_emoji = False
-    for span in spans:
-        if span.get('aria-label'):
-            # Last char in aria-label is always colon after the senders name
-            if span.get('aria-label') != 'Voice message':
-                return span.get('aria-label')[:-1]
-        elif span.find('img'):
-            # Emoji is in name and needs to be handled differently
-            has_emoji = True
-            break
-        else:
+    # Get users profile name
+    you = get_users_profile_name(rows)
+
+    # Find the nearest date divider after each row (only used when the first messages of the chat have no copyable-text)
+    next_dates, next_date = [None] * len(rows), None
+    for index in range(len(rows) - 1, -1, -1):
+        next_dates[index] = next_date
+        if not isinstance(rows[index], Message):
+            next_date = rows[index]['divider']
+
+    # Loop thru all chat messages and add them to a list
+    messages = []
+    chat_messages_count = 0
+    last_msg_date, previous_date = None, None
+    for index, row in enumerate(rows):
+        # Keep track of the latest date divider
+        if not isinstance(row, Message):
+            previous_date = row['divider']
             continue
 
-    # Manually construct the senders name if it has an emoji by building a string from span.text and img/emoji tags
-    if has_emoji:
-        # Get all elements from known emoji container span (always contained within a div that uses the class 'color-#' and will be the 0th child item)
-        emoji_name_elements = message.select("div[class*='color']")[0].next
-
-        # Loop over every child element of the span to construct the senders name
-        name = ''
-        for element in emoji_name_elements.contents:
-            # Check what kind of element it is
-            if element.name is None:
-                # Text, ignoring empty strings
-                if element == ' ':
-                    continue
-                else:
-                    name += str(element)
-            elif element.name == 'img':
-                # Emoji
-                name += element.get('alt')
+        # Count messages to compare expected vs actual scraped chat messages
+        chat_messages_count += 1
+        message = row
+
+        if message.has_copyable_text:
+            last_msg_date = message.datetime
+
+        # Check if message was recalled
+        if message.has_recall:
+            # Update the message object
+            message.datetime = find_chat_datetime_when_copyable_does_not_exist(
+                message.shown_time, previous_date, next_dates[index], last_msg_date)
+            last_msg_date = message.datetime
+            message.sender = you
+            message.message = "<You deleted this message>"
+
+        # Check if the message has media w/o text (media w/ text already had its message marked when it was scraped, and copyable has already scraped the sender + datetime)
+        if message.has_media and not message.has_copyable_text:
+            # Without copyable, we need to scrape the sender in a different way
+            if message.direction == 'out':
+                # Message was sent by the user
+                message.sender = you
+            elif message.direction == 'in':
+                # Message was sent from a friend of the user
+                message.sender = message.media_sender
+                if not message.sender and messages:
+                    # Only occurs intermittently when the senders name does not exist in the message - so we take the last message's sender
+                    message.sender = messages[-1].sender
             else:
-                # Skip other elements (note: have not found any occurrences of this happening...yet)
-                continue
+                pass
 
-        return name
+            # Get the date/time and update the message object
+            message.datetime = find_chat_datetime_when_copyable_does_not_exist(
+                message.shown_time, previous_date, next_dates[index], last_msg_date)
+            last_msg_date = message.datetime
+            message.message = '<Media omitted>'
 
-    # There is no sender name in the message, an issue that occurrs very infrequently (e.g. 6000+ msg chat occurred 3 times) - pattern for this seems to be 1) sender name has no emoji, 2) msg has media, 3) msg does not have text, 4) msg is a follow-up / consecutive message (doesn't have tail-in icon in message span/svg)
+        # Add the message object to list
+        if 'grouped-sticker' not in message.data_id:
+            messages.append(message)
+        else:
+            # Make duplicate entry for grouped sticker to match behavior with WhatsApp export (i.e. a group sticker == 2 lines in the txt export both with <Media omitted> messages)
+            messages.append(message)
+            messages.append(message)
+
+            # Finally, update expectd msg count
+            chat_messages_count += 1
+
+    # Scrape summary
+    if len(messages) == chat_messages_count:
+        print(f"Success! All {len(messages)} messages have been scraped.")
     else:
-        # TODO: Study this pattern more and fix later if possible. Solution for now is to return None and then we take the last message's sender from our data structure.
-        return None
+        print(
+            f"Warning! {len(messages)} messages scraped but {chat_messages_count} expected.")
 
+    return messages
 
-def scrape_is_exported(selected_chat, scraped):
-    '''Returns True/False if an export file type is selected and succesfully exported'''
 
-    print("\nSelect an export format.\n  Options:\n  txt\t\tExport to .txt file type\n  csv\t\tExport to .csv file type\n  html\t\tExport to .html file type\n  -abort\tAbort the export\n")
-    is_exported = False
-    while not is_exported:
-        # Ask user to select export type
-        response = input(
-            "What format do you want to export to? ")
+@profiled('group by date')
+def group_messages_by_date(messages):
+    '''Returns a dict with chat date as key and a list of that date's messages (time, sender, message) as value'''
 
-        # Check users response
-        if response.strip().lower() == 'txt':
-            if export_txt(selected_chat, scraped):
-                is_exported = True
-        elif response.strip().lower() == 'csv':
-            if export_csv(selected_chat, scraped):
-                is_exported = True
-        elif response.strip().lower() == 'html':
-            if export_html(selected_chat, scraped):
-                is_exported = True
-        elif response.strip().lower() == '-abort':
-            print(f"You've aborted the export for '{selected_chat}'.")
-            return False
-        else:
-            print(
-                f"Uh oh! '{response.strip().lower()}' is not a valid option. Try again.")
+    # Add each message to the list of its date, in one pass
+    messages_dict = {}
+    for m in messages:
+        date = format_message_date(m.datetime.date())
+        date_messages = messages_dict.get(date)
+        if date_messages is None:
+            date_messages = messages_dict[date] = []
+        date_messages.append(m)
 
-    return True
+    return messages_dict
 
 
-def export_txt(selected_chat, scraped):
-    '''Returns True if the scraped data for a selected export is written to local .txt file without any exceptions thrown'''
+class Message:
+    '''A scraped chat message, which can be read like a dict of its scrape (message['sender'], message['data-id'], etc.) plus its 'time' and 'date' as shown in exports.
 
-    # Make sure exports directory exists
-    export_dir_setup()
+    Uses slots instead of a dict per message, and formats its time/date from the one datetime it stores. Scraping a message row makes its Message right away (see new_message_row), along w/ the row values resolve_messages needs to fill in the rest: who sent it (direction), the time shown in it and the media sender's name.
+    '''
 
-    print(f"Exporting to local .txt file...", end="\r")
-    # Try exporting to a text file
-    try:
-        # Format file name as 'WhatsApp chat with [name] - [YYYY-MM-DD HH.MM.SS.AM/PM]'
-        now = datetime.now().strftime('%Y-%m-%d %H.%M.%S.%p')
+    __slots__ = ('datetime', 'sender', 'message', 'data_id', 'has_copyable_text',
+                 'has_selectable_text', 'has_emoji_text', 'has_media', 'has_recall',
+                 'direction', 'shown_time', 'media_sender')
 
-        # Write to file
-        with open(f"exports/WhatsApp Chat with {selected_chat} - {now}.txt", "wb") as text_file:
-            for date_write, messages_write in scraped.items():
-                for message_write in messages_write:
-                    line = f"{date_write}, {message_write['time']} - {message_write['sender']}: {message_write['message']}\n"
-                    encoded = line.encode()
-                    text_file.write(encoded)
+    # The slots that hold the message's scrape rather than its row's values
+    SCRAPED_SLOTS = __slots__[:9]
 
-        print(
-            f"Success! 'WhatsApp Chat with {selected_chat} - {now}.txt' exported.")
-        return True
+    def __init__(self, data_id, direction=None):
+        self.datetime = None
+        self.sender = None
+        self.message = None
+        self.data_id = data_id
+        self.has_copyable_text = False
+        self.has_selectable_text = False
+        self.has_emoji_text = False
+        self.has_media = False
+        self.has_recall = False
+        self.direction = direction
+        self.shown_time = None
+        self.media_sender = None
 
-    except Exception as error:
-        print(f"Error during txt export! Error info: {error}")
-        return False
+    def __getitem__(self, key):
+        if key == 'time':
+            return format_message_time(self.datetime.hour, self.datetime.minute)
+        elif key == 'date':
+            return format_message_date(self.datetime.date())
+        elif key == 'data-id':
+            return self.data_id
+        elif key in self.__slots__:
+            return getattr(self, key)
+        raise KeyError(key)
 
+    def to_dict(self):
+        '''Returns the message's scrape as a dict'''
 
-def export_csv(selected_chat, scraped):
-    '''Returns True if the scraped data for a selected export is written to local .csv file without any exceptions thrown'''
+        return {key.replace('data_id', 'data-id'): getattr(self, key) for key in self.SCRAPED_SLOTS}
 
-    # Make sure exports directory exists
-    export_dir_setup()
+    def __repr__(self):
+        return f"Message({self['date']}, {self['time']}, {self.sender!r}: {self.message!r})"
 
-    # Unpack into nested lists
-    data = []
-    for date, messages in scraped.items():
-        for message in messages:
-            # Unpack into a list
-            message = [date, message['time'],
-                       message['sender'], message['message']]
 
-            # Add to parent list
-            data.append(message)
+@lru_cache(maxsize=4096)
+def format_message_date(date):
+    '''Returns a message date as shown in exports e.g. 02/14/2021, cached since every message on a date shares it'''
 
-    print(f"Exporting to local .csv file...", end="\r")
-    # Try exporting to a csv file
+    return date.strftime("%m/%d/%Y")
+
+
+@lru_cache(maxsize=None)
+def format_message_time(hour, minute):
+    '''Returns a message time as shown in exports e.g. 02:04 PM, cached for each of the 1,440 minutes of a day'''
+
+    return datetime(1900, 1, 1, hour, minute).strftime("%I:%M %p")
+
+
+def classify_message(message):
+    '''Walks a message's HTML once and returns a dict of every pattern the scraper looks for.
+
+    The result matches what the separate find/find_all searches would return: the first div w/ 'copyable-text' class, the first span (otherwise div) w/ 'selectable-text' class inside it and whether that contains emoji imgs, the recall and media flags, and every span in document order for the date/time and sender lookups.
+    '''
+
+    features = {
+        "copyable_text": None,
+        "selectable_text": None,
+        "has_emoji_text": False,
+        "has_recall": False,
+        "has_media": False,
+        "spans": [],
+        "emoji_spans": set()
+    }
+
+    # Selectable-text candidates inside copyable-text (a span always wins over a div) and the ids of those containing an emoji img
+    selectable_span, selectable_div = None, None
+    selectables_with_emoji = set()
+
+    # Media flags that are only checked when the message has a class (see is_media_in_message_lxml)
+    has_contact_card, has_blob_image = False, False
+
+    # Spans and selectable-text candidates enclosing the element currently being visited
+    open_spans, open_selectables = [], []
+
+    def visit(element, inside_copyable):
+        nonlocal selectable_span, selectable_div, has_contact_card, has_blob_image
+
+        for child in element.children:
+            # Skip text
+            if child.name is None:
+                continue
+
+            classes = child.get('class') or ()
+            child_inside_copyable = inside_copyable
+            is_open_span, is_open_selectable = False, False
+
+            # Media types are stored in 'data-testid' attribute (covers gifs, videos, downloadable content)
+            testid = child.get('data-testid')
+            if testid and ('media' in testid or 'download' in testid):
+                features['has_media'] = True
+
+            if child.name == 'span':
+                features['spans'].append(child)
+                open_spans.append(child)
+                is_open_span = True
+
+                # Recalled messages have a span w/ 'recalled' in data-testid
+                if testid == 'recalled':
+                    features['has_recall'] = True
+
+                if inside_copyable and selectable_span is None and 'selectable-text' in classes:
+                    selectable_span = child
+                    open_selectables.append(child)
+                    is_open_selectable = True
+
+            elif child.name == 'div':
+                if features['copyable_text'] is None and 'copyable-text' in classes:
+                    features['copyable_text'] = child
+                    child_inside_copyable = True
+
+                if inside_copyable:
+                    if selectable_div is None and 'selectable-text' in classes:
+                        selectable_div = child
+                        open_selectables.append(child)
+                        is_open_selectable = True
+
+                    # Look for contact card button pattern (a div w/ title like 'Message Bob Ross' followed by an 'Add to a group' div)
+                    if child.get('role') == 'button' and 'Message' in (child.get('title') or ''):
+                        sibling = child.next_sibling
+                        if sibling is not None and sibling.name and sibling.get('title') == 'Add to a group':
+                            has_contact_card = True
+
+            elif child.name == 'img':
+                # Emojis are rendered as imgs, so flag every span and selectable-text candidate that encloses one
+                for span in open_spans:
+                    features['emoji_spans'].add(id(span))
+                for selectable in open_selectables:
+                    selectables_with_emoji.add(id(selectable))
+
+                # Stickers are imgs w/ a blob src
+                if 'blob' in (child.get('src') or ''):
+                    has_blob_image = True
+
+            visit(child, child_inside_copyable)
+
+            if is_open_span:
+                open_spans.pop()
+            if is_open_selectable:
+                open_selectables.pop()
+
+    visit(message, False)
+
+    # Pick the selectable-text element and check if it contains emojis
+    features['selectable_text'] = selectable_span or selectable_div
+    if features['selectable_text'] and id(features['selectable_text']) in selectables_with_emoji:
+        features['has_emoji_text'] = True
+
+    # Check for shared contact e.g. vCard/VCF, group sticker (2 side-by-side stickers) or individual sticker
+    if message.get('class'):
+        if has_contact_card or 'grouped-sticker' in message.get('data-id') or has_blob_image:
+            features['has_media'] = True
+
+    return features
+
+
+def get_users_profile_name(rows):
+    '''Returns the user's profile name so we can determine who 'You' is in the conversation.
+
+    WhatsApp's default 'export' fucntionality renders the users profile name and never 'You'.
+    '''
+
+    you = None
+    for row in rows:
+        # The first message sent by the user w/ copyable-text holds their name
+        if isinstance(row, Message) and row.direction == 'out' and row.has_copyable_text:
+            you = row.sender
+            break
+    return you
+
+
+def scrape_copyable(copyable_text):
+    '''Returns a dict with values for sender, date/time, and contents of the WhatsApp message'''
+
+    copyable_scrape = {'sender': None, 'datetime': None, 'message': None}
+
+    # Get the sender, date/time, and msg contents
+    copyable_scrape['sender'], copyable_scrape['datetime'] = parse_pre_plain_text(
+        copyable_text.get('data-pre-plain-text'))
+
+    # Get the text-only portion of the message contents (always in a span w/ copyable-text class)
+    content = copyable_text.find('span', 'copyable-text')
+    if content:
+        copyable_scrape['message'] = extract_rich_text(content, text_settings['markdown'])
+    else:
+        copyable_scrape['message'] = ''
+
+    return copyable_scrape
+
+
+def parse_pre_plain_text(pre_plain_text):
+    '''Returns the sender and date/time held in a copyable-text element's 'data-pre-plain-text' attribute e.g. "[2:04 PM, 2/14/2021] Bob Ross: "'''
+
+    # Get the elements attributes that hold the sender and date/time values
+    copyable_attrs = pre_plain_text.strip()[1:-1].split('] ')
+
+    # A chat has only a few senders, so share one string per name between their messages
+    sender = sys.intern(copyable_attrs[1])
+    message_datetime = parse_datetime(
+        f"{copyable_attrs[0].split(', ')[1]} {copyable_attrs[0].split(', ')[0]}")
+
+    return sender, message_datetime
+
+
+def scrape_selectable(selectable_text, has_emoji=False):
+    '''Returns message contents of a chat, w/ emojis and (when text_settings['markdown'] is set) formatting (see extract_rich_text)'''
+
+    return extract_rich_text(selectable_text, text_settings['markdown'], has_emoji)
+
+
+def extract_rich_text(element, markdown=False, has_emoji=False):
+    '''Returns the text of a message body or sender name w/ emoji imgs replaced by their alt text when has_emoji is True. When markdown is True, bold/italic/strikethrough/monospace text is wrapped in WhatsApp's markers (see RICH_TEXT_MARKERS) and links whose text isn't the link itself become [text](link).
+
+    The element is walked once and its text is collected in a list that's joined at the end, so this takes linear time however many spans and emoji a message has. When has_emoji is True, a single space right after an emoji img is dropped, as that's WhatsApp's padding between emoji.
+    '''
+
+    # Without emoji or formatting to keep, that's just the element's text
+    if not markdown and not has_emoji:
+        return element.text
+
+    parts = []
+
+    def visit(element):
+        for child in element.children:
+            # Text, ignoring single spaces after emoji
+            if child.name is None:
+                if not (has_emoji and child == ' ' and getattr(child.previous_sibling, 'name', None) == 'img'):
+                    parts.append(str(child))
+            # Emoji
+            elif child.name == 'img':
+                parts.append(child.get('alt') or '')
+            elif markdown and child.name in RICH_TEXT_MARKERS:
+                parts.append(RICH_TEXT_MARKERS[child.name])
+                visit(child)
+                parts.append(RICH_TEXT_MARKERS[child.name])
+            elif markdown and child.name == 'a' and child.get('href'):
+                link_start = len(parts)
+                visit(child)
+                markdown_link(parts, link_start, child.get('href'))
+            else:
+                visit(child)
+
+    visit(element)
+    return ''.join(parts)
+
+
+def markdown_link(parts, link_start, href):
+    '''Turns the text of a link, collected in parts from link_start on, into a markdown link unless its text is (part of) the link itself e.g. a URL WhatsApp made clickable'''
+
+    text = ''.join(parts[link_start:])
+    parts[link_start:] = [text if text in href else f"[{text}]({href})"]
+
+
+def find_message_time(span_texts):
+    '''Returns the hour/minute time shown in a message (the last of its spans' texts that is a time value), or None if there isn't one.
+
+    The time is in the message's meta at the end of the message, after any spans of its contents that may look like a time too, such as a voice message's duration (e.g. '0:45') in 24-hour locales.
+    '''
+
+    for text in reversed(list(span_texts)):
+        # Check spans w/ text if they are dates/times
+        if text and parse_datetime_text(text, True, datetime_settings['locale']):
+            return text
+
+    return None
+
+
+def find_chat_datetime_when_copyable_does_not_exist(message_time, previous_date, next_date, last_msg_date):
+    '''Returns a message's date/time when there's no 'copyable-text' attribute within the message e.g. deleted messages, media w/ no text, etc., or None if it can't be told.
+
+    Takes the time shown in the message (see find_message_time) and the text of the nearest date divider rows before and after the message.
+    '''
+
+    # Check if the message shows a time
+    if not message_time:
+        return None
+
+    # Get a sibling div holding the latest chat date, otherwise if that doesn't exist then grab the last msg date
+    try:
+        # Check if row from message list is a date and not a chat, grabs the first available prior date (this fires for all but the first date of chat history messaging)
+        if previous_date is None:
+            raise ValueError("No date divider precedes the message.")
+        sibling_date = previous_date
+        if not sibling_date:
+            # Use the previous messages date if it exists
+            if last_msg_date:
+                return datetime.combine(last_msg_date.date(), parse_datetime(message_time, time_only=True).time())
+            else:
+                # Otherwise use the next available subsequent date (note this fires only on the first message w/ rare conditions when copyable-text doesn't exist; could assign the wrong date if for example the next available date is 1+ day in advance of the current message)
+                sibling_date = next_date
+
+        # Try converting to a date/time object
+        message_datetime = parse_datetime(
+            f"{sibling_date} {message_time}")
+
+        return message_datetime
+
+    # Otherwise last message's date/time (note this could assign the wrong date if for example the last message was 1+ days ago)
+    except ValueError:
+        if last_msg_date:
+            return datetime.combine(last_msg_date.date(), parse_datetime(message_time, time_only=True).time())
+
+        # Unless it's the first message, then fall back to the next date divider (if it has a date), like above
+        try:
+            return parse_datetime(f"{next_date} {message_time}") if next_date else None
+        except ValueError:
+            return None
+
+
+def parse_datetime(text, time_only=False):
+    '''Try parsing and returning datetimes in a North American standard (or the date/time format of the locale set by set_datetime_locale), otherwise raise a ValueError
+
+    Matches the same values as datetime.strptime w/ the locale's formats, but w/ precompiled regexes, and caches what it parsed since the same dates/times repeat throughout a chat.
+    '''
+
+    locale = datetime_settings['locale']
+
+    # Detect the format the chats use from the first full date/time, then try it first from then on
+    if not time_only and datetime_settings['datetime_format'] is None:
+        datetime_settings['datetime_format'] = detect_datetime_format(text, locale)
+    message_datetime = parse_datetime_text(
+        text, time_only, locale, datetime_settings['datetime_format'] or 0)
+    if message_datetime is not None:
+        return message_datetime
+
+    # Normalize the text for the error message
+    text = normalize_datetime_text(text, locale)
+
+    if not time_only:
+        formats = " or ".join(
+            f"'{fmt}'" for fmt, _ in DATETIME_LOCALES[locale]['datetime'])
+        raise ValueError(
+            f"{text} does not match a valid datetime format of {formats}. Make sure your WhatsApp language settings on your phone are set to English.")
+    else:
+        raise ValueError(
+            f"{text} does not match expected time format of '{DATETIME_LOCALES[locale]['time'][0]}'. Make sure your WhatsApp language settings on your phone are set to English.")
+
+
+@lru_cache(maxsize=4096)
+def parse_datetime_text(text, time_only, locale, first_format=0):
+    '''Returns the datetime of a date/time (or time) value in a locale's format, or None if it isn't one. Date/times are matched against the locale's format at index first_format before the others.'''
+
+    datetime_locale = DATETIME_LOCALES[locale]
+    text = normalize_datetime_text(text, locale)
+
+    # Try parsing when text is some time value e.g. 2:35 PM
+    if time_only:
+        match = datetime_locale['time'][1].fullmatch(text)
+        return match and build_datetime(match, 1900, 1, 1)
+
+    # Try parsing when text is some datetime value e.g. 2/15/2021 2:35 P.M., starting w/ the format the chats use
+    formats = datetime_locale['datetime']
+    for fmt, pattern in [formats[first_format]] + formats[:first_format] + formats[first_format + 1:]:
+        match = pattern.fullmatch(text)
+        if not match:
+            continue
+        try:
+            return build_datetime(match, int(match['year']), int(match['month']), int(match['day']))
+        except ValueError:
+            # e.g. 2/30/2021
+            return None
+
+    return None
+
+
+def detect_datetime_format(text, locale):
+    '''Returns the index of the first of a locale's date/time formats that a date/time value matches, or None if it matches none of them'''
+
+    text = normalize_datetime_text(text, locale)
+    for index, (fmt, pattern) in enumerate(DATETIME_LOCALES[locale]['datetime']):
+        if pattern.fullmatch(text):
+            return index
+
+    return None
+
+
+def normalize_datetime_text(text, locale):
+    '''Returns a date/time value upper-cased and w/ the locale's replacements applied, if it has any (see register_datetime_locale)'''
+
+    replacements = DATETIME_LOCALES[locale]['replacements']
+    if replacements:
+        text = text.upper()
+        for old, new in replacements:
+            text = text.replace(old, new)
+
+    return text
+
+
+def build_datetime(match, year, month, day):
+    '''Returns the datetime for a date and a regex match of a time w/ hour, minute and (for 12-hour clocks) ampm groups'''
+
+    hour = int(match['hour'])
+    if 'ampm' in match.re.groupindex:
+        hour = hour % 12 + (12 if match['ampm'] == 'PM' else 0)
+
+    return datetime(year, month, day, hour, int(match['minute']))
+
+
+def register_datetime_locale(name, datetime_formats, time_format, replacements=()):
+    '''Registers how WhatsApp shows dates/times for a language setting so parse_datetime can parse them (see set_datetime_locale).
+
+    datetime_formats is a list of (strptime format, regex) for full date/times and time_format is one for times. Regexes must match the text in full and have named groups for year, month, day, hour, minute and, for 12-hour clocks, ampm (AM/PM). Text is upper-cased and has each (old, new) of replacements applied before matching, if there are any.
+    '''
+
+    datetime_patterns = [(fmt, re.compile(regex))
+                         for fmt, regex in datetime_formats]
+    DATETIME_LOCALES[name] = {
+        "datetime": datetime_patterns,
+        "time": (time_format[0], re.compile(time_format[1])),
+        "replacements": tuple(replacements)
+    }
+    parse_datetime_text.cache_clear()
+
+    # The formats of the locale in use may have changed, so detect which one the chats use again
+    if datetime_settings['locale'] == name:
+        datetime_settings['datetime_format'] = None
+
+
+def set_datetime_locale(name):
+    '''Sets which registered locale's date/time formats parse_datetime uses'''
+
+    if name not in DATETIME_LOCALES:
+        raise ValueError(
+            f"'{name}' is not a registered date/time locale. Options are: {', '.join(DATETIME_LOCALES)}")
+    datetime_settings['locale'] = name
+    datetime_settings['datetime_format'] = None
+
+
+# The values strptime's %m, %d, %Y, %I, %H and %M accept
+register_datetime_locale(
+    'en_US',
+    [('%m/%d/%Y %I:%M %p', r'(?P<month>1[0-2]|0[1-9]|[1-9])/(?P<day>3[01]|[12]\d|0[1-9]|[1-9]| [1-9])/(?P<year>\d\d\d\d)\s+(?P<hour>1[0-2]|0[1-9]|[1-9]):(?P<minute>[0-5]\d|\d)\s+(?P<ampm>AM|PM)'),
+     ('%Y-%m-%d %I:%M %p', r'(?P<year>\d\d\d\d)-(?P<month>1[0-2]|0[1-9]|[1-9])-(?P<day>3[01]|[12]\d|0[1-9]|[1-9]| [1-9])\s+(?P<hour>1[0-2]|0[1-9]|[1-9]):(?P<minute>[0-5]\d|\d)\s+(?P<ampm>AM|PM)')],
+    ('%I:%M %p', r'(?P<hour>1[0-2]|0[1-9]|[1-9]):(?P<minute>[0-5]\d|\d)\s+(?P<ampm>AM|PM)'),
+    replacements=(("A.M.", "AM"), ("P.M.", "PM")))
+register_datetime_locale(
+    'en_GB',
+    [('%d/%m/%Y %H:%M', r'(?P<day>3[01]|[12]\d|0[1-9]|[1-9]| [1-9])/(?P<month>1[0-2]|0[1-9]|[1-9])/(?P<year>\d\d\d\d)\s+(?P<hour>2[0-3]|[0-1]\d|\d):(?P<minute>[0-5]\d|\d)')],
+    ('%H:%M', r'(?P<hour>2[0-3]|[0-1]\d|\d):(?P<minute>[0-5]\d|\d)'))
+
+
+def find_media_sender_when_copyable_does_not_exist(message, features=None):
+    '''Returns a sender's name when there's no 'copyable-text' attribute within the message'''
+
+    # Reuse the spans already collected by classify_message when available
+    if features is None:
+        features = classify_message(message)
+
+    # Check to see if senders name is stored in a span's aria-label attribute (note: this seems to be where it's stored if the persons name is just text / no emoji)
+    has_emoji = False
+    for span in features['spans']:
+        if span.get('aria-label'):
+            # Last char in aria-label is always colon after the senders name
+            if span.get('aria-label') != 'Voice message':
+                return span.get('aria-label')[:-1]
+        elif id(span) in features['emoji_spans']:
+            # Emoji is in name and needs to be handled differently
+            has_emoji = True
+            break
+        else:
+            continue
+
+    # Construct the senders name if it has an emoji from its text and img/emoji tags
+    if has_emoji:
+        # Get the known emoji container span (always contained within a div that uses the class 'color-#' and will be the 0th child item)
+        emoji_name_element = message.select("div[class*='color']")[0].next
+
+        return extract_rich_text(emoji_name_element, has_emoji=True)
+
+    # There is no sender name in the message, an issue that occurrs very infrequently (e.g. 6000+ msg chat occurred 3 times) - pattern for this seems to be 1) sender name has no emoji, 2) msg has media, 3) msg does not have text, 4) msg is a follow-up / consecutive message (doesn't have tail-in icon in message span/svg)
+    else:
+        # TODO: Study this pattern more and fix later if possible. Solution for now is to return None and then we take the last message's sender from our data structure.
+        return None
+
+
+def find_message_list_lxml(root):
+    '''lxml engine version of find_message_list'''
+
+    message_list = LXML_XPATHS['message_list'](root) or LXML_XPATHS['message_list_fallback'](root)
+    return message_list[0] if message_list else None
+
+
+def scrape_row_lxml(row):
+    '''lxml engine version of scrape_row'''
+
+    # Skip comments and processing instructions
+    if not isinstance(row.tag, str):
+        return None
+
+    classes = (row.get('class') or '').split()
+    if 'message' in " ".join(classes):
+        return scrape_message_lxml(row, classes)
+    elif row.tag == 'div' and row.get('data-id') is None:
+        return {'divider': row.text_content()}
+    else:
+        return None
+
+
+def scrape_message_lxml(message, classes):
+    '''lxml engine version of scrape_message'''
+
+    message_scraped = new_message_row(message.get('data-id'), classes)
+
+    # Check if message has 'copyable-text' and scrape it for the message's sender, date/time, and contents
+    copyable_text = LXML_XPATHS['copyable_text'](message)
+    copyable_text = copyable_text[0] if copyable_text else None
+    if copyable_text is not None:
+        message_scraped.has_copyable_text = True
+        copyable_scrape = scrape_copyable_lxml(copyable_text)
+        message_scraped.datetime = copyable_scrape['datetime']
+        message_scraped.sender = copyable_scrape['sender']
+        message_scraped.message = copyable_scrape['message']
+
+        # Check if message has 'selectable-text' (span, otherwise div) and overwrite the chat message w/ its text/emojis
+        selectable_text = LXML_XPATHS['selectable_span'](
+            copyable_text) or LXML_XPATHS['selectable_div'](copyable_text)
+        if selectable_text:
+            message_scraped.has_selectable_text = True
+            message_scraped.has_emoji_text = LXML_XPATHS['has_img'](
+                selectable_text[0])
+            message_scraped.message = scrape_selectable_lxml(
+                selectable_text[0], message_scraped.has_emoji_text)
+
+    # Check if message was recalled or has media
+    message_scraped.has_recall = LXML_XPATHS['has_recall'](message)
+    message_scraped.has_media = is_media_in_message_lxml(
+        message, copyable_text)
+    if message_scraped.has_media and copyable_text is not None:
+        message_scraped.message = f"<Media omitted> {message_scraped.message}"
+
+    # Without copyable, recalled and media messages need their time and sender scraped in a different way
+    if message_scraped.has_recall or (message_scraped.has_media and copyable_text is None):
+        message_scraped.shown_time = find_message_time(
+            span.text_content() for span in LXML_XPATHS['spans'](message))
+    if message_scraped.has_media and copyable_text is None and message_scraped.direction == 'in':
+        message_scraped.media_sender = find_media_sender_when_copyable_does_not_exist_lxml(
+            message)
+
+    return message_scraped
+
+
+def scrape_copyable_lxml(copyable_text):
+    '''lxml engine version of scrape_copyable'''
+
+    copyable_scrape = {'sender': None, 'datetime': None, 'message': None}
+    copyable_scrape['sender'], copyable_scrape['datetime'] = parse_pre_plain_text(
+        copyable_text.get('data-pre-plain-text'))
+
+    # Get the text-only portion of the message contents (always in a span w/ copyable-text class)
+    content = LXML_XPATHS['copyable_content'](copyable_text)
+    if content:
+        copyable_scrape['message'] = extract_rich_text_lxml(content[0], text_settings['markdown'])
+    else:
+        copyable_scrape['message'] = ''
+
+    return copyable_scrape
+
+
+def scrape_selectable_lxml(selectable_text, has_emoji=False):
+    '''lxml engine version of scrape_selectable'''
+
+    return extract_rich_text_lxml(selectable_text, text_settings['markdown'], has_emoji)
+
+
+def extract_rich_text_lxml(element, markdown=False, has_emoji=False):
+    '''lxml engine version of extract_rich_text'''
+
+    if not markdown and not has_emoji:
+        return element.text_content()
+
+    parts = []
+
+    def add_text(text, after_emoji=False):
+        if text and not (has_emoji and after_emoji and text == ' '):
+            parts.append(text)
+
+    def visit(element):
+        add_text(element.text)
+        for child in element:
+            # Skip comments and processing instructions, but not the text after them
+            if not isinstance(child.tag, str):
+                pass
+            elif child.tag == 'img':
+                parts.append(child.get('alt') or '')
+            elif markdown and child.tag in RICH_TEXT_MARKERS:
+                parts.append(RICH_TEXT_MARKERS[child.tag])
+                visit(child)
+                parts.append(RICH_TEXT_MARKERS[child.tag])
+            elif markdown and child.tag == 'a' and child.get('href'):
+                link_start = len(parts)
+                visit(child)
+                markdown_link(parts, link_start, child.get('href'))
+            else:
+                visit(child)
+            add_text(child.tail, child.tag == 'img')
+
+    visit(element)
+    return ''.join(parts)
+
+
+def is_media_in_message_lxml(message, copyable_text=None):
+    '''Returns True if media is discovered within the message by checking for known media flags, like classify_message's has_media. If not, it returns False.'''
+
+    # First check for data-testid attributes containing 'media' or 'download' (this covers gifs, videos, downloadable content)
+    if LXML_XPATHS['has_media_testid'](message):
+        return True
+
+    # Check if the media is a shared contact e.g. vCard/VCF, a group sticker or an individual sticker
+    if message.get('class'):
+        if copyable_text is not None and LXML_XPATHS['has_contact_card'](copyable_text):
+            return True
+        if 'grouped-sticker' in message.get('data-id'):
+            return True
+        if LXML_XPATHS['has_blob_image'](message):
+            return True
+
+    return False
+
+
+def find_media_sender_when_copyable_does_not_exist_lxml(message):
+    '''lxml engine version of find_media_sender_when_copyable_does_not_exist'''
+
+    # Senders name is either in a span's aria-label attribute or, if it has an emoji, built from the color-# container
+    for span in LXML_XPATHS['spans'](message):
+        label = span.get('aria-label')
+        if label:
+            if label != 'Voice message':
+                return label[:-1]
+        elif LXML_XPATHS['has_img'](span):
+            return extract_rich_text_lxml(LXML_XPATHS['emoji_name'](message)[0], has_emoji=True)
+
+    return None
+
+
+def check_engine_parity(html_or_path):
+    '''Scrapes a page w/ every parsing engine and returns a list of (engine, bs4 message, engine message) for each message that differs from the bs4 reference. An empty list means all engines agree.'''
+
+    page_source = read_page_source(html_or_path)
+    reference = resolve_messages(scrape_page_rows(page_source, 'bs4'))
+
+    mismatches = []
+    for engine in PARSING_ENGINES:
+        if engine == 'bs4':
+            continue
+        messages = resolve_messages(scrape_page_rows(page_source, engine))
+
+        for expected, actual in zip_longest(reference, messages):
+            expected, actual = expected and expected.to_dict(), actual and actual.to_dict()
+            if expected != actual:
+                mismatches.append((engine, expected, actual))
+
+    return mismatches
+
+
+def scrape_is_exported(selected_chat, scraped, archive=False):
+    '''Returns True/False if an export file type is selected and succesfully exported (to the chat's archive, see export_file_name, when archive is True)'''
+
+    is_exported = False
+    while not is_exported:
+        # Ask user to select export type
+        export_format = select_export_format(selected_chat)
+        if not export_format:
+            return False
+        is_exported = export_chat(selected_chat, scraped, export_format, archive)
+
+    return True
+
+
+def select_export_format(selected_chat):
+    '''Prompts the user to select an export format (one of EXPORT_FORMATS) for the selected chat. Returns None if the user aborts the export.'''
+
+    print("\nSelect an export format.\n  Options:\n  txt\t\tExport to .txt file type\n  csv\t\tExport to .csv file type\n  html\t\tExport to .html file type\n  sqlite\tExport to the local SQLite archive of all your chats\n  -abort\tAbort the export\n")
+    while True:
+        response = input(
+            "What format do you want to export to? ")
+
+        # Check users response
+        if response.strip().lower() in EXPORT_FORMATS:
+            return response.strip().lower()
+        elif response.strip().lower() == '-abort':
+            print(f"You've aborted the export for '{selected_chat}'.")
+            return None
+        else:
+            print(
+                f"Uh oh! '{response.strip().lower()}' is not a valid option. Try again.")
+
+
+def export_chat(selected_chat, scraped, export_format, archive=False, export_dir='exports'):
+    '''Returns True/False if the scraped data is succesfully exported to the given format (one of EXPORT_FORMATS), appending to the chat's archive when archive is True'''
+
+    exporters = {'txt': export_txt, 'csv': export_csv,
+                 'html': export_html, 'sqlite': export_sqlite}
+    with profile_phase(f'export {export_format}', sample_memory=True):
+        return exporters[export_format](selected_chat, scraped, archive, export_dir)
+
+
+def export_file_name(selected_chat, export_format, archive=False):
+    '''Returns the file name of an export, which is 'WhatsApp Chat with [name] - [YYYY-MM-DD HH.MM.SS.AM/PM]' or 'WhatsApp Chat with [name]' for the archive that incremental exports append to'''
+
+    if archive:
+        return f"WhatsApp Chat with {selected_chat}.{export_format}"
+
+    now = datetime.now().strftime('%Y-%m-%d %H.%M.%S.%p')
+    return f"WhatsApp Chat with {selected_chat} - {now}.{export_format}"
+
+
+def export_txt(selected_chat, scraped, archive=False, export_dir='exports'):
+    '''Returns True if the scraped data for a selected export is written (or appended, for an archive) to local .txt file without any exceptions thrown'''
+
+    # Make sure exports directory exists
+    export_dir_setup(export_dir)
+
+    print(f"Exporting to local .txt file...", end="\r")
+    # Try exporting to a text file
     try:
         # Format file name as 'WhatsApp chat with [name] - [YYYY-MM-DD HH.MM.SS.AM/PM]'
-        now = datetime.now().strftime('%Y-%m-%d %H.%M.%S.%p')
+        file_name = export_file_name(selected_chat, 'txt', archive)
+        path = os.path.join(export_dir, file_name)
 
-        # Write to file
-        with open(f"exports/WhatsApp Chat with {selected_chat} - {now}.csv", "w", newline="", encoding="utf-8-sig") as csv_file:
-            writer = csv.writer(csv_file, delimiter=",")
-            writer.writerow(['Date', 'Time', 'Sender', 'Message'])
-            writer.writerows(data)
+        # Write to file one message at a time through a large buffer (no newline translation, so lines end w/ '\n' on every OS)
+        with open(path, "a" if archive else "w", encoding="utf-8", newline="", buffering=EXPORT_BUFFER_SIZE) as text_file:
+            for date_write, time_write, sender_write, message_write in export_rows(scraped):
+                text_file.write(
+                    f"{date_write}, {time_write} - {sender_write}: {message_write}\n")
 
-        print(
-            f"Success! 'WhatsApp Chat with {selected_chat} - {now}.csv' exported.")
+        print(f"Success! '{file_name}' exported.")
         return True
 
     except Exception as error:
-        print(f"Error during csv export! Error info: {error}")
+        print(f"Error during txt export! Error info: {error}")
         return False
 
 
-def export_html(selected_chat, scraped):
-    '''Returns True if the scraped data for a selected export is written to local .html file without any exceptions thrown'''
+def export_csv(selected_chat, scraped, archive=False, export_dir='exports'):
+    '''Returns True if the scraped data for a selected export is written (or appended, for an archive) to local .csv file without any exceptions thrown'''
 
     # Make sure exports directory exists
-    export_dir_setup()
+    export_dir_setup(export_dir)
 
-    # Unpack into nested lists
-    data = []
-    for date, messages in scraped.items():
-        for message in messages:
-            # Unpack into a list
-            message = [date, message['time'],
-                       message['sender'], message['message']]
+    print(f"Exporting to local .csv file...", end="\r")
+    # Try exporting to a csv file
+    try:
+        # Format file name as 'WhatsApp chat with [name] - [YYYY-MM-DD HH.MM.SS.AM/PM]'
+        file_name = export_file_name(selected_chat, 'csv', archive)
+        path = os.path.join(export_dir, file_name)
+
+        # Write to file one message at a time through a large buffer, w/ the header only when starting a new file (appending keeps the BOM at the start of the archive)
+        is_appended = archive and os.path.isfile(path)
+        with open(path, "a" if is_appended else "w", newline="", encoding="utf-8" if is_appended else "utf-8-sig", buffering=EXPORT_BUFFER_SIZE) as csv_file:
+            writer = csv.writer(csv_file, delimiter=",")
+            if not is_appended:
+                writer.writerow(EXPORT_FIELDS)
+            writer.writerows(export_rows(scraped))
 
-            # Add to parent list
-            data.append(message)
+        print(f"Success! '{file_name}' exported.")
+        return True
+
+    except Exception as error:
+        print(f"Error during csv export! Error info: {error}")
+        return False
 
-    # Create a pretty table
-    t = PrettyTable()
-    t.field_names = ['Date', 'Time', 'Sender', 'Message']
 
-    # Add chat records to the table
-    for message in data:
-        t.add_row(message)
+def export_html(selected_chat, scraped, archive=False, export_dir='exports'):
+    '''Returns True if the scraped data for a selected export is written (or appended, for an archive) to local .html file without any exceptions thrown.
 
-    # Get HTML string from PrettyTable
-    html = t.get_html_string()
+    The file holds the same HTML table PrettyTable's get_html_string would, but it's written one message at a time instead of rendered as one string.
+    '''
+
+    # Make sure exports directory exists
+    export_dir_setup(export_dir)
 
     print(f"Exporting to local .html file...", end="\r")
     # Try exporting to a html file
     try:
         # Format file name as 'WhatsApp chat with [name] - [YYYY-MM-DD HH.MM.SS.AM/PM]'
-        now = datetime.now().strftime('%Y-%m-%d %H.%M.%S.%p')
+        file_name = export_file_name(selected_chat, 'html', archive)
+        path = os.path.join(export_dir, file_name)
+
+        # Add the new table rows to the end of an existing archive's table, i.e. in place of its closing tags
+        if archive and os.path.isfile(path):
+            html_file = open(path, "r+b", buffering=EXPORT_BUFFER_SIZE)
+            html_file.seek(-len(HTML_EXPORT_TAIL), os.SEEK_END)
+            if html_file.read() != HTML_EXPORT_TAIL.encode():
+                html_file.close()
+                raise ValueError(
+                    f"'{file_name}' doesn't end w/ the table of a WhatSoup export, so it can't be appended to.")
+            html_file.seek(-len(HTML_EXPORT_TAIL), os.SEEK_END)
+        else:
+            html_file = open(path, "wb", buffering=EXPORT_BUFFER_SIZE)
+            html_file.write(HTML_EXPORT_HEAD.encode())
 
-        # Write to file
-        with open(f"exports/WhatsApp Chat with {selected_chat} - {now}.html", "wb") as html_file:
-            encoded = html.encode()
-            html_file.write(encoded)
+        # Write to file one table row at a time
+        with html_file:
+            for row in export_rows(scraped):
+                html_file.write(html_export_row(row).encode())
+            html_file.write(HTML_EXPORT_TAIL.encode())
 
-        print(
-            f"Success! 'WhatsApp Chat with {selected_chat} - {now}.html' exported.")
+        print(f"Success! '{file_name}' exported.")
         return True
 
     except Exception as error:
@@ -1073,13 +3157,161 @@ def export_html(selected_chat, scraped):
         return False
 
 
-def export_dir_setup():
-    '''Creates a local 'exports' directory if it does not already exist'''
+def export_sqlite(selected_chat, scraped, archive=False, export_dir='exports'):
+    '''Returns True if the scraped data for a selected export is written to the local SQLite archive of all exported chats without any exceptions thrown.
+
+    Messages are upserted by data-id, so exporting a chat again (or incrementally) updates and adds to what's in the archive instead of duplicating it.
+    '''
+
+    # Make sure exports directory exists
+    export_dir_setup(export_dir)
 
-    if not os.path.isdir('exports'):
-        os.mkdir('exports')
+    print(f"Exporting to local SQLite archive...", end="\r")
+    # Try exporting to the archive database
+    try:
+        # Parallel workers may write to the archive at the same time, so wait for each other's transactions
+        connection = sqlite3.connect(os.path.join(
+            export_dir, SQLITE_ARCHIVE_FILE), timeout=60)
+        try:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(SQLITE_ARCHIVE_SCHEMA)
+            search_index_setup(connection)
+
+            # Write the chat, its senders, and its messages in one transaction
+            with connection:
+                connection.execute("INSERT INTO chats (name, exported) VALUES (?, ?) ON CONFLICT (name) DO UPDATE SET exported = excluded.exported",
+                                   (selected_chat, datetime.now().isoformat(sep=' ', timespec='seconds')))
+                chat_id = connection.execute(
+                    "SELECT id FROM chats WHERE name = ?", (selected_chat,)).fetchone()[0]
+
+                senders = {message.sender for messages in scraped.values()
+                           for message in messages if message.sender is not None}
+                connection.executemany(
+                    "INSERT OR IGNORE INTO senders (name) VALUES (?)", ((sender,) for sender in senders))
+                sender_ids = dict(connection.execute(
+                    "SELECT name, id FROM senders"))
+
+                # Insert in batches to keep memory flat on huge chats
+                rows = sqlite_archive_rows(chat_id, scraped, sender_ids)
+                exported = 0
+                while True:
+                    batch = list(islice(rows, SQLITE_BATCH_SIZE))
+                    if not batch:
+                        break
+                    connection.executemany(SQLITE_UPSERT_MESSAGE, batch)
+                    exported += len(batch)
+                    print(
+                        f"Exporting to local SQLite archive... {exported} messages", end="\r")
+        finally:
+            connection.close()
+
+        print(f"Success! '{selected_chat}' exported to '{SQLITE_ARCHIVE_FILE}'.")
+        return True
+
+    except Exception as error:
+        print(f"Error during sqlite export! Error info: {error}")
+        return False
+
+
+def search_index_setup(connection):
+    '''Adds the full-text search index to an archive database if it doesn't have one yet (indexing the messages already in it). Returns True/False if the archive has a search index.'''
+
+    if connection.execute("SELECT 1 FROM sqlite_master WHERE name = 'messages_search'").fetchone():
+        return True
+
+    # Parallel workers may both find a new archive w/o an index, so the index is set up under the write lock and w/o failing if it's there by then
+    try:
+        with connection:
+            connection.executescript(
+                f"BEGIN IMMEDIATE;{SQLITE_SEARCH_SCHEMA}COMMIT;")
+    except sqlite3.OperationalError as error:
+        if 'no such module' not in str(error):
+            raise
+        print(
+            f"Warning! Your SQLite library doesn't support full-text search, messages won't be searchable. Error info: {error}")
+        return False
+
+    return True
+
+
+def search_archive(query, chat=None, sender=None, since=None, until=None, limit=20, export_dir='exports'):
+    '''Returns the archived messages matching a full-text search query (SQLite FTS5 syntax e.g. 'pizza OR pasta', '"happy little"', 'paint*') as (chat, date/time, sender, snippet), best matches first.
+
+    Can be narrowed down to a chat, a sender, and messages on or after since and before until (dates as YYYY-MM-DD).
+    '''
+
+    path = os.path.join(export_dir, SQLITE_ARCHIVE_FILE)
+    if not os.path.isfile(path):
+        raise ValueError(
+            f"'{path}' doesn't exist yet, export some chats to the sqlite format first.")
+
+    connection = sqlite3.connect(path, timeout=60)
+    try:
+        if not search_index_setup(connection):
+            raise ValueError("the archive has no search index.")
+        return connection.execute(SQLITE_SEARCH_QUERY, {"query": query, "chat": chat, "sender": sender, "since": since, "until": until, "limit": limit}).fetchall()
+    finally:
+        connection.close()
+
+
+def print_search_results(results, elapsed):
+    '''Prints the messages found by search_archive'''
+
+    t = PrettyTable()
+    t.field_names = ["Chat", "Date/Time", "Sender", "Message"]
+    for key in t.align.keys():
+        t.align[key] = "l"
+    t._max_width = {"Chat": 25, "Sender": 20, "Message": 60}
+    for result in results:
+        t.add_row(result)
+    print(t.get_string(
+        title=f"{len(results)} Messages Found in {round(elapsed * 1000, 1)} ms"))
+
+
+def sqlite_archive_rows(chat_id, scraped, sender_ids):
+    '''Yields the values SQLITE_UPSERT_MESSAGE inserts for each scraped message, numbering the parts of grouped stickers (which are 2 messages w/ the same data-id)'''
+
+    previous_data_id, part = None, 0
+    for messages in scraped.values():
+        for message in messages:
+            part = part + 1 if message.data_id == previous_data_id else 0
+            previous_data_id = message.data_id
+            yield (chat_id, message.data_id, part, message.datetime.isoformat(sep=' '), sender_ids.get(message.sender),
+                   message.message, message.has_media, message.has_recall, message.has_emoji_text)
+
+
+def export_rows(scraped):
+    '''Yields the [date, time, sender, message] of each scraped message, from the dict returned by scrape_chat or from an iterable of such rows'''
+
+    if not isinstance(scraped, dict):
+        yield from scraped
+        return
+
+    for date, messages in scraped.items():
+        for message in messages:
+            yield [date, message['time'], message['sender'], message['message']]
+
+
+def html_export_row(row):
+    '''Returns the HTML table row of a [date, time, sender, message] row, laid out like PrettyTable's get_html_string'''
+
+    values = [escape(str(value)).replace("\n", "<br>") for value in row]
+
+    # Link the message's stored media (see MEDIA_ATTACHED), checking for it w/ a plain substring first as most messages have none
+    if " (file attached)" in values[-1]:
+        values[-1] = MEDIA_ATTACHED_PATTERN.sub(r'<a href="\1">\1</a> (file attached)', values[-1])
+
+    cells = "".join(f"\n            <td>{value}</td>" for value in values)
+    return f"\n        <tr>{cells}\n        </tr>"
+
+
+def export_dir_setup(export_dir='exports'):
+    '''Creates a local 'exports' directory (or the given export directory) if it does not already exist'''
+
+    if not os.path.isdir(export_dir):
+        os.makedirs(export_dir, exist_ok=True)
         print(
-            f"'exports' directory created: {os.path.dirname(os.path.abspath(__file__))}")
+            f"'{export_dir}' directory created: {os.path.dirname(os.path.abspath(export_dir))}")
 
 
 def user_is_finished():
@@ -1100,5 +3332,722 @@ def user_is_finished():
             continue
 
 
+def load_watermarks(chat_name, export_formats, export_dir='exports'):
+    '''Returns the newest message (data-id, date/time and the data-ids of its minute's messages) of a chat's previous incremental export to each export format, w/ None for formats it hasn't been exported to incrementally yet'''
+
+    watermarks_path = os.path.join(export_dir, WATERMARKS_FILE)
+    chat_watermarks = {}
+    if os.path.isfile(watermarks_path):
+        with open(watermarks_path, encoding="utf-8") as watermarks_file:
+            chat_watermarks = json.load(watermarks_file).get(chat_name) or {}
+
+    # Watermarks used to be saved once per chat for whatever formats it was exported to
+    if 'data-id' in chat_watermarks:
+        chat_watermarks = {export_format: chat_watermarks for export_format in export_formats}
+
+    watermarks = {}
+    for export_format in export_formats:
+        watermark = chat_watermarks.get(export_format)
+        if watermark:
+            watermark = {**watermark, 'datetime': datetime.fromisoformat(watermark['datetime'])}
+            watermark.setdefault('ids', [watermark['data-id']])
+        watermarks[export_format] = watermark
+    return watermarks
+
+
+def save_watermark(chat_name, export_format, messages, export_dir='exports'):
+    '''Saves a chat's newest exported message (data-id, date/time and the data-ids of the messages of that minute) as the watermark for its next incremental export to the export format'''
+
+    watermarks_path = os.path.join(export_dir, WATERMARKS_FILE)
+    message = messages[-1]
+    minute_ids = [minute_message['data-id'] for minute_message in messages
+                  if minute_message['datetime'] == message['datetime']]
+
+    # Parallel workers share the watermarks file, so only one of them updates it at a time
+    with watermarks_lock:
+        watermarks = {}
+        if os.path.isfile(watermarks_path):
+            with open(watermarks_path, encoding="utf-8") as watermarks_file:
+                watermarks = json.load(watermarks_file)
+
+        chat_watermarks = watermarks.get(chat_name) or {}
+        if 'data-id' in chat_watermarks:
+            chat_watermarks = {}
+        chat_watermarks[export_format] = {"data-id": message['data-id'], "datetime": message['datetime'].isoformat(),
+                                          "ids": minute_ids, "updated": datetime.now().isoformat()}
+        watermarks[chat_name] = chat_watermarks
+
+        # Write to a temporary file first so a crash mid-write doesn't lose the watermarks of other chats
+        with open(f"{watermarks_path}.tmp", "w", encoding="utf-8") as watermarks_file:
+            json.dump(watermarks, watermarks_file, indent=2)
+        os.replace(f"{watermarks_path}.tmp", watermarks_path)
+
+
+def export_new_messages(selected_chat, messages, export_formats, export_dir='exports'):
+    '''Appends the messages that are new to each export format's archive of the chat (see messages_since_watermark), saving each format's watermark once it's exported, so a format that fails (or wasn't exported this time) gets its messages the next time. Returns the most messages exported to a format and the list of formats that failed.'''
+
+    watermarks = load_watermarks(selected_chat, export_formats, export_dir)
+    exported, failed_formats = 0, []
+    for export_format in export_formats:
+        watermark = watermarks[export_format]
+        new_messages = messages_since_watermark(messages, watermark) if watermark else messages
+        if not new_messages:
+            continue
+        if export_chat(selected_chat, group_messages_by_date(new_messages), export_format, True, export_dir):
+            save_watermark(selected_chat, export_format, new_messages, export_dir)
+            exported = max(exported, len(new_messages))
+        else:
+            failed_formats.append(export_format)
+
+    return exported, failed_formats
+
+
+def messages_since_watermark(messages, watermark):
+    '''Returns the scraped messages that are newer than a chat's watermark'''
+
+    # Messages after the watermark message (grouped stickers are in the list twice, so take the last one)
+    for index in range(len(messages) - 1, -1, -1):
+        if messages[index]['data-id'] == watermark['data-id']:
+            return messages[index + 1:]
+
+    # The watermark message is gone (e.g. it was deleted for everyone), so fall back to its date/time, which is only to the minute, skipping the messages of that minute that were already exported
+    print("Warning! The last exported message wasn't found, using its date/time to find the new messages instead.")
+    exported_ids = set(watermark['ids'])
+    return [message for message in messages
+            if message['datetime'] >= watermark['datetime'] and message['data-id'] not in exported_ids]
+
+
+def checkpoint_path(chat_name, checkpoint_dir='checkpoints'):
+    '''Returns the path of a chat's checkpoint file (the chat name is made file-system safe and suffixed w/ a hash so similar names don't collide)'''
+
+    safe_name = re.sub(r'[^\w\- ]', '_', chat_name)[:80]
+    name_hash = hashlib.sha1(chat_name.encode()).hexdigest()[:8]
+    return os.path.join(checkpoint_dir, f"{safe_name}-{name_hash}.json")
+
+
+def save_checkpoint(chat_name, rows, checkpoint_dir='checkpoints'):
+    '''Saves the rows scraped so far for a chat, along w/ their data-ids and the oldest and newest message date/time'''
+
+    if not os.path.isdir(checkpoint_dir):
+        os.makedirs(checkpoint_dir, exist_ok=True)
+
+    messages = [row for row in rows if isinstance(row, Message)]
+    datetimes = [message['datetime'] for message in messages if message['datetime']]
+    checkpoint = {
+        "chat": chat_name,
+        "updated": datetime.now().isoformat(),
+        "ids": [message['data-id'] for message in messages],
+        "oldest_datetime": datetimes[0].isoformat() if datetimes else None,
+        "newest_datetime": datetimes[-1].isoformat() if datetimes else None,
+        "rows": [row_to_json(row) for row in rows]
+    }
+
+    # Write to a temporary file first so a crash mid-write doesn't corrupt the existing checkpoint
+    path = checkpoint_path(chat_name, checkpoint_dir)
+    with open(f"{path}.tmp", "w", encoding="utf-8") as checkpoint_file:
+        json.dump(checkpoint, checkpoint_file)
+    os.replace(f"{path}.tmp", path)
+
+
+def load_checkpoint(chat_name, checkpoint_dir='checkpoints'):
+    '''Returns a chat's saved checkpoint, or None if it doesn't have one'''
+
+    path = checkpoint_path(chat_name, checkpoint_dir)
+    if not os.path.isfile(path):
+        return None
+
+    with open(path, encoding="utf-8") as checkpoint_file:
+        checkpoint = json.load(checkpoint_file)
+    checkpoint['rows'] = [row_from_json(row) for row in checkpoint['rows']]
+    return checkpoint
+
+
+def delete_checkpoint(chat_name, checkpoint_dir='checkpoints'):
+    '''Deletes a chat's checkpoint if it has one'''
+
+    path = checkpoint_path(chat_name, checkpoint_dir)
+    if os.path.isfile(path):
+        os.remove(path)
+
+
+def merge_checkpoint_rows(rows, checkpoint_rows, harvested_ids):
+    '''Returns the harvested rows, preceded by any checkpoint rows older than the oldest message harvested again'''
+
+    # Find the oldest checkpoint message that was harvested again
+    for index, row in enumerate(checkpoint_rows):
+        if isinstance(row, Message):
+            if row.data_id not in harvested_ids:
+                # Loading stopped short of the checkpoint's oldest message, so keep the messages it had
+                break
+            return list(rows)
+    else:
+        return list(rows)
+
+    for overlap, row in enumerate(checkpoint_rows):
+        if isinstance(row, Message) and row.data_id in harvested_ids:
+            return checkpoint_rows[:overlap] + list(rows)
+    return checkpoint_rows + list(rows)
+
+
+def row_to_json(row):
+    '''Returns a scraped row that can be saved as JSON'''
+
+    if not isinstance(row, Message):
+        return row
+
+    saved = {key: getattr(row, key) for key in Message.__slots__}
+    if row.datetime:
+        saved['datetime'] = row.datetime.isoformat()
+    return saved
+
+
+def row_from_json(row):
+    '''Returns a scraped row that was saved as JSON by row_to_json'''
+
+    if 'divider' in row:
+        return row
+
+    # Checkpoints used to hold a dict of the scrape next to the row's values, w/ media messages' text not marked yet
+    if 'scraped' in row:
+        scraped = row['scraped']
+        row = {**{key.replace('-', '_'): value for key, value in scraped.items()},
+               'direction': row['direction'], 'shown_time': row['time'], 'media_sender': row['media_sender']}
+        if row['has_media'] and row['has_copyable_text']:
+            row['message'] = f"<Media omitted> {row['message']}"
+
+    message = Message(row['data_id'])
+    for key in Message.__slots__:
+        setattr(message, key, row[key])
+    if message.datetime:
+        message.datetime = datetime.fromisoformat(message.datetime)
+    return message
+
+
+def list_checkpoints(checkpoint_dir='checkpoints'):
+    '''Returns a summary of every saved checkpoint (chat, path, messages, oldest/newest message date/time, last update), least recently updated first'''
+
+    if not os.path.isdir(checkpoint_dir):
+        return []
+
+    checkpoints = []
+    for name in os.listdir(checkpoint_dir):
+        if not name.endswith('.json'):
+            continue
+        path = os.path.join(checkpoint_dir, name)
+        with open(path, encoding="utf-8") as checkpoint_file:
+            checkpoint = json.load(checkpoint_file)
+        checkpoints.append({"chat": checkpoint['chat'], "path": path, "messages": len(checkpoint['ids']),
+                            "oldest_datetime": checkpoint['oldest_datetime'], "newest_datetime": checkpoint['newest_datetime'],
+                            "updated": checkpoint['updated']})
+
+    return sorted(checkpoints, key=lambda checkpoint: checkpoint['updated'])
+
+
+def print_checkpoints(checkpoints):
+    '''Prints a summary of the saved checkpoints'''
+
+    t = PrettyTable()
+    t.field_names = ["Chat Name", "Messages", "Loaded Back To", "Last Updated"]
+    for key in t.align.keys():
+        t.align[key] = "l"
+    for checkpoint in checkpoints:
+        t.add_row([checkpoint['chat'], checkpoint['messages'],
+                   checkpoint['oldest_datetime'], checkpoint['updated']])
+    print(t.get_string(title='Saved Checkpoints'))
+
+
+def clean_checkpoints(older_than_days=7, chat_name=None, checkpoint_dir='checkpoints'):
+    '''Deletes stale checkpoints not updated in older_than_days days (or the checkpoint of one chat when chat_name is given) and returns how many were deleted'''
+
+    deleted = 0
+    for checkpoint in list_checkpoints(checkpoint_dir):
+        if chat_name is not None:
+            is_stale = checkpoint['chat'] == chat_name
+        else:
+            age = datetime.now() - datetime.fromisoformat(checkpoint['updated'])
+            is_stale = age.days >= older_than_days
+        if is_stale:
+            os.remove(checkpoint['path'])
+            print(f"Deleted checkpoint for '{checkpoint['chat']}'.")
+            deleted += 1
+
+    return deleted
+
+
+def parse_snapshots(snapshots, export_formats, engine='bs4', check_parity=False):
+    '''Scrapes and exports every saved page source in a directory (or a single .html file) without a browser. Returns the number of snapshots that failed.
+
+    With check_parity, nothing is exported and instead each snapshot fails if the parsing engines don't scrape identical messages.
+    '''
+
+    # Collect the snapshots, using each file name as the chat name for its exports
+    if os.path.isdir(snapshots):
+        paths = sorted(os.path.join(snapshots, name) for name in os.listdir(snapshots)
+                       if name.lower().endswith(('.html', '.htm')))
+    else:
+        paths = [snapshots]
+
+    start = timer()
+    failures = 0
+    for path in paths:
+        chat_name = os.path.splitext(os.path.basename(path))[0]
+        print(f"Parsing '{path}'...")
+
+        # Keep going if a snapshot can't be scraped so one bad file doesn't stop the whole batch
+        try:
+            if check_parity:
+                mismatches = check_engine_parity(path)
+                for mismatch_engine, expected, actual in mismatches:
+                    print(
+                        f"Mismatch! bs4 scraped {expected} but {mismatch_engine} scraped {actual}")
+                if mismatches:
+                    failures += 1
+                continue
+
+            scraped = parse_page(path, engine)
+        except Exception as error:
+            print(f"Error! '{path}' could not be scraped. Error info: {error}")
+            failures += 1
+            continue
+
+        for export_format in export_formats:
+            if not export_chat(chat_name, scraped, export_format):
+                failures += 1
+
+    end = timer()
+    print(
+        f"Finished parsing {len(paths)} snapshots in {round(end - start, 2)} seconds with {failures} failures.")
+    return failures
+
+
+class Profiler:
+    '''Collects where a run spends its time: the phases of the run (see profile_phase), every WebDriver command made by each whatsoup function, and samples of the Python process's and the browser's memory.'''
+
+    def __init__(self):
+        self.start = timer()
+        self.started = datetime.now()
+        self.lock = threading.Lock()
+        self.phases, self.commands, self.memory = {}, {}, []
+
+        # The thread that last made a WebDriver command w/ each driver, which is the only one that may use it for sampling memory
+        self.driver_threads = {}
+
+    @contextmanager
+    def phase(self, name, sample_memory=False):
+        '''Times a phase, adding up the time of every phase w/ the same name. Yields a dict where the phase can count the items it processed in 'items'.'''
+
+        # Phases are listed in the order they first started
+        with self.lock:
+            stats = self.phases.setdefault(
+                name, {'phase': name, 'count': 0, 'seconds': 0.0, 'max_seconds': 0.0, 'items': 0})
+
+        record = {'items': 0}
+        start = timer()
+        try:
+            yield record
+        finally:
+            elapsed = timer() - start
+            with self.lock:
+                stats['count'] += 1
+                stats['seconds'] += elapsed
+                stats['max_seconds'] = max(stats['max_seconds'], elapsed)
+                stats['items'] += record['items']
+            if sample_memory:
+                self.sample_memory(name)
+
+    def record_command(self, command, call_site, elapsed):
+        '''Adds the latency of a WebDriver command to the stats of the command made from its call site'''
+
+        with self.lock:
+            stats = self.commands.setdefault((command, call_site), {
+                'command': command, 'call_site': call_site, 'count': 0, 'seconds': 0.0, 'max_seconds': 0.0})
+            stats['count'] += 1
+            stats['seconds'] += elapsed
+            stats['max_seconds'] = max(stats['max_seconds'], elapsed)
+
+    def sample_memory(self, label):
+        '''Samples the peak memory of the Python process and the memory of the browser this thread is driving, after the phase w/ the given label.
+
+        A WebDriver session can't be shared between threads, so threads that don't drive a browser (e.g. the exporter of export_chats_pipelined) don't sample one.
+        '''
+
+        sample = {'after': label, 'seconds': round(timer() - self.start, 3),
+                  'python_peak_rss_mib': python_peak_rss_mib(), 'browser': None}
+        thread = threading.get_ident()
+        with self.lock:
+            driver = next((driver for driver, driver_thread in self.driver_threads.items()
+                           if driver_thread == thread), None)
+        if driver is not None:
+            sample['browser'] = browser_metrics(driver)
+        with self.lock:
+            self.memory.append(sample)
+
+    def report(self):
+        '''Returns everything profiled so far as a JSON-serializable dict, w/ the commands that took longest first'''
+
+        with self.lock:
+            phases = [dict(stats) for stats in self.phases.values()]
+            commands = sorted((dict(stats) for stats in self.commands.values()),
+                              key=lambda stats: stats['seconds'], reverse=True)
+            memory = list(self.memory)
+        for stats in phases + commands:
+            stats['seconds'] = round(stats['seconds'], 4)
+            stats['max_seconds'] = round(stats['max_seconds'], 4)
+        return {'started': self.started.isoformat(timespec='seconds'), 'seconds': round(timer() - self.start, 3),
+                'phases': phases, 'commands': commands, 'memory': memory}
+
+
+class ProfiledProxy:
+    '''Wraps a driver (or one of its WebElements, or its switch_to) to time every WebDriver command made through it, passing everything through unchanged otherwise'''
+
+    def __init__(self, target, profiler, driver):
+        self._target = target
+        self._profiler = profiler
+        self._driver = driver
+
+    def __getattr__(self, name):
+        start = timer()
+        value = getattr(self._target, name)
+        if callable(value):
+            return partial(self._call, name, value)
+
+        # Reading some properties is a round trip to the browser too
+        if name in PROFILED_PROPERTIES:
+            self._profiler.record_command(name, profile_call_site(), timer() - start)
+        return self._wrap(value)
+
+    def _call(self, name, method, *args, **kwargs):
+        with self._profiler.lock:
+            self._profiler.driver_threads[self._driver] = threading.get_ident()
+        start = timer()
+        try:
+            return self._wrap(method(*map(unwrap_profiled, args), **kwargs))
+        finally:
+            # Tell scripts apart by the constant they're stored in
+            if name in {'execute_script', 'execute_async_script'} and args:
+                name = f"{name}({script_name(args[0])})"
+            self._profiler.record_command(name, profile_call_site(), timer() - start)
+
+    def _wrap(self, value):
+        if isinstance(value, list):
+            return [self._wrap(item) for item in value]
+        if hasattr(type(value), 'send_keys') or hasattr(type(value), 'active_element'):
+            return ProfiledProxy(value, self._profiler, self._driver)
+        return value
+
+
+def unwrap_profiled(value):
+    '''Returns what a ProfiledProxy wraps (also inside lists), since the driver only accepts its own WebElements as script arguments'''
+
+    if isinstance(value, ProfiledProxy):
+        return value._target
+    if isinstance(value, list):
+        return [unwrap_profiled(item) for item in value]
+    return value
+
+
+def profile_call_site():
+    '''Returns the name of the function that made a WebDriver command, skipping the profiling proxy and Selenium's own functions (e.g. WebDriverWait)'''
+
+    frame = sys._getframe(1)
+    while frame:
+        code = frame.f_code
+        if code.co_name not in {'_call', '__getattr__', 'profile_call_site'} and 'selenium' not in code.co_filename.split(os.sep):
+            return code.co_name
+        frame = frame.f_back
+    return 'unknown'
+
+
+def profile_driver(driver):
+    '''Returns the driver wrapped to time its commands while profiling, or the driver itself otherwise'''
+
+    profiler = profile_settings['profiler']
+    if profiler is None:
+        return driver
+
+    # Start collecting browser performance metrics (Chrome only)
+    try:
+        driver.execute_cdp_cmd('Performance.enable', {})
+    except (AttributeError, WebDriverException):
+        pass
+    with profiler.lock:
+        profiler.driver_threads[driver] = threading.get_ident()
+    return ProfiledProxy(driver, profiler, driver)
+
+
+def script_name(script):
+    '''Returns the name of the constant holding a script, or 'inline' for scripts written out where they're used'''
+
+    for name, value in globals().items():
+        if name.endswith('_SCRIPT') and value == script:
+            return name
+    return 'inline'
+
+
+def python_peak_rss_mib():
+    '''Returns the peak memory (resident set size) of the Python process so far in MiB, or None where that isn't available'''
+
+    if resource is None:
+        return None
+
+    # Linux reports KiB, macOS bytes
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / 1024 / (1024 if sys.platform == 'darwin' else 1), 1)
+
+
+def browser_metrics(driver):
+    '''Returns the browser's memory and DOM size from Chrome DevTools' Performance.getMetrics, or None if the browser doesn't support it'''
+
+    try:
+        metrics = {metric['name']: metric['value'] for metric in driver.execute_cdp_cmd(
+            'Performance.getMetrics', {})['metrics']}
+    except (AttributeError, WebDriverException):
+        return None
+
+    def mib(name):
+        return round(metrics[name] / 1024 / 1024, 1) if name in metrics else None
+
+    return {'js_heap_used_mib': mib('JSHeapUsedSize'), 'js_heap_total_mib': mib('JSHeapTotalSize'),
+            'nodes': metrics.get('Nodes'), 'documents': metrics.get('Documents'),
+            'js_event_listeners': metrics.get('JSEventListeners')}
+
+
+def start_profiling():
+    '''Starts profiling the run, including every driver set up from now on'''
+
+    profile_settings['profiler'] = Profiler()
+    return profile_settings['profiler']
+
+
+def finish_profiling(report_path):
+    '''Stops profiling, saves the report as JSON and prints a summary of it'''
+
+    profiler, profile_settings['profiler'] = profile_settings['profiler'], None
+    if profiler is None:
+        return None
+
+    report = profiler.report()
+    with open(report_path, 'w', encoding='utf-8') as json_file:
+        json.dump(report, json_file, indent=2)
+    print_profile(report)
+    print(f"Success! Profile saved to '{report_path}'.")
+    return report
+
+
+def print_profile(report, top_commands=10):
+    '''Prints a summary of a profile: the time of each phase, the slowest WebDriver commands and the peak memory'''
+
+    t = PrettyTable()
+    t.field_names = ["Phase", "Count", "Total (s)", "Max (s)", "Items/s"]
+    for key in t.align.keys():
+        t.align[key] = "r"
+    t.align["Phase"] = "l"
+    for stats in report['phases']:
+        items_per_second = round(stats['items'] / stats['seconds']) if stats['items'] and stats['seconds'] else ''
+        t.add_row([stats['phase'], stats['count'], round(stats['seconds'], 2),
+                   round(stats['max_seconds'], 2), items_per_second])
+    print(t.get_string(title=f"Profile of {report['seconds']} seconds"))
+
+    # The slowest WebDriver commands (there are none when scraping saved page sources)
+    commands = report['commands']
+    if commands:
+        t = PrettyTable()
+        t.field_names = ["Command", "Call site", "Count", "Total (s)", "Avg (ms)"]
+        for key in t.align.keys():
+            t.align[key] = "r"
+        t.align["Command"], t.align["Call site"] = "l", "l"
+        for stats in commands[:top_commands]:
+            t.add_row([stats['command'], stats['call_site'], stats['count'], round(stats['seconds'], 2),
+                       round(stats['seconds'] / stats['count'] * 1000, 1)])
+        print(t.get_string(
+            title=f"{sum(stats['count'] for stats in commands)} WebDriver commands in {round(sum(stats['seconds'] for stats in commands), 2)} seconds"))
+
+    # Peak memory over all samples
+    python_peaks = [sample['python_peak_rss_mib'] for sample in report['memory'] if sample['python_peak_rss_mib']]
+    browser_samples = [sample['browser'] for sample in report['memory'] if sample['browser']]
+    if python_peaks:
+        print(f"Peak memory of Python: {max(python_peaks)} MiB")
+    js_heap_peaks = [sample['js_heap_used_mib'] for sample in browser_samples if sample['js_heap_used_mib'] is not None]
+    node_peaks = [sample['nodes'] for sample in browser_samples if sample['nodes'] is not None]
+    if js_heap_peaks or node_peaks:
+        peaks = ([f"{max(js_heap_peaks)} MiB JS heap"] if js_heap_peaks else []) + \
+            ([f"{max(node_peaks)} DOM nodes"] if node_peaks else [])
+        print(f"Peak memory of the browser: {', '.join(peaks)}")
+
+
+def add_scrape_options(parser, defaults=True):
+    '''Adds the options of how chats are scraped to the parser. Commands add them w/o defaults, so an option given before the command isn't overwritten by the command's default.'''
+
+    def default(value):
+        return value if defaults else argparse.SUPPRESS
+
+    parser.add_argument('--engine', choices=PARSING_ENGINES, default=default('bs4'),
+                        help="HTML parsing engine used to scrape chats (default: bs4)")
+    parser.add_argument('--date-locale', choices=list(DATETIME_LOCALES), default=default('en_US'),
+                        help="date/time format WhatsApp shows messages in (default: en_US)")
+    parser.add_argument('--markdown', action='store_true', default=default(False),
+                        help="keep bold/italic/strikethrough/monospace text and links in messages as markdown e.g. *bold*")
+    parser.add_argument('--processes', type=int, default=default(1), metavar='N',
+                        help="scrape the messages of large chats in N processes at once, about N times faster on a CPU w/ N cores (default: 1)")
+
+
+def add_browser_options(parser, defaults=True):
+    '''Adds the options of how chats are collected and loaded in the browser to the parser, w/o defaults for commands like add_scrape_options'''
+
+    def default(value):
+        return value if defaults else argparse.SUPPRESS
+
+    parser.add_argument('--load-timeout', type=int, default=default(60), metavar='SECONDS',
+                        help="give up waiting for more messages to load after this many seconds (default: 60)")
+    parser.add_argument('--on-timeout', choices=TIMEOUT_POLICIES, default=default(None),
+                        help="ask whether to keep loading, abort the chat, or export the messages loaded so far when loading times out (default: prompt, or abort for the export command)")
+    scrape_mode = parser.add_mutually_exclusive_group()
+    scrape_mode.add_argument('--stream', action='store_true', default=default(False),
+                             help="scrape messages while the chat is loading instead of after it has fully loaded")
+    scrape_mode.add_argument('--in-browser', action='store_true', default=default(False),
+                             help="scrape messages inside the browser instead of transferring and parsing the page source")
+    parser.add_argument('--checkpoint', action='store_true', default=default(False),
+                        help="stream chats while saving progress to a checkpoint, and resume from it if an earlier run was interrupted")
+    parser.add_argument('--incremental', action='store_true', default=default(False),
+                        help="only load and export the messages since a chat's last incremental export, appending them to its archive")
+    parser.add_argument('--media', action='store_true', default=default(False),
+                        help="store the media of messages (stickers, voice messages and the photos/videos WhatsApp has downloaded) in the export directory's media folder and link to it from the exports")
+    parser.add_argument('--chat-list', choices=CHAT_LIST_MODES, default=default('keys'),
+                        help="collect your chats by moving through the chat list w/ the keyboard, or by scrolling it w/ a script, which is much faster for long chat lists (default: keys)")
+    parser.add_argument('--refresh', action='store_true', default=default(False),
+                        help="collect the whole chat list again instead of updating the one cached by the last run")
+    parser.add_argument('--lean', action='store_true', default=default(False),
+                        help="trim the browser for exporting: don't download media/images, turn off animations and background throttling")
+    parser.add_argument('--headless', action='store_true', default=default(False),
+                        help="run the browser w/o a window, which needs your Chrome profile to be logged in to WhatsApp already")
+
+
+def cli():
+    '''Parses command line arguments and runs either the interactive exporter or a WhatSoup subcommand'''
+
+    parser = argparse.ArgumentParser(
+        description="Export your entire WhatsApp chat history. Run without a command for the interactive exporter.")
+    add_scrape_options(parser)
+    add_browser_options(parser)
+    parser.add_argument('--profile', action='store_true',
+                        help="time each phase of the run and every WebDriver command, sample memory use, and save it all as a JSON report, put it before any command")
+    parser.add_argument('--profile-output', metavar='FILE',
+                        help="file to save the --profile report to, which also turns on --profile (default: 'WhatSoup Profile - [timestamp].json')")
+    subparsers = parser.add_subparsers(dest='command')
+
+    # Offline scraping of saved page sources
+    parse_parser = subparsers.add_parser(
+        'parse', help="scrape and export saved WhatsApp page sources without a browser")
+    parse_parser.add_argument(
+        'snapshots', help="directory of saved page-source .html files, or a single .html file")
+    parse_parser.add_argument('--format', dest='formats', nargs='+', choices=EXPORT_FORMATS,
+                              default=['txt'], help="export formats (default: txt)")
+    add_scrape_options(parse_parser, defaults=False)
+    parse_parser.add_argument('--check-parity', action='store_true',
+                              help="instead of exporting, check that every parsing engine scrapes the same messages")
+
+    # Unattended exports of many chats
+    export_parser = subparsers.add_parser(
+        'export', help="export chats w/o any prompts, e.g. to export all of your chats in one run")
+    export_parser.add_argument('chats', nargs='+', metavar='CHAT',
+                               help="chat names, chat numbers as listed by the interactive exporter, or 'all'")
+    export_parser.add_argument('--format', dest='formats', nargs='+', choices=EXPORT_FORMATS,
+                               default=['txt'], help="export formats (default: txt)")
+    export_parser.add_argument('--output', default='exports', metavar='DIR',
+                               help="directory to export to (default: exports)")
+    add_scrape_options(export_parser, defaults=False)
+    add_browser_options(export_parser, defaults=False)
+    export_parser.add_argument('--workers', type=int, default=1, metavar='N',
+                               help="export chats w/ N browsers at once, each w/ its own copy of your Chrome profile (default: 1)")
+
+    # Searching the sqlite archive
+    search_parser = subparsers.add_parser(
+        'search', help="search the messages of the chats exported to the sqlite archive")
+    search_parser.add_argument(
+        'query', help="words to search for, in SQLite full-text search syntax e.g. 'pizza OR pasta' or '\"happy little\"'")
+    search_parser.add_argument('--chat', help="only search this chat")
+    search_parser.add_argument('--sender', help="only search messages sent by this sender")
+    search_parser.add_argument('--since', type=datetime.fromisoformat, metavar='YYYY-MM-DD',
+                               help="only search messages sent on or after this date")
+    search_parser.add_argument('--until', type=datetime.fromisoformat, metavar='YYYY-MM-DD',
+                               help="only search messages sent on or before this date")
+    search_parser.add_argument('--limit', type=int, default=20,
+                               help="show at most this many messages (default: 20)")
+    search_parser.add_argument('--exports', default='exports', metavar='DIR',
+                               help="directory holding the archive (default: exports)")
+
+    # Managing checkpoints of interrupted chat loads
+    checkpoints_parser = subparsers.add_parser(
+        'checkpoints', help="list or clean up checkpoints of interrupted chat loads")
+    checkpoints_parser.add_argument('action', choices=('list', 'clean'))
+    checkpoints_parser.add_argument('--older-than', type=int, default=7, metavar='DAYS',
+                                    help="clean checkpoints not updated in this many days (default: 7)")
+    checkpoints_parser.add_argument('--chat', help="clean the checkpoint of this chat regardless of its age")
+
+    args = parser.parse_args()
+    set_datetime_locale(args.date_locale)
+    browser_settings['lean'], browser_settings['headless'] = args.lean, args.headless
+    text_settings['markdown'] = args.markdown
+    parsing_settings['processes'] = args.processes
+    if args.processes < 1:
+        parser.error("--processes must be at least 1")
+    if args.command in {None, 'export'}:
+        args.on_timeout = args.on_timeout or ('abort' if args.command == 'export' else 'prompt')
+    if args.command == 'export' and args.on_timeout == 'prompt':
+        parser.error("the export command runs w/o prompts, use --on-timeout abort or finish")
+    if args.command in {None, 'export'} and args.stream and args.in_browser:
+        parser.error("--stream and --in-browser can't be combined")
+    if args.command in {None, 'export'} and args.checkpoint and args.in_browser:
+        parser.error("--checkpoint streams the chat and can't be combined w/ --in-browser")
+    if args.command in {None, 'export'} and args.incremental and args.in_browser:
+        parser.error("--incremental streams the chat and can't be combined w/ --in-browser")
+    if args.command in {None, 'export'} and args.media and args.lean:
+        parser.error("--media can't be combined w/ --lean, which keeps the browser from downloading media")
+    if args.command == 'export' and args.workers < 1:
+        parser.error("--workers must be at least 1")
+
+    # Profile the whole run, saving the report when it ends (even if it fails)
+    if args.profile or args.profile_output:
+        start_profiling()
+    try:
+        if args.command == 'checkpoints':
+            if args.action == 'list':
+                print_checkpoints(list_checkpoints())
+            else:
+                deleted = clean_checkpoints(args.older_than, args.chat)
+                print(f"Deleted {deleted} checkpoints.")
+        elif args.command == 'export':
+            # Setup selenium and load WhatsApp, then export w/o any prompts
+            driver = setup_selenium()
+            try:
+                if not whatsapp_is_loaded(driver, interactive=False):
+                    raise SystemExit(1)
+                failures = export_chats(driver, args.chats, args.formats, args.output, args.engine, args.stream,
+                                        args.in_browser, args.load_timeout, args.on_timeout, args.checkpoint, args.incremental, args.workers, args.chat_list, args.media, args.refresh)
+            finally:
+                driver.quit()
+            raise SystemExit(1 if failures else 0)
+        elif args.command == 'search':
+            start = timer()
+            try:
+                results = search_archive(args.query, args.chat, args.sender, args.since and args.since.isoformat(sep=' '),
+                                         args.until and (args.until + timedelta(days=1)).isoformat(sep=' '), args.limit, args.exports)
+            except (ValueError, sqlite3.OperationalError) as error:
+                print(f"Error! The archive could not be searched. Error info: {error}")
+                raise SystemExit(1)
+            print_search_results(results, timer() - start)
+        elif args.command == 'parse':
+            failures = parse_snapshots(
+                args.snapshots, args.formats, args.engine, args.check_parity)
+            raise SystemExit(1 if failures else 0)
+        else:
+            main(args.engine, args.stream, args.in_browser,
+                 args.load_timeout, args.on_timeout, args.checkpoint, args.incremental, args.chat_list, args.media, args.refresh)
+    finally:
+        if args.profile or args.profile_output:
+            finish_profiling(
+                args.profile_output or f"WhatSoup Profile - {datetime.now().strftime('%Y-%m-%d %H.%M.%S.%p')}.json")
+
+
 if __name__ == "__main__":
-    main()
+    cli()